@@ -1,14 +1,16 @@
-from typing import Dict, Any, Tuple, List
+from typing import Dict, Any, Tuple, List, AsyncIterator
 import re, time
-from tenacity import retry, stop_after_attempt, wait_exponential
-from openai import OpenAI
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-from rag import retrieve
+from rag import retrieve, aretrieve, embed_query, aembed_query, hybrid_active
 from settings import settings
+from semantic_cache import answer_cache
+from llm_gateway import gateway, LLMError
+from request_metrics import stage, record_redactions
+from structured_log import get_logger
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+log = get_logger(__name__)
 
 GUIDE = (
   "You are a helpful Q&A assistant for company policies. "
@@ -17,10 +19,35 @@ GUIDE = (
 )
 
 def redact(text: str) -> str:
-    text = re.sub(r"\b\S+@\S+\.\S+\b", "[redacted-email]", text)
-    text = re.sub(r"\b\d{8}\b", "[redacted-id]", text)
+    """Mask emails and 8-digit ids; the count goes to the request's pii_redactions."""
+    text, emails = re.subn(r"\b\S+@\S+\.\S+\b", "[redacted-email]", text)
+    text, ids = re.subn(r"\b\d{8}\b", "[redacted-id]", text)
+    record_redactions(emails + ids)
     return text
 
+class StreamRedactor:
+    """Applies redact() incrementally to a token stream.
+
+    Both redaction patterns match runs of non-whitespace only, so text up to the
+    last whitespace seen can be redacted and released while the trailing partial
+    word stays buffered until more tokens arrive.
+    """
+
+    def __init__(self):
+        self._buf = ""
+
+    def feed(self, chunk: str) -> str:
+        self._buf += chunk
+        cut = max(self._buf.rfind(" "), self._buf.rfind("\n"), self._buf.rfind("\t"))
+        if cut < 0:
+            return ""
+        ready, self._buf = self._buf[:cut + 1], self._buf[cut + 1:]
+        return redact(ready)
+
+    def flush(self) -> str:
+        ready, self._buf = self._buf, ""
+        return redact(ready)
+
 def build_citations(docs: List) -> str:
     lines = []
     for i, d in enumerate(docs, 1):
@@ -28,57 +55,198 @@ def build_citations(docs: List) -> str:
         lines.append(f"[{i}] {src}")
     return "\n".join(lines)
 
+def _messages(prompt: str) -> List[Dict[str, str]]:
+    return [{"role":"system","content":GUIDE},{"role":"user","content":prompt}]
+
 def _llm(prompt: str) -> str:
-    resp = client.chat.completions.create(
+    resp = gateway.chat(
+        model=settings.OPENAI_MODEL,
+        messages=_messages(prompt),
+        max_completion_tokens=220,
+    )
+    return resp.choices[0].message.content.strip()
+
+async def _allm(prompt: str) -> str:
+    resp = await gateway.achat(
         model=settings.OPENAI_MODEL,
-        messages=[{"role":"system","content":GUIDE},{"role":"user","content":prompt}],
+        messages=_messages(prompt),
         max_completion_tokens=220,
     )
     return resp.choices[0].message.content.strip()
 
+async def _astream_llm(prompt: str) -> AsyncIterator[str]:
+    async for chunk in gateway.astream(
+        model=settings.OPENAI_MODEL,
+        messages=_messages(prompt),
+        max_completion_tokens=220,
+    ):
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+def _cache_get(vector, t0: float):
+    """Serve a previously generated answer for a semantically equivalent question."""
+    if vector is None or not settings.SEMANTIC_CACHE_ENABLED:
+        return None
+    cached = answer_cache.get(vector)
+    if cached is None:
+        return None
+    log.info("semantic cache hit, skipping retrieval and LLM")
+    meta = {"citations": cached["citations"], "latency_ms": int((time.time()-t0)*1000), "cache_hit": True}
+    return ({"answer": cached["answer"], "citations": cached["citations"]}, meta)
+
+def _cache_put(vector, output: Dict):
+    if vector is not None and settings.SEMANTIC_CACHE_ENABLED:
+        answer_cache.put(vector, {"answer": output["answer"], "citations": output["citations"]})
+
+def _safe_embed(q: str):
+    try:
+        return embed_query(q)
+    except Exception as e:
+        log.warning("query embedding failed, skipping semantic cache", error=str(e))
+        return None
+
+async def _asafe_embed(q: str):
+    try:
+        return await aembed_query(q)
+    except Exception as e:
+        log.warning("query embedding failed, skipping semantic cache", error=str(e))
+        return None
+
+# Only policy documents and the handbook answer onboarding questions; filtered inside the vector store
+POLICY_FILTER = {"doc_type": ["policy", "handbook"]}
+# Hybrid BM25 + vector fusion puts exact-term matches in the top few, so less context is needed;
+# vector-only retrieval (empty lexical index) keeps the wider k
+RETRIEVAL_K = 3
+VECTOR_ONLY_K = 8
+
+def _retrieval_k() -> int:
+    return RETRIEVAL_K if hybrid_active() else VECTOR_ONLY_K
+
+def _log_docs(docs: List) -> List:
+    log.info("retrieved policy documents", count=len(docs))
+    for i, doc in enumerate(docs):
+        log.debug("retrieved doc", rank=i + 1, source=doc.metadata.get("source", "unknown"))
+    return docs
+
+def _no_context(t0: float) -> Tuple[Dict, Dict]:
+    ans = "I don't know from current context. Please check HR."
+    log.info("no relevant documents, returning default answer")
+    return ({"answer": ans, "citations": ""}, {"latency_ms": int((time.time()-t0)*1000)})
+
+def _llm_unavailable(docs: List, t0: float) -> Tuple[Dict, Dict]:
+    """Fallback when the LLM gateway gives up: the retrieved passages themselves, with sources."""
+    excerpts = "\n\n".join(f"[{i}] {d.page_content[:300].strip()}" for i, d in enumerate(docs[:3], 1))
+    ans = redact("The assistant is temporarily unavailable. These policy excerpts look most relevant:\n\n"
+                 + excerpts + "\n\nSources:\n" + build_citations(docs[:3]))
+    log.warning("LLM unavailable, answering with retrieved excerpts")
+    meta = {"citations": build_citations(docs[:3]), "latency_ms": int((time.time()-t0)*1000), "llm_fallback": True}
+    return ({"answer": ans, "citations": meta["citations"]}, meta)
+
+def _build_prompt(q: str, docs: List) -> str:
+    with stage("prompt_build"):
+        context = "\n\n---\n\n".join(d.page_content for d in docs[:4])
+        prompt = f"CONTEXT:\n{context}\n\nQUESTION:\n{q}\n\nANSWER:"
+    log.debug("prompt built", context_chars=len(context), prompt_chars=len(prompt))
+    return prompt
+
+def _finalize(answer: str, docs: List, t0: float) -> Tuple[Dict, Dict]:
+    sources_added = "Sources:" not in answer
+    if sources_added:
+        answer = answer.strip() + "\n\nSources:\n" + build_citations(docs[:4])
+    
+    answer = redact(answer)
+    
+    meta = {"citations": build_citations(docs[:4]), "latency_ms": int((time.time()-t0)*1000)}
+    log.info("answered", answer_chars=len(answer), sources_added=sources_added, latency_ms=meta["latency_ms"])
+    
+    return ({"answer": answer, "citations": meta["citations"]}, meta)
+
 def execute(payload: Dict[str, Any]) -> Tuple[Dict, Dict]:
     q = payload.get("input",{}).get("question","").strip()
     t0 = time.time()
     
-    print(f"🤖 Onboarding Agent - Question: '{q}'")
-    
-    docs = retrieve(q, k=8)
-    print(f"🔍 Retrieved {len(docs)} documents before filtering")
+    log.info("onboarding question", question_chars=len(q), mode="sync")
     
-    # Filter for relevant sources
-    allowed_paths = ["policies/", "handbook.md"]
-    docs = [d for d in docs if any(p in d.metadata.get("source", "") for p in allowed_paths)]
+    # One embedding serves both the cache lookup and retrieval
+    vector = _safe_embed(q)
+    cached = _cache_get(vector, t0)
+    if cached:
+        return cached
     
-    # Debug: Print filtered results
-    print(f"🔍 After filtering: {len(docs)} documents")
-    for i, doc in enumerate(docs):
-        source = doc.metadata.get("source", "unknown")
-        print(f"  Filtered Doc {i+1}: {source}")
-
+    docs = _log_docs(retrieve(q, k=_retrieval_k(), vector=vector, filter=POLICY_FILTER))
     if not docs:
-        ans = "I don't know from current context. Please check HR."
-        print(f"❌ No relevant documents found - returning default response")
-        print(f"📝 Agent Response: {ans}")
-        return ({"answer": ans, "citations": ""}, {"latency_ms": int((time.time()-t0)*1000)})
-
-    context = "\n\n---\n\n".join(d.page_content for d in docs[:4])
-    print(f"📚 Context length: {len(context)} characters")
-    print(f"📚 Context preview: {context[:200]}...")
+        return _no_context(t0)
+
+    try:
+        answer = _llm(_build_prompt(q, docs))
+    except LLMError:
+        return _llm_unavailable(docs, t0)
+    output, meta = _finalize(answer, docs, t0)
+    _cache_put(vector, output)
+    return (output, meta)
+
+async def aexecute(payload: Dict[str, Any]) -> Tuple[Dict, Dict]:
+    """Async variant of execute: holds no worker thread while waiting on Qdrant or OpenAI."""
+    q = payload.get("input",{}).get("question","").strip()
+    t0 = time.time()
+    
+    log.info("onboarding question", question_chars=len(q), mode="async")
     
-    prompt = f"CONTEXT:\n{context}\n\nQUESTION:\n{q}\n\nANSWER:"
-    print(f"🤖 Sending prompt to LLM (length: {len(prompt)} chars)")
+    vector = await _asafe_embed(q)
+    cached = _cache_get(vector, t0)
+    if cached:
+        return cached
     
-    answer = _llm(prompt)
-    print(f"🤖 LLM Response: {answer}")
+    docs = _log_docs(await aretrieve(q, k=_retrieval_k(), vector=vector, filter=POLICY_FILTER))
+    if not docs:
+        return _no_context(t0)
 
-    if "Sources:" not in answer:
-        answer = answer.strip() + "\n\nSources:\n" + build_citations(docs[:4])
-        print(f"📝 Added sources to response")
+    try:
+        answer = await _allm(_build_prompt(q, docs))
+    except LLMError:
+        return _llm_unavailable(docs, t0)
+    output, meta = _finalize(answer, docs, t0)
+    _cache_put(vector, output)
+    return (output, meta)
+
+async def astream(payload: Dict[str, Any]) -> AsyncIterator[str]:
+    """Stream the answer token by token, redacting incrementally and appending citations at the end."""
+    q = payload.get("input",{}).get("question","").strip()
     
-    answer = redact(answer)
-    print(f"📝 Final Agent Response: {answer}")
+    log.info("onboarding question", question_chars=len(q), mode="stream")
     
-    meta = {"citations": build_citations(docs[:4]), "latency_ms": int((time.time()-t0)*1000)}
-    print(f"⏱️  Response time: {meta['latency_ms']}ms")
+    vector = await _asafe_embed(q)
+    cached = _cache_get(vector, time.time())
+    if cached:
+        yield cached[0]["answer"]
+        return
     
-    return ({"answer": answer, "citations": meta["citations"]}, meta)
+    docs = _log_docs(await aretrieve(q, k=_retrieval_k(), vector=vector, filter=POLICY_FILTER))
+    if not docs:
+        output, _ = _no_context(time.time())
+        yield output["answer"]
+        return
+
+    redactor = StreamRedactor()
+    answer = ""
+    sent = []   # redacted text as delivered; cached as the answer so nothing is redacted (or counted) twice
+    try:
+        async for token in _astream_llm(_build_prompt(q, docs)):
+            answer += token
+            out = redactor.feed(token)
+            if out:
+                sent.append(out)
+                yield out
+    except LLMError:
+        # Raised only while opening the stream, so nothing has been sent yet
+        yield _llm_unavailable(docs, time.time())[0]["answer"]
+        return
+
+    tail = redactor.flush()
+    if "Sources:" not in answer:
+        tail = tail.rstrip() + "\n\nSources:\n" + redact(build_citations(docs[:4]))
+    if tail:
+        sent.append(tail)
+        yield tail
+    
+    _cache_put(vector, {"answer": "".join(sent).strip(), "citations": build_citations(docs[:4])})
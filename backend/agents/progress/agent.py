@@ -1,14 +1,39 @@
 from typing import Dict, Any, Tuple
-import csv, os, time
+import datetime, os, sys, time
 
-def load_courses():
-    p = os.path.join(os.path.dirname(__file__), "../../..", "data", "courses.csv")
-    items = []
-    if os.path.exists(p):
-        with open(p, newline="", encoding="utf-8") as f:
-            for row in csv.DictReader(f):
-                items.append(row)
-    return items
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from agents.progress.store import ProgressStore
+from llm_gateway import CircuitBreaker
+from settings import settings
+from structured_log import get_logger
+
+log = get_logger(__name__)
+
+# Loaded once, partitioned by user; reloads (incrementally when appended) if the file changes
+_store = ProgressStore(os.path.join(os.path.dirname(__file__), "../..", "data", "courses.csv"))
+
+# Opens on the first failed DB lookup; requests use the CSV store until one probe after PROGRESS_DB_RETRY_S succeeds
+db_breaker = CircuitBreaker(1, settings.PROGRESS_DB_RETRY_S)
+
+def load_user_courses(org_id: str, uid: str):
+    """Course rows for one user and where they came from.
+
+    Reads course_assignments with one indexed query; falls back to the CSV store
+    (and its demo user) when the DB has no rows for the user or is unreachable.
+    """
+    if settings.PROGRESS_SOURCE == "db" and db_breaker.allow():
+        try:
+            from progress_db import fetch_user_courses
+            rows = fetch_user_courses(org_id, uid)
+        except Exception as e:
+            db_breaker.record(False)
+            log.warning("progress DB lookup failed, using courses.csv", error=str(e),
+                        retry_in_s=settings.PROGRESS_DB_RETRY_S)
+        else:
+            db_breaker.record(True)
+            if rows:
+                return rows, "course_assignments"
+    return _store.rows_for(uid) or _store.rows_for("u123") or [], "courses.csv"
 
 def analyze_progress_question(question: str) -> str:
     """Determine what aspect of progress the user is asking about"""
@@ -27,35 +52,23 @@ def analyze_progress_question(question: str) -> str:
 
 def execute(payload: Dict[str, Any]) -> Tuple[Dict, Dict]:
     t0 = time.time()
-    courses = load_courses()
     
     # Get user_id from the correct location (user_id field, not input.user_id)
     uid = payload.get("user_id") or payload.get("input",{}).get("user_id") or "u123"  # fallback for demo
+    org_id = payload.get("org_id") or "demo_org"
     question = payload.get("input",{}).get("question", "").strip()
     
-    # Filter courses for the specific user
-    user_courses = [c for c in courses if c.get("user_id") == uid]
-    
-    # If no courses found for user, use demo data
-    if not user_courses:
-        user_courses = [c for c in courses if c.get("user_id") == "u123"]
+    # Only this user's rows are touched (demo data if the user has none)
+    user_courses, source = load_user_courses(org_id, uid)
     
     total = len(user_courses)
     completed_courses = [c for c in user_courses if c.get("status","").lower()=="completed"]
     pending_courses = [c for c in user_courses if c.get("status","").lower()!="completed"]
     done = len(completed_courses)
     
-    # Check for overdue courses (simple date comparison)
-    import datetime
-    today = datetime.date.today()
-    overdue_courses = []
-    for course in pending_courses:
-        try:
-            due_date = datetime.datetime.strptime(course.get("due", ""), "%Y-%m-%d").date()
-            if due_date < today:
-                overdue_courses.append(course)
-        except:
-            pass  # Skip courses with invalid dates
+    # Check for overdue courses (due dates are pre-parsed to ordinals; 0 means missing/invalid)
+    today = datetime.date.today().toordinal()
+    overdue_courses = [c for c in pending_courses if 0 < c["due_ord"] < today]
     
     # Analyze what user is asking about
     focus = analyze_progress_question(question) if question else 'overview'
@@ -106,7 +119,7 @@ def execute(payload: Dict[str, Any]) -> Tuple[Dict, Dict]:
         "total": total,
         "courses_completed": [{"title": c.get('course'), "status": c.get('status')} for c in completed_courses],
         "next_actions": next_actions[:3],  # Limit to top 3
-        "citations": ["courses.csv"],
+        "citations": [source],
         "nudges": nudges,
         "focus": focus
     }
@@ -0,0 +1,166 @@
+"""
+Org-wide course progress analytics for manager cohort views.
+
+Aggregates are computed in bulk, never per user: with PROGRESS_SOURCE=db as a
+handful of GROUP BY queries on course_assignments, otherwise as NumPy bincount
+group-bys over the columnar CSV store. courses.csv has no org column, so its
+aggregate covers the whole file and is reported with org_id None whichever org
+asked. Results are cached per (org_id, data version, day) - the day matters
+because "overdue" moves with it.
+"""
+
+import datetime
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from settings import settings
+from structured_log import get_logger
+
+log = get_logger(__name__)
+
+ATTEMPTS_BUCKETS = 5   # 0..4 attempts, then "5+"
+
+_cache: Dict[Optional[str], Tuple[tuple, Dict[str, Any]]] = {}   # org_id (None: CSV) -> (version key, result)
+_cache_lock = threading.Lock()
+
+
+def _summarize(org_id: Optional[str], n_users: int, users_done: int, courses: List[str],
+               total: np.ndarray, completed: np.ndarray, overdue: np.ndarray,
+               attempts_hist: np.ndarray, source: str) -> Dict[str, Any]:
+    assignments, done = int(total.sum()), int(completed.sum())
+    rate = np.divide(completed, total, out=np.zeros(len(total)), where=total > 0)
+    by_course = [
+        {
+            "course": courses[i],
+            "assigned": int(total[i]),
+            "completed": int(completed[i]),
+            "completion_rate": round(float(rate[i]), 4),
+            "overdue": int(overdue[i]),
+        }
+        # Most overdue first, then the least completed
+        for i in np.lexsort((rate, -overdue)) if total[i] > 0
+    ]
+    hist = {str(i): int(attempts_hist[i]) for i in range(ATTEMPTS_BUCKETS)}
+    hist[f"{ATTEMPTS_BUCKETS}+"] = int(attempts_hist[ATTEMPTS_BUCKETS:].sum())
+    return {
+        "org_id": org_id,
+        "source": source,
+        "users": n_users,
+        "users_all_complete": users_done,
+        "assignments": assignments,
+        "completed": done,
+        "completion_rate": round(done / assignments, 4) if assignments else 0.0,
+        "overdue": int(overdue.sum()),
+        "by_course": by_course,
+        "attempts_histogram": hist,
+    }
+
+
+# --- CSV store (NumPy group-bys) -----------------------------------------------
+
+def _store_version(store) -> tuple:
+    store._maybe_reload()
+    return ("csv", store.version)
+
+
+def _store_analytics(store) -> Dict[str, Any]:
+    cols = store.columns()
+    courses = store.courses
+    done_ids = [i for i, s in enumerate(store.statuses) if s.lower() == "completed"]
+    is_done = np.isin(cols["status"], done_ids)
+    today = datetime.date.today().toordinal()
+    is_overdue = ~is_done & (cols["due"] > 0) & (cols["due"] < today)
+
+    n_courses = len(courses)
+    course = cols["course"]
+    total = np.bincount(course, minlength=n_courses)
+    completed = np.bincount(course, weights=is_done, minlength=n_courses).astype(np.int64)
+    overdue = np.bincount(course, weights=is_overdue, minlength=n_courses).astype(np.int64)
+    attempts_hist = np.bincount(np.clip(cols["attempts"], 0, ATTEMPTS_BUCKETS), minlength=ATTEMPTS_BUCKETS + 1)
+    pending_per_user = np.bincount(cols["user"], weights=~is_done, minlength=cols["n_users"])
+    users_done = int((pending_per_user == 0).sum())
+    result = _summarize(None, cols["n_users"], users_done, courses, total, completed, overdue,
+                        attempts_hist, "courses.csv")
+    result["note"] = "courses.csv is not partitioned by org; figures cover every user in the file"
+    return result
+
+
+# --- course_assignments (SQL aggregates) ---------------------------------------
+
+def _db_version(org_id: str) -> tuple:
+    from sqlalchemy import func, select
+    from audit_store import CourseAssignment, get_engine
+    with get_engine().connect() as conn:
+        count, last = conn.execute(
+            select(func.count(), func.max(CourseAssignment.updated_ts)).where(CourseAssignment.org_id == org_id)
+        ).one()
+    return ("db", count, last)
+
+
+def _db_analytics(org_id: str) -> Dict[str, Any]:
+    from sqlalchemy import case, func, select
+    from audit_store import CourseAssignment as CA, get_engine
+
+    today = datetime.date.today()
+    is_done = case((func.lower(CA.status) == "completed", 1), else_=0)
+    is_overdue = case(((func.lower(CA.status) != "completed") & (CA.due < today), 1), else_=0)
+    in_org = CA.org_id == org_id
+    per_user = (select(CA.user_id, func.sum(1 - is_done).label("pending"))
+                .where(in_org).group_by(CA.user_id).subquery())
+    bucket = func.least(CA.attempts, ATTEMPTS_BUCKETS)
+
+    with get_engine().connect() as conn:
+        course_rows = conn.execute(
+            select(CA.course, func.count(), func.sum(is_done), func.sum(is_overdue)).where(in_org).group_by(CA.course)
+        ).all()
+        n_users, users_done = conn.execute(
+            select(func.count(), func.coalesce(func.sum(case((per_user.c.pending == 0, 1), else_=0)), 0))
+        ).one()
+        attempt_rows = conn.execute(select(bucket, func.count()).where(in_org).group_by(bucket)).all()
+
+    courses = [r[0] for r in course_rows]
+    total = np.array([r[1] for r in course_rows], dtype=np.int64)
+    completed = np.array([r[2] or 0 for r in course_rows], dtype=np.int64)
+    overdue = np.array([r[3] or 0 for r in course_rows], dtype=np.int64)
+    attempts_hist = np.zeros(ATTEMPTS_BUCKETS + 1, dtype=np.int64)
+    for b, n in attempt_rows:
+        attempts_hist[max(int(b or 0), 0)] += n
+    return _summarize(org_id, int(n_users), int(users_done), courses, total, completed, overdue,
+                      attempts_hist, "course_assignments")
+
+
+def org_analytics(org_id: str, store=None) -> Dict[str, Any]:
+    """Completion, overdue-by-course and attempts distribution for one org, cached per data version."""
+    t0 = time.time()
+    from agents.progress.agent import _store, db_breaker
+    use_db = settings.PROGRESS_SOURCE == "db" and db_breaker.allow()
+    version: Optional[tuple] = None
+    if use_db:
+        try:
+            version = _db_version(org_id)
+        except Exception as e:
+            db_breaker.record(False)
+            log.warning("progress analytics DB unavailable, using courses.csv", error=str(e),
+                        retry_in_s=settings.PROGRESS_DB_RETRY_S)
+            use_db = False
+        else:
+            db_breaker.record(True)
+            use_db = version[1] > 0
+    if not use_db:
+        store = store if store is not None else _store
+        version = _store_version(store)
+    key = version + (datetime.date.today().toordinal(),)
+    cache_key = org_id if use_db else None   # one CSV aggregate serves every org
+
+    with _cache_lock:
+        hit = _cache.get(cache_key)
+    if hit is not None and hit[0] == key:
+        return {**hit[1], "cached": True, "latency_ms": int((time.time() - t0) * 1000)}
+
+    result = _db_analytics(org_id) if use_db else _store_analytics(store)
+    with _cache_lock:
+        _cache[cache_key] = (key, result)
+    return {**result, "cached": False, "latency_ms": int((time.time() - t0) * 1000)}
@@ -0,0 +1,186 @@
+"""
+User-indexed, columnar store for course progress rows.
+
+The CSV is parsed once into compact column arrays: course names and statuses
+are interned, due dates are pre-parsed to date ordinals and attempts are packed
+ints. A per-user index of row positions means a request only touches the rows
+of its own user, while org-wide aggregation reads whole columns (`columns()`).
+When the file changes the store re-reads it; if it only grew (the usual case
+for an append-only LMS export) just the new bytes are parsed.
+"""
+
+import csv
+import datetime
+import io
+import os
+import sys
+import threading
+from array import array
+from typing import Dict, List, Optional
+
+from structured_log import get_logger
+
+log = get_logger(__name__)
+
+
+class _Table:
+    __slots__ = ("user", "course", "status", "due", "attempts", "rows_of", "user_ids")
+
+    def __init__(self):
+        self.user = array("I")      # index into user_ids
+        self.course = array("I")    # index into ProgressStore.courses
+        self.status = array("B")    # index into ProgressStore.statuses
+        self.due = array("i")       # date ordinal, 0 if missing/invalid
+        self.attempts = array("i")
+        self.rows_of: Dict[str, array] = {}   # user_id -> row positions
+        self.user_ids: List[str] = []
+
+
+class ProgressStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._sig = None       # (inode, size, mtime) of the last parse
+        self._offset = 0       # bytes consumed (always at a line boundary)
+        self._tail = b""       # last bytes before _offset, to detect rewrites vs appends
+        self._columns: Dict[str, int] = {}
+        self.statuses: List[str] = []
+        self._status_ids: Dict[str, int] = {}
+        self.courses: List[str] = []
+        self._course_ids: Dict[str, int] = {}
+        self.table = _Table()
+        self.version = 0       # bumped on every (re)load
+        self._columns_cache = None
+        if not os.path.exists(path):
+            log.warning("course progress file not found, store is empty", path=os.path.abspath(path))
+
+    @staticmethod
+    def _intern(value: str, ids: Dict[str, int], values: List[str]) -> int:
+        vid = ids.get(value)
+        if vid is None:
+            vid = ids[value] = len(values)
+            values.append(sys.intern(value))
+        return vid
+
+    def _ingest(self, text: str, table: _Table):
+        reader = csv.reader(io.StringIO(text))
+        if not self._columns:
+            header = next(reader, None)
+            if header is None:
+                return
+            self._columns = {name.strip(): i for i, name in enumerate(header)}
+        col = self._columns
+        i_user, i_course, i_status, i_due, i_att = (col.get(c) for c in ("user_id", "course", "status", "due", "attempts"))
+        width = len(col)
+        for row in reader:
+            if len(row) < width or i_user is None:
+                continue
+            positions = table.rows_of.get(row[i_user])
+            if positions is None:
+                positions = table.rows_of[sys.intern(row[i_user])] = array("I")
+                table.user_ids.append(row[i_user])
+                uidx = len(table.user_ids) - 1
+            else:
+                uidx = table.user[positions[0]]
+            table.user.append(uidx)
+            table.course.append(self._intern(row[i_course] if i_course is not None else "", self._course_ids, self.courses))
+            table.status.append(self._intern(row[i_status] if i_status is not None else "", self._status_ids, self.statuses))
+            try:
+                table.due.append(datetime.date.fromisoformat(row[i_due]).toordinal())
+            except (TypeError, ValueError):
+                table.due.append(0)
+            try:
+                table.attempts.append(int(row[i_att]))
+            except (TypeError, ValueError):
+                table.attempts.append(0)
+            # Columns are written first, so a visible position always has its row
+            positions.append(len(table.user) - 1)
+
+    def _reset(self):
+        self._offset = 0
+        self._tail = b""
+        self._columns = {}
+
+    def _maybe_reload(self):
+        try:
+            st = os.stat(self.path)
+            sig = (st.st_ino, st.st_size, st.st_mtime_ns)
+        except OSError:
+            sig = None
+        if sig == self._sig:
+            return
+        with self._lock:
+            if sig == self._sig:
+                return
+            if sig is None:
+                log.warning("course progress file removed, store is empty", path=os.path.abspath(self.path))
+                self._reset()
+                self.table = _Table()
+                self._sig = None
+                self.version += 1
+                return
+            with open(self.path, "rb") as f:
+                appended = self._sig is not None and sig[0] == self._sig[0] and sig[1] > self._offset > 0
+                if appended:
+                    f.seek(self._offset - len(self._tail))
+                    appended = f.read(len(self._tail)) == self._tail
+                if not appended:
+                    self._reset()
+                f.seek(self._offset)
+                data = f.read()
+            # Appends extend the live table; a full reload builds a new one and swaps it in
+            table = self.table if appended else _Table()
+            # Only consume complete lines; a partially written last line is picked up next time
+            end = data.rfind(b"\n") + 1
+            self._ingest(data[:end].decode("utf-8-sig" if self._offset == 0 else "utf-8"), table)
+            self.table = table
+            self._offset += end
+            if end:
+                self._tail = (self._tail + data[:end])[-64:]
+            self._sig = sig
+            self.version += 1
+
+    def rows_for(self, user_id: str) -> Optional[List[dict]]:
+        """Rows for one user as dicts (course, status, due, attempts, due_ord), or None if unknown."""
+        self._maybe_reload()
+        table = self.table
+        positions = table.rows_of.get(user_id)
+        if positions is None:
+            return None
+        statuses, courses = self.statuses, self.courses
+        return [
+            {
+                "user_id": user_id,
+                "course": courses[table.course[i]],
+                "status": statuses[table.status[i]],
+                "due": datetime.date.fromordinal(table.due[i]).isoformat() if table.due[i] else "",
+                "due_ord": table.due[i],
+                "attempts": table.attempts[i],
+            }
+            for i in positions
+        ]
+
+    def columns(self) -> dict:
+        """All rows as NumPy arrays: user (dense index), course, status, due, attempts.
+
+        Rebuilt only after a reload; `version` identifies the snapshot.
+        """
+        import numpy as np
+        self._maybe_reload()
+        cached = self._columns_cache
+        if cached is not None and cached["version"] == self.version:
+            return cached
+        # Copied under the lock: an append cannot resize an array whose buffer is exported
+        with self._lock:
+            table = self.table
+            cached = {
+                "version": self.version,
+                "n_users": len(table.user_ids),
+                "user": np.frombuffer(table.user, dtype=np.uint32).copy(),
+                "course": np.frombuffer(table.course, dtype=np.uint32).copy(),
+                "status": np.frombuffer(table.status, dtype=np.uint8).copy(),
+                "due": np.frombuffer(table.due, dtype=np.int32).copy(),
+                "attempts": np.frombuffer(table.attempts, dtype=np.int32).copy(),
+            }
+        self._columns_cache = cached
+        return cached
@@ -1,24 +1,40 @@
-from typing import Dict, Any, Tuple, List
-import time, csv, os, sys
-from tenacity import retry, stop_after_attempt, wait_exponential
-from openai import OpenAI
+from typing import Dict, Any, Tuple, List, Iterator, AsyncIterator
+import time, os, sys
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-from rag import retrieve
+from rag import retrieve, aretrieve
 from settings import settings
+from agents.skillnav.catalog import CatalogIndex
+from agents.skillnav.keywords import KeywordMatcher, load_catalog_tags, load_taxonomy
+from llm_gateway import gateway
+from request_metrics import stage
+from structured_log import get_logger
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+log = get_logger(__name__)
+
+_catalog = CatalogIndex(os.path.join(os.path.dirname(__file__), "../..", "data", "resources", "catalog.csv"))
 
 def load_resources() -> List[dict]:
-    p = os.path.join(os.path.dirname(__file__), "../../..", "data", "resources", "catalog.csv")
-    rows = []
-    if os.path.exists(p):
-        with open(p, newline="", encoding="utf-8") as f:
-            for row in csv.DictReader(f):
-                row["tags"] = [t.strip() for t in row.get("tags","").split("|") if t.strip()]
-                rows.append(row)
-    return rows
+    return _catalog.all()
+
+def _catalog_tags(tags: List[str]) -> List[str]:
+    """Taxonomy tags plus the catalog tags they map to (data/skills/catalog_tags.csv)."""
+    out = []
+    for tag in tags:
+        for t in [tag, *_catalog_tag_map.get(tag, ())]:
+            if t not in out:
+                out.append(t)
+    return out
+
+def select_resources(question: str, limit: int = 15) -> List[dict]:
+    """Resources whose tags match the skills and role extracted from the question"""
+    techs, role = extract_learning_intent(question)
+    # "general" is a catalog tag too, so questions without a role still get general resources
+    tags = _catalog_tags([*techs, role])
+    resources = _catalog.select(tags, limit=limit)
+    log.info("selected resources", count=len(resources), tags=tags)
+    return resources
 
 SKILL_NAVIGATOR_PROMPT = """
 You are an AI Skill Navigator for Aurora, a professional development platform. Your role is to create personalized learning plans based on company projects and user goals.
@@ -47,8 +63,9 @@ RESPONSE FORMAT: Return a JSON-like structure with:
 Be specific, practical, and ensure the plan is achievable within the timeframe.
 """
 
-def generate_ai_learning_plan(question: str, project_context: str, resources: List[dict]) -> Dict:
-    """Generate an AI-powered learning plan using LLM and project context"""
+@stage("prompt_build")
+def _plan_messages(question: str, project_context: str, resources: List[dict]) -> List[Dict[str, str]]:
+    """Build the chat messages for the learning plan request"""
     
     # Create resource context for the LLM (limit to prevent token overflow)
     resource_list = []
@@ -66,9 +83,8 @@ def generate_ai_learning_plan(question: str, project_context: str, resources: Li
     if len(project_context) > 2000:
         project_context = project_context[:2000] + "... (truncated)"
     
-    try:
-        # Simplified prompt for better reliability
-        user_prompt = f"""Create a 4-week learning plan for: {question}
+    # Simplified prompt for better reliability
+    user_prompt = f"""Create a 4-week learning plan for: {question}
 
 Company Project Context:
 {project_context}
@@ -84,32 +100,63 @@ Please create a structured plan with 4 weeks, each containing:
 
 Format as a clear, structured response."""
 
-        response = client.chat.completions.create(
+    return [
+        {"role": "system", "content": "You are a learning advisor for Aurora company. Create practical, project-aligned learning plans."},
+        {"role": "user", "content": user_prompt}
+    ]
+
+def _plan_from_ai_response(ai_response: str, question: str) -> Dict:
+    """Wrap the raw LLM answer in the plan structure returned to callers"""
+    log.info("AI plan response", response_chars=len(ai_response))
+    
+    # Return a simplified structure
+    return {
+        "plan_30d": create_simple_plan_from_response(ai_response, question),
+        "explanation": f"AI-generated learning plan for: {question}",
+        "ai_response": ai_response
+    }
+
+def generate_ai_learning_plan(question: str, project_context: str, resources: List[dict]) -> Dict:
+    """Generate an AI-powered learning plan using LLM and project context"""
+    try:
+        response = gateway.chat(
             model=settings.OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": "You are a learning advisor for Aurora company. Create practical, project-aligned learning plans."},
-                {"role": "user", "content": user_prompt}
-            ],
+            messages=_plan_messages(question, project_context, resources),
             max_completion_tokens=1500,
-            temperature=0.3,
-            timeout=15
+            temperature=0.3
         )
+        return _plan_from_ai_response(response.choices[0].message.content.strip(), question)
         
-        ai_response = response.choices[0].message.content.strip()
-        print(f"🧭 AI Response length: {len(ai_response)}")
-        print(f"🧭 AI Response preview: {ai_response[:200]}...")
-        
-        # Return a simplified structure
-        return {
-            "plan_30d": create_simple_plan_from_response(ai_response, question),
-            "explanation": f"AI-generated learning plan for: {question}",
-            "ai_response": ai_response
-        }
+    except Exception as e:
+        log.warning("AI plan generation failed, using fallback plan", error=str(e))
+        return create_fallback_plan(question)
+
+async def agenerate_ai_learning_plan(question: str, project_context: str, resources: List[dict]) -> Dict:
+    """Async variant of generate_ai_learning_plan through the shared LLM gateway"""
+    try:
+        response = await gateway.achat(
+            model=settings.OPENAI_MODEL,
+            messages=_plan_messages(question, project_context, resources),
+            max_completion_tokens=1500,
+            temperature=0.3
+        )
+        return _plan_from_ai_response(response.choices[0].message.content.strip(), question)
         
     except Exception as e:
-        print(f"Error generating AI plan: {e}")
+        log.warning("AI plan generation failed, using fallback plan", error=str(e))
         return create_fallback_plan(question)
 
+async def astream_ai_learning_plan(question: str, project_context: str, resources: List[dict]) -> AsyncIterator[str]:
+    """Stream the learning plan text from the LLM as it is generated"""
+    async for chunk in gateway.astream(
+        model=settings.OPENAI_MODEL,
+        messages=_plan_messages(question, project_context, resources),
+        max_completion_tokens=1500,
+        temperature=0.3
+    ):
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
 def create_simple_plan_from_response(ai_response: str, question: str) -> List[Dict]:
     """Create a simple plan structure from AI response"""
     # Split response into weeks
@@ -161,65 +208,31 @@ def create_simple_plan_from_response(ai_response: str, question: str) -> List[Di
     
     return weeks[:4]  # Return exactly 4 weeks
 
+# Compiled once from data/skills/keywords.csv; grow the taxonomy by editing the file
+_taxonomy = load_taxonomy()
+_tech_matcher = _taxonomy.get("tech") or KeywordMatcher([])
+_role_matcher = _taxonomy.get("role") or KeywordMatcher([])
+_catalog_tag_map = load_catalog_tags()
+
+def unresolved_taxonomy_tags() -> List[str]:
+    """Taxonomy tags that match no catalog resource, even through catalog_tags.csv."""
+    available = _catalog.tags()
+    tags = dict.fromkeys([*_tech_matcher.all_tags(), *_role_matcher.all_tags()])
+    return [tag for tag in tags if not available.intersection(_catalog_tags([tag]))]
+
+_unresolved = unresolved_taxonomy_tags()
+if _unresolved:
+    log.warning("taxonomy tags with no catalog resources, add them to data/skills/catalog_tags.csv",
+                tags=_unresolved)
+
 def extract_learning_intent(question: str) -> Tuple[List[str], str]:
     """Extract skills/technologies and role from natural language question"""
-    question_lower = question.lower()
+    # Whole-word matches only, in taxonomy order
+    mentioned_techs = _tech_matcher.tags(question)
     
-    # Expanded skill/technology keywords
-    tech_keywords = {
-        # Programming Languages
-        'python': 'python', 'javascript': 'javascript', 'java': 'java', 'typescript': 'typescript',
-        'go': 'go', 'rust': 'rust', 'c++': 'cpp', 'c#': 'csharp', 'php': 'php',
-        
-        # Frontend Technologies
-        'react': 'react', 'vue': 'vue', 'angular': 'angular', 'next.js': 'nextjs',
-        'html': 'html', 'css': 'css', 'sass': 'sass', 'tailwind': 'tailwind',
-        
-        # Backend Technologies
-        'node.js': 'nodejs', 'express': 'express', 'django': 'django', 'flask': 'flask',
-        'spring': 'spring', 'laravel': 'laravel', 'rails': 'rails',
-        
-        # Databases
-        'database': 'database', 'sql': 'postgres', 'postgresql': 'postgres', 'mysql': 'mysql',
-        'mongodb': 'mongodb', 'redis': 'redis', 'elasticsearch': 'elasticsearch',
-        
-        # DevOps & Cloud
-        'docker': 'docker', 'kubernetes': 'kubernetes', 'aws': 'aws', 'azure': 'azure',
-        'gcp': 'gcp', 'terraform': 'terraform', 'ansible': 'ansible', 'jenkins': 'jenkins',
-        'git': 'git', 'github': 'git', 'gitlab': 'git',
-        
-        # AI & Data Science
-        'machine learning': 'ml', 'ml': 'ml', 'ai': 'ai', 'artificial intelligence': 'ai',
-        'data science': 'data', 'data analysis': 'data', 'pandas': 'data', 'numpy': 'data',
-        'tensorflow': 'ml', 'pytorch': 'ml', 'scikit-learn': 'ml',
-        
-        # Other Technologies
-        'api': 'api', 'rest': 'api', 'graphql': 'api', 'microservices': 'microservices',
-        'serverless': 'serverless', 'lambda': 'serverless', 'kubernetes': 'kubernetes',
-        'security': 'security', 'cybersecurity': 'security', 'devops': 'devops',
-        'agile': 'agile', 'scrum': 'agile', 'leadership': 'leadership', 'management': 'management'
-    }
-    
-    # Role keywords  
-    role_keywords = {
-        'backend': 'backend', 'frontend': 'frontend', 'fullstack': 'general', 'full-stack': 'general',
-        'devops': 'devops', 'data': 'data', 'data scientist': 'data', 'data engineer': 'data',
-        'ai': 'ai', 'ml engineer': 'ai', 'manager': 'management', 'lead': 'leadership',
-        'architect': 'architecture', 'qa': 'testing', 'tester': 'testing', 'sre': 'devops'
-    }
-    
-    # Extract technologies mentioned
-    mentioned_techs = []
-    for keyword, tag in tech_keywords.items():
-        if keyword in question_lower:
-            mentioned_techs.append(tag)
-    
-    # Extract role if mentioned
-    detected_role = "general"
-    for keyword, role in role_keywords.items():
-        if keyword in question_lower:
-            detected_role = role
-            break
+    # First role keyword in taxonomy order wins
+    roles = _role_matcher.tags(question)
+    detected_role = roles[0] if roles else "general"
     
     return mentioned_techs, detected_role
 
@@ -296,7 +309,7 @@ def parse_enhanced_ai_response(ai_response: str, original_question: str, project
         }
         
     except Exception as e:
-        print(f"Error parsing enhanced AI response: {e}")
+        log.warning("could not parse enhanced AI response, using fallback plan", error=str(e))
         return create_fallback_plan(original_question)
 
 def parse_ai_response(ai_response: str, original_question: str) -> Dict:
@@ -348,7 +361,7 @@ def parse_ai_response(ai_response: str, original_question: str) -> Dict:
         }
         
     except Exception as e:
-        print(f"Error parsing AI response: {e}")
+        log.warning("could not parse AI response, using fallback plan", error=str(e))
         return create_fallback_plan(original_question)
 
 def create_structured_plan_from_ai_response(ai_response: str, question: str) -> List[Dict]:
@@ -430,81 +443,212 @@ def create_fallback_plan(question: str) -> Dict:
         "ai_response": "Generated fallback plan due to processing error"
     }
 
-def execute(payload: Dict[str, Any]) -> Tuple[Dict, Dict]:
-    """Main execution function using RAG and LLM for intelligent responses"""
-    t0 = time.time()
-    inp = payload.get("input", {})
-    question = inp.get("question", "").strip()
+# Project documentation only, filtered inside the vector store; 2 docs keeps the prompt small
+PROJECT_FILTER = {"doc_type": "project"}
+PROJECT_K = 2
+
+def _project_context(project_docs: List) -> str:
+    """Build a compact project context from retrieved project documents"""
+    log.info("retrieved project documents", count=len(project_docs))
+    
+    # Create simplified project context
+    project_context = ""
+    for doc in project_docs:
+        source = doc.metadata.get("source", "")
+        # Take first 500 chars of each doc
+        content = doc.page_content[:500]
+        project_context += f"From {source.split('/')[-1]}: {content}\n\n"
     
-    print(f"🧭 Skill Navigator - Question: '{question}'")
+    # If no project docs found, use a general context
+    if not project_context:
+        project_context = "Focus on practical skills and industry-relevant technologies for software development."
     
+    log.debug("project context built", context_chars=len(project_context))
+    return project_context
+
+def _build_output(ai_plan: Dict, project_docs: List, t0: float) -> Tuple[Dict, Dict]:
+    """Attach metadata and shape the agent output"""
+    meta = {
+        "latency_ms": int((time.time() - t0) * 1000),
+        "citations": ["projects documentation", "resources/catalog.csv"],
+        "ai_powered": True,
+        "context_sources": len(project_docs)
+    }
+    
+    # Structure output
+    output = {
+        "plan_30d": ai_plan.get("plan_30d", []),
+        "citations": meta["citations"],
+        "explainability": ai_plan.get("explanation", "AI-generated plan based on company projects"),
+        "ai_insights": ai_plan.get("ai_response", "")
+    }
+    
+    log.info("plan built", weeks=len(output["plan_30d"]))
+    
+    return (output, meta)
+
+def _error_output(question: str, e: Exception, t0: float) -> Tuple[Dict, Dict]:
+    """Return the fallback plan when execution fails"""
+    log.error("skill navigator execution failed, using fallback plan", error=str(e))
+    fallback = create_fallback_plan(question)
+    meta = {
+        "latency_ms": int((time.time() - t0) * 1000),
+        "citations": ["fallback"],
+        "ai_powered": False,
+        "error": str(e)
+    }
+    return (fallback, meta)
+
+def _question(payload: Dict[str, Any]) -> str:
+    question = payload.get("input", {}).get("question", "").strip()
+    log.info("skillnav question", question_chars=len(question))
     if not question:
         question = "I want to learn new skills for my career development"
+    return question
+
+def execute(payload: Dict[str, Any]) -> Tuple[Dict, Dict]:
+    """Main execution function using RAG and LLM for intelligent responses"""
+    t0 = time.time()
+    question = _question(payload)
     
     try:
-        # Use RAG to retrieve relevant project documentation (limit to 3 for speed)
-        project_docs = retrieve(question, k=3)
-        print(f"🧭 Retrieved {len(project_docs)} project documents")
+        # Use RAG to retrieve relevant project documentation
+        project_docs = retrieve(question, k=PROJECT_K, filter=PROJECT_FILTER)
+        project_context = _project_context(project_docs)
         
-        # Create simplified project context
-        project_context = ""
-        for doc in project_docs[:2]:  # Limit to 2 docs for speed
-            source = doc.metadata.get("source", "")
-            if "projects/" in source:
-                # Take first 500 chars of each doc
-                content = doc.page_content[:500]
-                project_context += f"From {source.split('/')[-1]}: {content}\n\n"
+        # Pick catalog resources relevant to the question
+        resources = select_resources(question)
         
-        # If no project docs found, use a general context
-        if not project_context:
-            project_context = "Focus on practical skills and industry-relevant technologies for software development."
+        # Generate AI-powered learning plan with timeout protection
+        try:
+            ai_plan = generate_ai_learning_plan(question, project_context, resources)
+            log.debug("AI plan generated")
+        except Exception as ai_error:
+            log.warning("AI plan generation failed, using fallback plan", error=str(ai_error))
+            ai_plan = create_fallback_plan(question)
         
-        print(f"🧭 Project context length: {len(project_context)}")
+        return _build_output(ai_plan, project_docs, t0)
+        
+    except Exception as e:
+        return _error_output(question, e, t0)
+
+async def aexecute(payload: Dict[str, Any]) -> Tuple[Dict, Dict]:
+    """Async variant of execute: retrieval and plan generation never block a worker thread"""
+    t0 = time.time()
+    question = _question(payload)
+    
+    try:
+        project_docs = await aretrieve(question, k=PROJECT_K, filter=PROJECT_FILTER)
+        project_context = _project_context(project_docs)
         
-        # Load available resources (limit for performance)
-        resources = load_resources()[:15]
-        print(f"🧭 Loaded {len(resources)} resources")
+        resources = select_resources(question)
         
-        # Generate AI-powered learning plan with timeout protection
         try:
-            ai_plan = generate_ai_learning_plan(question, project_context, resources)
-            print(f"🧭 AI plan generated successfully")
+            ai_plan = await agenerate_ai_learning_plan(question, project_context, resources)
+            log.debug("AI plan generated")
         except Exception as ai_error:
-            print(f"AI generation failed: {ai_error}, using fallback")
+            log.warning("AI plan generation failed, using fallback plan", error=str(ai_error))
             ai_plan = create_fallback_plan(question)
         
-        # Add metadata
-        meta = {
-            "latency_ms": int((time.time() - t0) * 1000),
-            "citations": ["projects documentation", "resources/catalog.csv"],
-            "ai_powered": True,
-            "context_sources": len(project_docs)
-        }
+        return _build_output(ai_plan, project_docs, t0)
         
-        # Structure output
-        output = {
-            "plan_30d": ai_plan.get("plan_30d", []),
-            "citations": meta["citations"],
-            "explainability": ai_plan.get("explanation", "AI-generated plan based on company projects"),
-            "ai_insights": ai_plan.get("ai_response", "")
-        }
+    except Exception as e:
+        return _error_output(question, e, t0)
+
+def render_plan(output: Dict) -> Iterator[str]:
+    """Render a structured plan (e.g. the fallback plan) as readable text"""
+    plan = output.get("plan_30d", [])
+    explainability = output.get("explainability") or output.get("explanation", "AI-generated learning plan")
+    ai_insights = output.get("ai_insights", "")
+    
+    yield f"{explainability}\n\n"
+    
+    for week_plan in plan:
+        week_num = week_plan.get('week', '?')
+        week_title = week_plan.get('title', '')
         
-        print(f"🧭 Output plan has {len(output['plan_30d'])} weeks")
-        print(f"🧭 Explainability: {output['explainability'][:100]}...")
+        if week_title:
+            yield f"Week {week_num}: {week_title}\n"
+        else:
+            yield f"Week {week_num}:\n"
+        
+        # Goals
+        goals = week_plan.get('goals', [])
+        if goals:
+            yield "🎯 Goals:\n"
+            for goal in goals:
+                if isinstance(goal, str):
+                    yield f"  • {goal}\n"
+                else:
+                    yield f"  • {str(goal)}\n"
+        
+        # Technologies
+        technologies = week_plan.get('technologies', [])
+        if technologies:
+            yield f"💻 Key Technologies: {', '.join(technologies)}\n"
+        
+        # Resources
+        resources = week_plan.get('resources', [])
+        if resources:
+            yield "📚 Resources:\n"
+            for res in resources[:3]:  # Limit to 3 resources per week
+                if isinstance(res, str):
+                    yield f"  • {res}\n"
+                elif isinstance(res, dict):
+                    yield f"  • {res.get('title', str(res))}\n"
+                else:
+                    yield f"  • {str(res)}\n"
+        
+        # Projects
+        projects = week_plan.get('projects', [])
+        if projects:
+            yield "🚀 Projects:\n"
+            for project in projects[:2]:  # Limit to 2 projects per week
+                if isinstance(project, str):
+                    yield f"  • {project}\n"
+                else:
+                    yield f"  • {str(project)}\n"
         
-        return (output, meta)
+        # Project connection
+        project_connection = week_plan.get('project_connection', '')
+        if project_connection:
+            yield f"🔗 Project Connection: {project_connection}\n"
         
+        yield "\n"
+    
+    if ai_insights:
+        # Don't truncate AI insights - show full content
+        yield f"🤖 AI Insights:\n{ai_insights}\n"
+
+async def astream(payload: Dict[str, Any]) -> AsyncIterator[str]:
+    """Stream the learning plan as the LLM writes it, falling back to the static plan if it fails to start"""
+    question = _question(payload)
+    
+    try:
+        project_docs = await aretrieve(question, k=PROJECT_K, filter=PROJECT_FILTER)
+        project_context = _project_context(project_docs)
+        resources = select_resources(question)
     except Exception as e:
-        print(f"Error in Skill Navigator execution: {e}")
-        # Return fallback plan immediately
-        fallback = create_fallback_plan(question)
-        meta = {
-            "latency_ms": int((time.time() - t0) * 1000),
-            "citations": ["fallback"],
-            "ai_powered": False,
-            "error": str(e)
-        }
-        return (fallback, meta)
+        log.error("skill navigator stream setup failed, using fallback plan", error=str(e))
+        for line in render_plan(create_fallback_plan(question)):
+            yield line
+        return
+    
+    started = False
+    try:
+        async for token in astream_ai_learning_plan(question, project_context, resources):
+            if not started:
+                yield f"AI-generated learning plan for: {question}\n\n"
+                started = True
+            yield token
+    except Exception as e:
+        log.error("AI plan stream failed", error=str(e), started=started)
+        if started:
+            yield "\n\n(The plan was interrupted. Please try again.)\n"
+            return
+    
+    if not started:
+        for line in render_plan(create_fallback_plan(question)):
+            yield line
 
 # Legacy functions removed - now using AI-powered generation
-
@@ -0,0 +1,99 @@
+"""
+Precompiled index over the learning resource catalog.
+
+The CSV is parsed once into rows plus an inverted tag -> rows index, and only
+re-parsed when the file's mtime changes. Selecting resources for a request is a
+walk over the posting lists of the requested tags, so cost depends on the
+number of matches rather than the catalog size.
+"""
+
+import csv
+import os
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from structured_log import get_logger
+
+log = get_logger(__name__)
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(min|mins|minute|minutes|hr|hrs|hour|hours|h)\b", re.I)
+_LEVELS = {"beginner": 0, "intermediate": 1, "advanced": 2}
+
+
+def _duration_minutes(text: str) -> Optional[int]:
+    m = _DURATION_RE.search(text or "")
+    if not m:
+        return None
+    value = float(m.group(1))
+    return int(value if m.group(2).lower().startswith("m") else value * 60)
+
+
+class CatalogIndex:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self.rows: List[dict] = []
+        self.by_tag: Dict[str, List[int]] = {}
+        if not os.path.exists(path):
+            log.warning("resource catalog not found, no resources will be suggested", path=os.path.abspath(path))
+
+    def _maybe_reload(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            rows, by_tag = [], defaultdict(list)
+            if mtime is None:
+                log.warning("resource catalog removed, no resources will be suggested", path=os.path.abspath(self.path))
+            else:
+                with open(self.path, newline="", encoding="utf-8") as f:
+                    for row in csv.DictReader(f):
+                        row["tags"] = [t.strip().lower() for t in row.get("tags", "").split("|") if t.strip()]
+                        row["duration_min"] = _duration_minutes(row.get("duration", ""))
+                        row["level_rank"] = _LEVELS.get((row.get("level") or "").strip().lower())
+                        for tag in row["tags"]:
+                            by_tag[tag].append(len(rows))
+                        rows.append(row)
+            # Swap in complete structures so readers never see a half-built index
+            self.rows, self.by_tag, self._mtime = rows, dict(by_tag), mtime
+
+    def tags(self) -> set:
+        """Tags that at least one resource carries."""
+        self._maybe_reload()
+        return set(self.by_tag)
+
+    def all(self) -> List[dict]:
+        self._maybe_reload()
+        return self.rows
+
+    def select(self, tags: Iterable[str], limit: int = 15, level: Optional[str] = None) -> List[dict]:
+        """Top resources by number of matching tags, then preferred level, then shorter duration.
+
+        Falls back to the first `limit` rows when no tag matches, so the prompt always has resources.
+        """
+        self._maybe_reload()
+        rows, by_tag = self.rows, self.by_tag
+        scores: Dict[int, int] = defaultdict(int)
+        for tag in {t.lower() for t in tags}:
+            for i in by_tag.get(tag, ()):
+                scores[i] += 1
+        if not scores:
+            return rows[:limit]
+
+        want = _LEVELS.get((level or "").lower())
+
+        def rank(i):
+            row = rows[i]
+            level_gap = abs(row["level_rank"] - want) if want is not None and row["level_rank"] is not None else 0
+            duration = row["duration_min"] if row["duration_min"] is not None else float("inf")
+            return (-scores[i], level_gap, duration, i)
+
+        return [rows[i] for i in sorted(scores, key=rank)[:limit]]
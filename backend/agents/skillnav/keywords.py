@@ -0,0 +1,93 @@
+"""
+Compiled keyword matcher for skill/role extraction.
+
+Keywords are compiled once into a single regex built from a character trie, so
+the alternation never re-scans shared prefixes and matching stays linear in the
+question length even with tens of thousands of terms. Matches are whole-word
+(no "go" inside "good", no "ai" inside "maintain"), including keywords with
+punctuation such as "c++" or "node.js".
+"""
+
+import csv
+import os
+import re
+from typing import Dict, Iterable, List, Tuple
+
+TAXONOMY_PATH = os.path.join(os.path.dirname(__file__), "../..", "data", "skills", "keywords.csv")
+CATALOG_TAGS_PATH = os.path.join(os.path.dirname(__file__), "../..", "data", "skills", "catalog_tags.csv")
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Regex source matching any of `words`, factored on common prefixes."""
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def emit(node) -> str:
+        terminal = "" in node
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch != ""]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # Optional suffix: try the longer keyword first, fall back to the shorter one
+        return f"(?:{body})?" if terminal else body
+
+    return emit(trie)
+
+
+class KeywordMatcher:
+    def __init__(self, pairs: Iterable[Tuple[str, str]]):
+        self._tag: Dict[str, str] = {}
+        self._rank: Dict[str, int] = {}
+        for keyword, tag in pairs:
+            keyword = keyword.strip().lower()
+            if keyword and keyword not in self._tag:
+                self._rank[keyword] = len(self._tag)
+                self._tag[keyword] = tag
+        self._regex = re.compile(r"(?<!\w)(?:" + _trie_pattern(self._tag) + r")(?!\w)") if self._tag else None
+
+    def __len__(self):
+        return len(self._tag)
+
+    def all_tags(self) -> List[str]:
+        """Distinct tags of the taxonomy, in taxonomy order."""
+        return list(dict.fromkeys(self._tag.values()))
+
+    def keywords(self, text: str) -> List[str]:
+        """Distinct keywords found in text, in taxonomy order."""
+        if self._regex is None:
+            return []
+        found = {m.group(0) for m in self._regex.finditer(text.lower())}
+        return sorted(found, key=self._rank.__getitem__)
+
+    def tags(self, text: str) -> List[str]:
+        """Distinct tags of the keywords found in text, in taxonomy order."""
+        out = []
+        for keyword in self.keywords(text):
+            tag = self._tag[keyword]
+            if tag not in out:
+                out.append(tag)
+        return out
+
+
+def load_taxonomy(path: str = TAXONOMY_PATH) -> Dict[str, KeywordMatcher]:
+    """Build one matcher per `kind` column (e.g. tech, role) from the taxonomy CSV."""
+    pairs: Dict[str, List[Tuple[str, str]]] = {}
+    if os.path.exists(path):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                pairs.setdefault(row["kind"].strip(), []).append((row["keyword"], row["tag"].strip()))
+    return {kind: KeywordMatcher(p) for kind, p in pairs.items()}
+
+
+def load_catalog_tags(path: str = CATALOG_TAGS_PATH) -> Dict[str, List[str]]:
+    """Taxonomy tag -> nearest catalog tags, for skills the resource catalog does not tag directly."""
+    mapping: Dict[str, List[str]] = {}
+    if os.path.exists(path):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                mapping[row["tag"].strip().lower()] = [t.strip().lower() for t in row["catalog_tags"].split("|") if t.strip()]
+    return mapping
@@ -1,17 +1,24 @@
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Any, Dict
-import uuid, time, orjson, json
+import asyncio, uuid, time, orjson, json
 from sqlalchemy import text, select, func
 import os
+from pathlib import Path
 
 from settings import settings
-from audit_store import init_db, now_ts, hmac_sha256, preview
-from audit_async import audit_enqueue
-from registry import execute_agent
+from audit_store import now_ts, hmac_sha256, preview
+from audit_async import audit_enqueue, audit_shutdown, audit_stats
+from registry import aexecute_agent, astream_agent
 from orchestrator import route as route_agent
+from warmup import run_warmup, readiness
+import request_metrics
+import metrics
+import structured_log
+
+log = structured_log.get_logger(__name__)
 
 app = FastAPI(title="Aurora API")
 
@@ -34,6 +41,12 @@ async def add_cors_headers(request, call_next):
     response.headers["Access-Control-Allow-Credentials"] = "false"  # Changed to false
     return response
 
+# Added last, so these wrap the middleware above (add_middleware and @app.middleware both prepend)
+# Per-route latency histograms for /metrics (pure ASGI, so streamed bodies are timed to the end)
+app.add_middleware(metrics.HTTPMetricsMiddleware)
+# Outermost: every log line of a request, middleware included, carries its trace_id
+app.add_middleware(structured_log.TraceMiddleware)
+
 class ExecReq(BaseModel):
     agent_id: str
     org_id: str = "demo_org"
@@ -55,58 +68,80 @@ class StreamReq(BaseModel):
     consent: bool = True
 
 @app.on_event("startup")
-def startup():
-    """Application startup with logging"""
-    print("🚀 Aurora Backend starting up...")
-    
-    # Initialize database (this will log dialect info)
-    init_db()
+async def startup():
+    """Application startup: serve liveness immediately, warm up in the background"""
+    log.info("starting up")
     
-    # Initialize vector store with auto-ingestion
-    from rag import initialize_vectorstore_with_auto_ingest
-    initialize_vectorstore_with_auto_ingest()
+    # DB tables, embedding model, vector store / auto-ingest and OpenAI pools; /readyz flips when done
+    app.state.warmup_task = asyncio.create_task(run_warmup())
     
-    print("✅ Aurora Backend startup complete")
+    log.info("accepting connections (warming up)")
+
+@app.on_event("shutdown")
+def shutdown():
+    """Flush queued audit events so a redeploy doesn't lose them"""
+    log.info("shutting down, shipping spooled audit events")
+    audit_shutdown()
+    log.info("audit spool drained", **audit_stats())
 
 @app.get("/healthz")
 def healthz():
     """Health check endpoint for monitoring - returns JSON with DB ping"""
     try:
         # Test database connection
-        from db import engine
-        with engine.connect() as conn:
+        from db import get_engine
+        with get_engine().connect() as conn:
             conn.execute(text("SELECT 1"))
         db_status = "connected"
     except Exception as e:
         error_msg = str(e).lower()
         if "readonly" in error_msg or "read-only" in error_msg:
             db_status = "connected (read-only)"
-            print(f"Database is read-only: {e}")
+            log.warning("database is read-only", error=str(e))
         else:
             db_status = f"error: {str(e)}"
-            print(f"Database connection error: {e}")
+            log.error("database connection error", error=str(e))
     
     # Check vector store status
     try:
         from rag import get_vectorstore_info
         vector_info = get_vectorstore_info()
     except Exception as e:
-        print(f"Vector store check error: {e}")
+        log.error("vector store check failed", error=str(e))
         vector_info = {
             "vector_store": "qdrant",
             "vector_ok": False,
             "vector_docs": 0,
-            "vector_collection": "unknown"
+            "vector_collection": "unknown",
+            "hybrid_active": False
         }
     
+    from semantic_cache import answer_cache
+    from llm_gateway import gateway
+    
     return {
         "ok": True, 
         "env": settings.ENV,
         "database": db_status,
         **vector_info,
+        "semantic_cache": answer_cache.stats(),
+        "audit": audit_stats(),
+        "llm": gateway.stats(),
+        "warmup": readiness(),
         "timestamp": time.time()
     }
 
+@app.get("/metrics")
+def metrics_endpoint():
+    """Prometheus text exposition: request/stage histograms, LLM tokens, audit spool, DB pool, caches"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/readyz")
+def readyz():
+    """Readiness probe: 503 until the warm-up stages have run, then 200 with their timings"""
+    state = readiness()
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
+
 @app.options("/{path:path}")
 async def options_handler(path: str):
     """Handle CORS preflight requests"""
@@ -114,18 +149,27 @@ async def options_handler(path: str):
 
 
 @app.post("/v1/agents/execute")
-def agents_execute(req: ExecReq):
+async def agents_execute(req: ExecReq):
     if not req.consent:
         return {"status":"ok","output":{"answer":"Consent required."},"meta":{}}
-    trace_id = str(uuid.uuid4())
+    trace_id = structured_log.trace_id() or str(uuid.uuid4())
     t0 = time.time()
+    # Token usage, redactions and stage timings recorded by rag, the LLM gateway and the agent
+    accounting = request_metrics.begin()
     try:
-        output, meta = execute_agent(req.agent_id, req.dict())
+        output, meta = await aexecute_agent(req.agent_id, req.dict())
     except KeyError as e:
         raise HTTPException(404, str(e))
+    except Exception:
+        metrics.AGENT_REQUEST_SECONDS.labels(req.agent_id, "error").observe(time.time() - t0)
+        raise
 
     latency_ms = int((time.time()-t0)*1000)
-    meta = {**meta, "agent_id": req.agent_id, "trace_id": trace_id, "latency_ms": latency_ms}
+    outcome = "cache_hit" if meta.get("cache_hit") else "llm_fallback" if meta.get("llm_fallback") else "ok"
+    metrics.AGENT_REQUEST_SECONDS.labels(req.agent_id, outcome).observe(latency_ms / 1000)
+    log.info("agent executed", agent_id=req.agent_id, org_id=req.org_id, outcome=outcome, latency_ms=latency_ms)
+    observed = accounting.snapshot()
+    meta = {**meta, **observed, "agent_id": req.agent_id, "trace_id": trace_id, "latency_ms": latency_ms}
     ans_text = ""
     if isinstance(output, dict):
         ans_text = output.get("answer") or output.get("summary") or orjson.dumps(output).decode()[:400]
@@ -148,38 +192,99 @@ def agents_execute(req: ExecReq):
         "model_params": {"provider": "openai"},
         "index_version": settings.INDEX_VERSION,
         "latency_ms": latency_ms,
-        "tokens_in": 0,
-        "tokens_out": 0,
-        "pii_redactions": 0,
-        "decision_flags": {"routed": True}
+        "tokens_in": observed["usage"]["tokens_in"],
+        "tokens_out": observed["usage"]["tokens_out"],
+        "pii_redactions": observed["pii_redactions"],
+        "cost_usd": observed["cost_usd"],
+        "stage_ms": observed["stages_ms"],
+        "decision_flags": {"routed": True, "cache_hit": bool(meta.get("cache_hit")),
+                           "llm_fallback": bool(meta.get("llm_fallback"))}
     }
+    # The row is serialized by the enqueue itself, so its own cost only reaches the response meta
+    t_audit = time.perf_counter()
     audit_enqueue(event)
+    audit_ms = (time.perf_counter() - t_audit) * 1000
+    request_metrics.record_stage("audit_enqueue", audit_ms)
+    meta["stages_ms"] = {**meta["stages_ms"], "audit_enqueue": round(audit_ms, 2)}
     return {"status":"ok","output":output,"meta":meta}
 
 @app.post("/v1/aurora")
-def aurora_orchestrate(req: OrchestrateReq):
+async def aurora_orchestrate(req: OrchestrateReq):
     if not req.consent:
         return {"status":"ok","output":{"answer":"Consent required."},"meta":{}}
     agent_id = route_agent(req.dict())
-    return agents_execute(ExecReq(agent_id=agent_id, org_id=req.org_id, user_id=req.user_id, input=req.input, consent=req.consent))
+    return await agents_execute(ExecReq(agent_id=agent_id, org_id=req.org_id, user_id=req.user_id, input=req.input, consent=req.consent))
+
+@app.get("/v1/progress/analytics")
+def progress_analytics(org_id: str):
+    """Cohort view for managers: completion rate, overdue by course, attempts distribution."""
+    # Per-org cohort data; admin-only until callers carry an identity to scope it by
+    if os.getenv("ALLOW_ADMIN", "0").strip() != "1":
+        raise HTTPException(status_code=403, detail="Admin access not enabled")
+    try:
+        from agents.progress.analytics import org_analytics
+        return org_analytics(org_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Progress analytics failed: {str(e)}")
 
 @app.get("/admin/audit/count")
 def audit_count():
-    from backend.audit_store import SessionLocal, AuditEvent
-    with SessionLocal() as s:
+    from audit_store import get_session_local, AuditEvent
+    with get_session_local()() as s:
         result = s.execute(select(func.count(AuditEvent.id)))
         return {"count": result.scalar()}
 
+@app.get("/admin/audit/usage")
+def audit_usage(since_hours: float = 24, org_id: str = None):
+    """Requests, tokens, cost, redactions and mean stage latencies per org and agent over a window"""
+    if os.getenv("ALLOW_ADMIN", "0").strip() != "1":
+        raise HTTPException(status_code=403, detail="Admin access not enabled")
+    from audit_store import get_session_local, AuditEvent
+    from request_metrics import STAGES
+    stages = [name for name in STAGES if name != "audit_enqueue"]   # not in the row, see agents_execute
+    stmt = (
+        select(AuditEvent.org_id, AuditEvent.agent_id,
+               func.count(AuditEvent.id), func.sum(AuditEvent.tokens_in), func.sum(AuditEvent.tokens_out),
+               func.sum(AuditEvent.cost_usd), func.sum(AuditEvent.pii_redactions),
+               func.avg(AuditEvent.latency_ms), func.max(AuditEvent.latency_ms),
+               *[func.avg(func.json_extract(AuditEvent.stage_ms, f"$.{name}")) for name in stages])
+        .where(AuditEvent.ts >= now_ts() - since_hours * 3600)
+        .group_by(AuditEvent.org_id, AuditEvent.agent_id)
+    )
+    if org_id:
+        stmt = stmt.where(AuditEvent.org_id == org_id)
+    with get_session_local()() as s:
+        rows = s.execute(stmt).all()
+    return [
+        {"org_id": r[0], "agent_id": r[1], "requests": r[2], "tokens_in": int(r[3] or 0),
+         "tokens_out": int(r[4] or 0), "cost_usd": round(float(r[5] or 0), 6), "pii_redactions": int(r[6] or 0),
+         "avg_latency_ms": round(float(r[7] or 0), 1), "max_latency_ms": r[8],
+         "avg_stage_ms": {name: round(float(v), 2) for name, v in zip(stages, r[9:]) if v is not None}}
+        for r in rows
+    ]
+
 @app.get("/admin/audit/export")
-def audit_export():
-    from backend.audit_store import SessionLocal, AuditEvent
-    with SessionLocal() as s:
-        result = s.execute(select(AuditEvent).order_by(AuditEvent.ts.desc()).limit(500))
-        rows = result.scalars().all()
-        return [
-            {"ts": r.ts, "trace_id": r.trace_id, "agent_id": r.agent_id, "answer_preview": r.answer_preview, "latency_ms": r.latency_ms}
-            for r in rows
-        ]
+def audit_export(format: str = "ndjson", org_id: str = None, agent_id: str = None, user_id: str = None,
+                 since: float = None, until: float = None, after: str = None, limit: int = None,
+                 fields: str = None):
+    """Stream audit rows oldest first as NDJSON or CSV; resume with after=<ts>,<id> of the last row"""
+    if os.getenv("ALLOW_ADMIN", "0").strip() != "1":
+        raise HTTPException(status_code=403, detail="Admin access not enabled")
+    import audit_export as export
+    if format not in export.FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {sorted(export.FORMATS)}")
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be positive")
+    try:
+        cursor = export.parse_cursor(after)
+        columns = export.parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    body = export.stream_export(
+        format, columns, filters={"org_id": org_id, "agent_id": agent_id, "user_id": user_id},
+        since=since, until=until, after=cursor, limit=limit)
+    return StreamingResponse(body, media_type=export.FORMATS[format],
+                             headers={"Content-Disposition": f'attachment; filename="audit_export.{format}"'})
 
 @app.post("/admin/ingest")
 def admin_ingest():
@@ -189,7 +294,7 @@ def admin_ingest():
         raise HTTPException(status_code=403, detail="Admin access not enabled")
     
     try:
-        from rag import ingest_data_corpus, get_document_count
+        from rag import ingest_data_corpus, get_document_count, get_last_ingest_stats
         
         # Get count before ingestion
         count_before = get_document_count()
@@ -197,6 +302,10 @@ def admin_ingest():
         # Run ingestion
         success = ingest_data_corpus()
         
+        # Cached answers may cite chunks that changed
+        from semantic_cache import answer_cache
+        answer_cache.invalidate()
+        
         # Get count after ingestion
         count_after = get_document_count()
         
@@ -205,6 +314,7 @@ def admin_ingest():
             "count_before": count_before,
             "count_after": count_after,
             "documents_added": count_after - count_before if count_after and count_before else "unknown",
+            "changes": get_last_ingest_stats(),
             "message": f"Ingestion completed. Documents: {count_before} → {count_after}"
         }
         
@@ -219,7 +329,7 @@ def admin_reindex():
         raise HTTPException(status_code=403, detail="Admin access not enabled")
     
     try:
-        from rag import ingest_data_corpus, get_document_count
+        from rag import ingest_data_corpus, get_document_count, get_last_ingest_stats
         
         # Force re-initialization of vector store
         from rag import _vectorstore
@@ -228,38 +338,54 @@ def admin_reindex():
         # Run ingestion
         success = ingest_data_corpus()
         
+        # Drop answers generated against the previous index
+        from semantic_cache import answer_cache
+        answer_cache.invalidate()
+        
         # Get new document count
         doc_count = get_document_count()
         
         return {
             "success": success,
             "doc_count": doc_count,
+            "changes": get_last_ingest_stats(),
             "message": f"Reindex completed. Document count: {doc_count}"
         }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Reindex failed: {str(e)}")
 
-def stream_response(text: str):
-    """Stream text token by token for better UX"""
-    words = text.split()
-    for i, word in enumerate(words):
-        if i == 0:
-            yield word
-        else:
-            yield " " + word
-        time.sleep(0.05)  # Small delay for streaming effect
+class ProgressImportReq(BaseModel):
+    path: str   # relative to PROGRESS_IMPORT_DIR
+    org_id: str = "demo_org"
+
+@app.post("/admin/progress/import")
+def admin_progress_import(req: ProgressImportReq):
+    """Admin endpoint to bulk-load an LMS course export into course_assignments."""
+    if os.getenv("ALLOW_ADMIN", "0").strip() != "1":
+        raise HTTPException(status_code=403, detail="Admin access not enabled")
+    # Resolved under the import directory, so a caller cannot read or probe other paths
+    import_dir = Path(settings.PROGRESS_IMPORT_DIR).resolve()
+    path = (import_dir / req.path).resolve()
+    if not path.is_relative_to(import_dir):
+        raise HTTPException(status_code=400, detail="path must be inside the import directory")
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="File not found in the import directory")
+    
+    try:
+        from progress_db import load_courses_csv
+        stats = load_courses_csv(str(path), req.org_id)
+        return {"success": True, **stats}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Progress import failed: {str(e)}")
 
 @app.post("/agents/welcome/stream")
-def welcome_stream(req: StreamReq):
-    """Streaming endpoint for Welcome Agent - matches frontend expectations"""
-    print(f"🌐 Welcome Stream Request - Message: '{req.msg}'")
-    print(f"🌐 Request details - org_id: {req.org_id}, user_id: {req.user_id}, consent: {req.consent}")
-    print(f"🌐 Request type: {type(req)}")
-    print(f"🌐 Request dict: {req.dict()}")
+async def welcome_stream(req: StreamReq):
+    """Streaming endpoint for Welcome Agent - forwards model tokens as they arrive"""
+    # Message text can carry PII: log its size, not its content
+    log.info("welcome stream request", org_id=req.org_id, msg_chars=len(req.msg), consent=req.consent)
     
     if not req.consent:
-        print("❌ Consent not provided - returning error")
         def error_stream():
             yield "Consent required to proceed."
         return StreamingResponse(error_stream(), media_type="text/plain")
@@ -272,28 +398,20 @@ def welcome_stream(req: StreamReq):
         "consent": req.consent
     }
     
-    print(f"🔄 Payload to onboarding agent: {payload}")
-    
-    try:
-        print("🔄 Calling onboarding agent...")
-        output, meta = execute_agent("onboarding", payload)
-        answer = output.get("answer", "I couldn't generate a response.")
-        print(f"✅ Onboarding agent response received (length: {len(answer)} chars)")
-        print(f"📝 Final answer preview: {answer[:200]}...")
-        
-        return StreamingResponse(stream_response(answer), media_type="text/plain")
-    except Exception as e:
-        error_msg = str(e)
-        print(f"❌ Error in welcome stream: {error_msg}")
-        import traceback
-        traceback.print_exc()
-        def error_stream():
+    async def answer_stream():
+        try:
+            async for chunk in astream_agent("onboarding", payload):
+                yield chunk
+        except Exception as e:
+            error_msg = str(e)
+            log.exception("welcome stream failed")
             yield f"Error: {error_msg}"
-        return StreamingResponse(error_stream(), media_type="text/plain")
+    
+    return StreamingResponse(answer_stream(), media_type="text/plain")
 
 @app.post("/agents/skillnav/stream")  
-def skillnav_stream(req: StreamReq):
-    """Streaming endpoint for Skill Navigator Agent"""
+async def skillnav_stream(req: StreamReq):
+    """Streaming endpoint for Skill Navigator Agent - the plan renders while it is generated"""
     if not req.consent:
         def error_stream():
             yield "Consent required to proceed."
@@ -307,90 +425,21 @@ def skillnav_stream(req: StreamReq):
         "consent": req.consent
     }
     
-    try:
-        print(f"🧭 Skill Navigator - Question: '{req.msg}'")
-        output, meta = execute_agent("skillnav", payload)
-        print(f"🧭 Skill Navigator output keys: {list(output.keys())}")
-        
-        # Format the AI-powered plan as readable text
-        plan = output.get("plan_30d", [])
-        explainability = output.get("explainability", "AI-generated learning plan")
-        ai_insights = output.get("ai_insights", "")
-        
-        print(f"🧭 Plan has {len(plan)} weeks")
-        print(f"🧭 Explainability: {explainability[:100]}...")
-        print(f"🧭 AI Insights length: {len(ai_insights)}")
-        
-        def plan_stream():
-            yield f"{explainability}\n\n"
-            
-            for week_plan in plan:
-                week_num = week_plan.get('week', '?')
-                week_title = week_plan.get('title', '')
-                
-                if week_title:
-                    yield f"Week {week_num}: {week_title}\n"
-                else:
-                    yield f"Week {week_num}:\n"
-                
-                # Goals
-                goals = week_plan.get('goals', [])
-                if goals:
-                    yield "🎯 Goals:\n"
-                    for goal in goals:
-                        if isinstance(goal, str):
-                            yield f"  • {goal}\n"
-                        else:
-                            yield f"  • {str(goal)}\n"
-                
-                # Technologies
-                technologies = week_plan.get('technologies', [])
-                if technologies:
-                    yield f"💻 Key Technologies: {', '.join(technologies)}\n"
-                
-                # Resources
-                resources = week_plan.get('resources', [])
-                if resources:
-                    yield "📚 Resources:\n"
-                    for res in resources[:3]:  # Limit to 3 resources per week
-                        if isinstance(res, str):
-                            yield f"  • {res}\n"
-                        elif isinstance(res, dict):
-                            yield f"  • {res.get('title', str(res))}\n"
-                        else:
-                            yield f"  • {str(res)}\n"
-                
-                # Projects
-                projects = week_plan.get('projects', [])
-                if projects:
-                    yield "🚀 Projects:\n"
-                    for project in projects[:2]:  # Limit to 2 projects per week
-                        if isinstance(project, str):
-                            yield f"  • {project}\n"
-                        else:
-                            yield f"  • {str(project)}\n"
-                
-                # Project connection
-                project_connection = week_plan.get('project_connection', '')
-                if project_connection:
-                    yield f"🔗 Project Connection: {project_connection}\n"
-                
-                yield "\n"
-            
-            if ai_insights:
-                # Don't truncate AI insights - show full content
-                yield f"🤖 AI Insights:\n{ai_insights}\n"
-        
-        return StreamingResponse(plan_stream(), media_type="text/plain")
-    except Exception as e:
-        error_msg = str(e)  # Capture the error message
-        def error_stream():
+    async def plan_stream():
+        try:
+            log.info("skillnav stream request", org_id=req.org_id, msg_chars=len(req.msg))
+            async for chunk in astream_agent("skillnav", payload):
+                yield chunk
+        except Exception as e:
+            error_msg = str(e)  # Capture the error message
+            log.exception("skillnav stream failed")
             yield f"Error generating learning plan: {error_msg}\n"
             yield "Please try rephrasing your question or try again later."
-        return StreamingResponse(error_stream(), media_type="text/plain")
+    
+    return StreamingResponse(plan_stream(), media_type="text/plain")
 
 @app.post("/agents/progress/stream")
-def progress_stream(req: StreamReq):
+async def progress_stream(req: StreamReq):
     """Streaming endpoint for Progress Companion Agent"""
     if not req.consent:
         def error_stream():
@@ -405,7 +454,7 @@ def progress_stream(req: StreamReq):
     }
     
     try:
-        output, meta = execute_agent("progress", payload)
+        output, meta = await aexecute_agent("progress", payload)
         summary = output.get("summary", "No progress data available.")
         courses = output.get("courses_completed", [])
         
@@ -416,7 +465,10 @@ def progress_stream(req: StreamReq):
                 response_text += f"✅ {course.get('title', 'Course')}\n"
         response_text += "\nKeep up the great work! 🚀"
         
-        return StreamingResponse(stream_response(response_text), media_type="text/plain")
+        # The summary is computed locally, so send it in one chunk instead of replaying words
+        def summary_stream():
+            yield response_text
+        return StreamingResponse(summary_stream(), media_type="text/plain")
     except Exception as e:
         error_msg = str(e)  # Capture the error message
         def error_stream():
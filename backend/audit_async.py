@@ -1,33 +1,188 @@
-import queue, threading
-from audit_store import SessionLocal, AuditEvent
+import threading, time, uuid
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.exc import DataError, IntegrityError
+from audit_store import get_session_local, AuditEvent
+from audit_spool import AuditSpool
+from settings import settings
+import metrics
+from structured_log import get_logger
 
-_q = queue.Queue(maxsize=10000)
+log = get_logger(__name__)
 
-def _worker():
-    while True:
-        item = _q.get()
-        if item is None:
-            break
+_spool = AuditSpool(
+    settings.AUDIT_SPOOL_DIR,
+    segment_bytes=settings.AUDIT_SPOOL_SEGMENT_BYTES,
+    max_bytes=settings.AUDIT_SPOOL_MAX_BYTES,
+)
+_stop = threading.Event()
+
+# Events carry pre-assigned ids, so a no-op update on the duplicate key makes replaying a partially
+# shipped segment idempotent. Unlike INSERT IGNORE it leaves strict mode on: oversized or malformed
+# values raise instead of being truncated or coerced into the audit trail.
+_insert_stmt = insert(AuditEvent).on_duplicate_key_update(id=AuditEvent.id)
+
+# Errors caused by the rows themselves; retrying the same batch would fail the same way
+_DATA_ERRORS = (DataError, IntegrityError)
+
+_MAX_BACKOFF_S = 30.0
+
+# A multi-row INSERT binds every row to the same columns; events spooled before a column existed get NULL
+_COLUMNS = tuple(c.name for c in AuditEvent.__table__.columns)
+
+_FLUSH_SECONDS = metrics.histogram("audit_flush_duration_seconds",
+                                   "Multi-row INSERT + commit of one audit batch.")
+
+_stats_lock = threading.Lock()
+_stats = {
+    "written": 0,
+    "discarded": 0,
+    "dead_lettered": 0,
+    "ship_errors": 0,
+    "flushes": 0,
+    "last_batch_size": 0,
+    "last_flush_ms": 0.0,
+    "max_flush_ms": 0.0,
+    "total_flush_ms": 0.0,
+    "last_error": "",
+}
+
+def _is_readonly_error(e: Exception) -> bool:
+    error_msg = str(e).lower()
+    return "readonly" in error_msg or "read-only" in error_msg or "permission denied" in error_msg
+
+def _flush(batch):
+    """Write a batch with a single multi-row INSERT and one commit."""
+    t0 = time.perf_counter()
+    try:
+        with get_session_local()() as s:
+            s.execute(_insert_stmt, batch)
+            s.commit()
+    finally:
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        _FLUSH_SECONDS.observe(elapsed_ms / 1000)
+        with _stats_lock:
+            _stats["flushes"] += 1
+            _stats["last_batch_size"] = len(batch)
+            _stats["last_flush_ms"] = round(elapsed_ms, 2)
+            _stats["max_flush_ms"] = round(max(_stats["max_flush_ms"], elapsed_ms), 2)
+            _stats["total_flush_ms"] += elapsed_ms
+
+def _flush_or_dead_letter(batch) -> int:
+    """Flush a batch; if the database rejects its data, flush row by row and dead-letter the bad rows.
+
+    Returns the number of events dead-lettered.
+    """
+    try:
+        _flush(batch)
+        return 0
+    except _DATA_ERRORS as e:
+        if len(batch) == 1:
+            rejected = [(batch[0], e)]
+        else:
+            rejected = []
+            for event in batch:
+                try:
+                    _flush([event])
+                except _DATA_ERRORS as row_error:
+                    rejected.append((event, row_error))
+    for event, error in rejected:
+        _spool.dead_letter(event, str(error)[:500])
+        log.error("audit event rejected by the database, dead-lettered", event_id=event.get("id"),
+                  error=str(error)[:200])
+    with _stats_lock:
+        _stats["dead_lettered"] += len(rejected)
+    return len(rejected)
+
+def _ship_pending() -> bool:
+    """Drain sealed segments to MySQL in order. Returns False if the database is unavailable."""
+    for path in _spool.closed_segments():
+        events = [{name: event.get(name) for name in _COLUMNS} for event in _spool.read_segment(path)]
+        rejected = 0
         try:
-            with SessionLocal() as s:
-                s.add(AuditEvent(**item))
-                s.commit()
+            for i in range(0, len(events), settings.AUDIT_BATCH_SIZE):
+                rejected += _flush_or_dead_letter(events[i:i + settings.AUDIT_BATCH_SIZE])
         except Exception as e:
-            error_msg = str(e).lower()
-            if "readonly" in error_msg or "read-only" in error_msg or "permission denied" in error_msg:
-                # Silently skip audit logging for read-only databases
-                print("⚠️  Skipping audit log due to read-only database")
-            else:
-                # Log other errors for debugging
-                print(f"Audit logging error: {e}")
-        finally:
-            _q.task_done()
+            if _is_readonly_error(e):
+                # Nothing will ever be writable, so don't let the spool fill up behind it
+                log.warning("database is read-only, discarding audit segment", events=len(events))
+                with _stats_lock:
+                    _stats["discarded"] += len(events)
+                _spool.remove(path)
+                continue
+            with _stats_lock:
+                _stats["ship_errors"] += 1
+                _stats["last_error"] = str(e)[:200]
+            log.error("audit shipping failed, keeping segment for replay", segment=path.name, error=str(e))
+            return False
+        with _stats_lock:
+            _stats["written"] += len(events) - rejected
+        _spool.remove(path)
+    return True
+
+def _worker():
+    interval = settings.AUDIT_FLUSH_MS / 1000.0
+    backoff, next_ship = interval, 0.0
+    while not _stop.wait(interval):
+        if time.monotonic() < next_ship:
+            # Backing off while MySQL is down: keep sealing full segments so appends never have to
+            if _spool.is_full():
+                _spool.rotate()
+            continue
+        _spool.rotate()
+        if _ship_pending():
+            backoff, next_ship = interval, 0.0
+        else:
+            # Back off while MySQL is down; events keep accumulating on disk
+            backoff = min(max(backoff * 2, 1.0), _MAX_BACKOFF_S)
+            next_ship = time.monotonic() + backoff
+    # Final drain on shutdown
+    _spool.rotate()
+    _ship_pending()
 
 _thread = threading.Thread(target=_worker, daemon=True)
 _thread.start()
 
 def audit_enqueue(event: dict):
-    try:
-        _q.put_nowait(event)
-    except queue.Full:
-        pass
+    # Assign the primary key up front so replays and bulk inserts are idempotent
+    event.setdefault("id", str(uuid.uuid4()))
+    _spool.append(event)
+
+def audit_shutdown(timeout: float = 10.0):
+    """Seal the spool and ship what's left. Unshipped segments stay on disk for the next start."""
+    if not _thread.is_alive():
+        return
+    _stop.set()
+    _thread.join(timeout)
+    if _thread.is_alive():
+        log.warning("audit shipper did not finish, remaining events stay spooled", timeout_s=timeout)
+
+def _collect():
+    stats = audit_stats()
+    gauges = (("spool_bytes", "Bytes of audit events spooled on disk, not yet shipped."),
+              ("spool_segments", "Audit spool segments on disk."),
+              ("spool_lag_s", "Age in seconds of the oldest unshipped audit segment."))
+    counters = (("spooled", "Audit events appended to the spool."),
+                ("dropped", "Audit events dropped because the spool was full."),
+                ("written", "Audit events written to the database."),
+                ("discarded", "Audit events discarded because the database is read-only."),
+                ("dead_lettered", "Audit events the database rejected as invalid, kept in dead-letter.ndjson."),
+                ("ship_errors", "Failed attempts to ship the audit spool."))
+    for key, help in gauges:
+        yield f"audit_{key}", "gauge", help, [({}, stats[key])]
+    for key, help in counters:
+        yield f"audit_{key}", "counter", help, [({}, stats[key])]
+
+metrics.register_collector("audit", _collect)
+
+def audit_stats() -> dict:
+    """Backpressure metrics: spool size and lag, drops and flush latency."""
+    with _stats_lock:
+        stats = dict(_stats)
+    flushes = stats.pop("flushes")
+    total_ms = stats.pop("total_flush_ms")
+    return {
+        **_spool.stats(),
+        "flushes": flushes,
+        "avg_flush_ms": round(total_ms / flushes, 2) if flushes else 0.0,
+        **stats,
+    }
@@ -0,0 +1,139 @@
+"""
+Append-only local spool for audit events.
+
+Events are appended as NDJSON lines to the active segment file; the shipper in
+audit_async rotates the active segment on each tick and drains closed segments
+to MySQL, deleting each one only after it has been committed. append() runs on
+the event loop, so it only writes the line: opening the next segment and the
+fsync + close of the sealed one happen in rotate(), on the shipper thread and
+outside the lock.
+Anything left on disk after a crash or a database outage is replayed on the
+next tick or the next start. Total disk usage is capped; once the cap is hit new
+events are counted as dropped instead of growing the spool without bound.
+Events the database rejects as invalid go to dead-letter.ndjson for inspection.
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import orjson
+
+
+class AuditSpool:
+    def __init__(self, directory: str, segment_bytes: int, max_bytes: int):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._active = None  # open file object of the segment being appended to
+        self._active_path: Optional[Path] = None
+        self._active_size = 0
+
+        existing = self._segments()
+        self._seq = max((self._seq_of(p) for p in existing), default=0)
+        self._bytes = sum(p.stat().st_size for p in existing)
+        self.appended = 0
+        self.dropped = 0
+
+    @staticmethod
+    def _seq_of(path: Path) -> int:
+        return int(path.stem.split("-")[1])
+
+    @staticmethod
+    def _created_of(path: Path) -> float:
+        return int(path.stem.split("-")[2]) / 1000.0
+
+    def _segments(self) -> List[Path]:
+        return sorted(self.directory.glob("seg-*.ndjson"), key=self._seq_of)
+
+    def _new_segment(self):
+        self._seq += 1
+        path = self.directory / f"seg-{self._seq:012d}-{int(time.time() * 1000)}.ndjson"
+        return open(path, "ab"), path
+
+    def append(self, event: Dict[str, Any]) -> bool:
+        """Append one event. Returns False if the spool is full and the event was dropped."""
+        line = orjson.dumps(event, option=orjson.OPT_APPEND_NEWLINE)
+        with self._lock:
+            if self._bytes + len(line) > self.max_bytes:
+                self.dropped += 1
+                return False
+            if self._active is None:
+                self._active, self._active_path = self._new_segment()
+            self._active.write(line)
+            # Hand the line to the OS so a process crash doesn't lose it; fsync is batched in rotate()
+            self._active.flush()
+            self._active_size += len(line)
+            self._bytes += len(line)
+            self.appended += 1
+            return True
+
+    def is_full(self) -> bool:
+        return self._active_size >= self.segment_bytes
+
+    def rotate(self):
+        """Seal the active segment so the shipper can pick it up (shipper thread only).
+
+        The next segment is opened before, and the sealed one fsynced after, the lock is
+        held, so a concurrent append waits for a pointer swap rather than for the disk.
+        """
+        if self._active_size == 0:
+            return
+        new_file, new_path = self._new_segment()
+        with self._lock:
+            sealed = self._active
+            self._active, self._active_path = new_file, new_path
+            self._active_size = 0
+        if sealed is not None:
+            sealed.flush()
+            os.fsync(sealed.fileno())
+            sealed.close()
+
+    def closed_segments(self) -> List[Path]:
+        with self._lock:
+            active = self._active_path
+        return [p for p in self._segments() if p != active]
+
+    @staticmethod
+    def read_segment(path: Path) -> List[Dict[str, Any]]:
+        events = []
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    events.append(orjson.loads(line))
+                except orjson.JSONDecodeError:
+                    # Torn trailing line from a crash mid-write
+                    continue
+        return events
+
+    def dead_letter(self, event: Dict[str, Any], error: str):
+        """Set aside an event the database rejects as invalid, so it cannot block the segments behind it."""
+        line = orjson.dumps({"error": error, "event": event}, option=orjson.OPT_APPEND_NEWLINE)
+        with open(self.directory / "dead-letter.ndjson", "ab") as f:
+            f.write(line)
+
+    def remove(self, path: Path):
+        size = path.stat().st_size
+        path.unlink()
+        with self._lock:
+            self._bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        segments = self._segments()
+        if self._active_size == 0:
+            # rotate() opens the next segment ahead of time; an empty one is not backlog
+            segments = [p for p in segments if p != self._active_path]
+        lag_s = round(time.time() - self._created_of(segments[0]), 3) if segments else 0.0
+        return {
+            "spool_dir": str(self.directory),
+            "spool_segments": len(segments),
+            "spool_bytes": self._bytes,
+            "spool_max_bytes": self.max_bytes,
+            "spool_lag_s": lag_s,
+            "spooled": self.appended,
+            "dropped": self.dropped,
+        }
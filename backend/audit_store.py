@@ -1,9 +1,12 @@
 import uuid, hmac, hashlib, orjson
 from datetime import datetime, timezone
-from sqlalchemy import Column, String, Integer, Boolean, JSON, Text, Float
+from sqlalchemy import Column, String, Integer, BigInteger, Boolean, JSON, Text, Float, Date, Index, UniqueConstraint
 from settings import settings
-# Import from the centralized database configuration
-from db import engine, SessionLocal, Base
+# Import from the centralized database configuration (engine is created on first use)
+from db import get_engine, get_session_local, Base
+from structured_log import get_logger
+
+log = get_logger(__name__)
 
 class AuditEvent(Base):
     __tablename__ = "audit_events"
@@ -28,20 +31,53 @@ class AuditEvent(Base):
     tokens_in = Column(Integer)
     tokens_out = Column(Integer)
     pii_redactions = Column(Integer)
+    cost_usd = Column(Float)
+    stage_ms = Column(JSON)   # per-stage latency: embed, vector_search, prompt_build, llm_first_token, llm_total, ...
     decision_flags = Column(JSON)
 
+class CourseAssignment(Base):
+    """One assigned learning module per (org, user, course); fed by progress_db.load_courses_csv."""
+    __tablename__ = "course_assignments"
+    __table_args__ = (
+        UniqueConstraint("org_id", "user_id", "course", name="uq_course_assignments_user_course"),
+        # The Progress agent's per-request lookup is a prefix of this index
+        Index("ix_course_assignments_user_status_due", "org_id", "user_id", "status", "due"),
+    )
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    org_id = Column(String(64), nullable=False)
+    user_id = Column(String(64), nullable=False)
+    course = Column(String(255), nullable=False)
+    status = Column(String(32), nullable=False)
+    due = Column(Date)
+    attempts = Column(Integer, default=0)
+    updated_ts = Column(Float)
+
+def _add_missing_columns(engine, model):
+    """create_all never alters an existing table; add columns introduced since it was created."""
+    from sqlalchemy import inspect, text
+    table = model.__table__
+    existing = {c["name"] for c in inspect(engine).get_columns(table.name)}
+    for column in table.columns:
+        if column.name not in existing:
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=engine.dialect)}"
+            with engine.begin() as conn:
+                conn.execute(text(ddl))
+            log.info("added column", table=table.name, column=column.name)
+
 def init_db():
     """Initialize database tables. Gracefully handles read-only databases."""
     try:
+        engine = get_engine()
         Base.metadata.create_all(bind=engine)
-        print("✅ Database tables created successfully")
+        _add_missing_columns(engine, AuditEvent)
+        log.info("database tables created")
     except Exception as e:
         error_msg = str(e).lower()
         if "readonly" in error_msg or "read-only" in error_msg or "permission denied" in error_msg:
-            print("⚠️  Database is read-only - skipping table creation")
-            print("   This is normal for cloud database services with restricted access")
+            # Normal for cloud database services with restricted access
+            log.warning("database is read-only, skipping table creation")
         else:
-            print(f"❌ Database initialization failed: {e}")
+            log.error("database initialization failed", error=str(e))
             raise
 
 def now_ts():
@@ -0,0 +1,101 @@
+"""
+Concurrent-request throughput benchmark for the sync vs async request path.
+
+Two modes:
+  - simulate (default): builds an in-process FastAPI app with a sync `def` handler and
+    an `async def` handler that both wait on a simulated LLM round trip, and drives
+    them through httpx's ASGI transport. This isolates the threadpool ceiling
+    (anyio's default of 40 tokens) from network and model noise.
+  - --url: fires requests at a running Aurora instance, e.g. before and after
+    deploying the async path, against /v1/agents/execute.
+
+Usage (from backend/):
+    python benchmarks/bench_async_load.py --requests 400 --concurrency 200 --latency 0.5
+    python benchmarks/bench_async_load.py --url http://localhost:7860 --agent onboarding
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def _simulated_app(latency: float):
+    from fastapi import FastAPI
+
+    app = FastAPI()
+
+    @app.post("/sync")
+    def sync_handler():
+        # Same shape as the old handlers: the worker thread blocks on the LLM call
+        time.sleep(latency)
+        return {"status": "ok"}
+
+    @app.post("/async")
+    async def async_handler():
+        await asyncio.sleep(latency)
+        return {"status": "ok"}
+
+    return app
+
+
+async def _drive(client: httpx.AsyncClient, path: str, body: dict, total: int, concurrency: int):
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with sem:
+            t0 = time.perf_counter()
+            r = await client.post(path, json=body)
+            r.raise_for_status()
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return {
+        "requests": total,
+        "elapsed_s": round(elapsed, 2),
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p99_ms": round(p99 * 1000, 1),
+    }
+
+
+async def _simulate(args):
+    app = _simulated_app(args.latency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for label, path in (("before (sync def + threadpool)", "/sync"), ("after (async def)", "/async")):
+            result = await _drive(client, path, {}, args.requests, args.concurrency)
+            print(f"{label:32s} {result}")
+
+
+async def _live(args):
+    body = {"agent_id": args.agent, "input": {"question": args.question}}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, timeout=None, limits=limits) as client:
+        result = await _drive(client, "/v1/agents/execute", body, args.requests, args.concurrency)
+        print(f"{args.url} agent={args.agent:12s} {result}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.5, help="simulated LLM latency in seconds")
+    parser.add_argument("--url", help="benchmark a running server instead of the simulation")
+    parser.add_argument("--agent", default="onboarding")
+    parser.add_argument("--question", default="How many days of annual leave do I get?")
+    args = parser.parse_args()
+
+    asyncio.run(_live(args) if args.url else _simulate(args))
+
+
+if __name__ == "__main__":
+    main()
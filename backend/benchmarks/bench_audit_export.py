@@ -0,0 +1,97 @@
+"""
+Throughput and memory of the streaming audit export.
+
+Inserts --rows synthetic audit events for a throwaway org, then drains
+audit_export.stream_export for that org as NDJSON and CSV, reporting rows/s,
+MB/s and the peak Python heap (tracemalloc) while streaming. For comparison,
+it also loads the same rows as ORM objects into one list, which is what the
+old JSON-array endpoint did (it stopped at 500 rows). The streaming peak
+should stay flat as --rows grows, while the ORM load grows with it. Needs
+AURORA_DB_URL pointing at MySQL. The benchmark org's rows are deleted
+afterwards unless --keep is given.
+
+Usage (from backend/):
+    python benchmarks/bench_audit_export.py --rows 200000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import delete, insert, select
+
+import audit_export
+from audit_store import AuditEvent, get_engine, get_session_local
+
+
+def seed(org_id: str, rows: int, batch: int = 5000):
+    rng = random.Random(0)
+    t_start = time.time() - rows
+    with get_engine().begin() as conn:
+        for start in range(0, rows, batch):
+            conn.execute(insert(AuditEvent), [
+                dict(id=str(uuid.uuid4()), ts=t_start + i + rng.random(), env="bench", org_id=org_id,
+                     user_id=f"u{rng.randrange(5000)}", agent_id=rng.choice(["onboarding", "skillnav", "progress"]),
+                     action="execute", question="How many leave days do I get in my first year?",
+                     retrieved_docs=[{"source": "leave_policy.md", "chunk": 3}], answer_preview="x" * 300,
+                     latency_ms=rng.randrange(2000), tokens_in=900, tokens_out=120,
+                     stage_ms={"embed": 4.1, "vector_search": 2.3, "llm_total": 850.0})
+                for i in range(start, min(start + batch, rows))
+            ])
+
+
+def measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--keep", action="store_true", help="leave the benchmark rows in the table")
+    args = parser.parse_args()
+
+    org_id = f"bench-{uuid.uuid4().hex[:8]}"
+    t0 = time.perf_counter()
+    seed(org_id, args.rows)
+    print(f"seeded {args.rows} rows in {time.perf_counter() - t0:.1f}s "
+          f"(page {audit_export.settings.AUDIT_EXPORT_PAGE_ROWS}, fetch {audit_export.settings.AUDIT_EXPORT_FETCH_ROWS})")
+
+    try:
+        columns = list(audit_export.COLUMNS)
+        for fmt in ("ndjson", "csv"):
+            def drain():
+                written = 0
+                for chunk in audit_export.stream_export(fmt, columns, filters={"org_id": org_id}):
+                    written += len(chunk)
+                return written
+
+            size, seconds, peak = measure(drain)
+            print(f"stream {fmt:6s}: {args.rows / seconds:9.0f} rows/s  {size / 1e6 / seconds:6.1f} MB/s  "
+                  f"peak heap {peak:7.1f} MB")
+
+        def load_all():
+            with get_session_local()() as s:
+                return len(s.execute(select(AuditEvent).where(AuditEvent.org_id == org_id)
+                                     .order_by(AuditEvent.ts)).scalars().all())
+
+        n, seconds, peak = measure(load_all)
+        print(f"ORM list     : {n / seconds:9.0f} rows/s                 peak heap {peak:7.1f} MB")
+    finally:
+        if not args.keep:
+            with get_engine().begin() as conn:
+                conn.execute(delete(AuditEvent).where(AuditEvent.org_id == org_id))
+
+
+if __name__ == "__main__":
+    main()
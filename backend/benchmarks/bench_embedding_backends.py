@@ -0,0 +1,144 @@
+"""
+Throughput, latency, memory and recall of the embedding backends.
+
+Each backend runs in a fresh subprocess (so peak RSS and import cost are its
+own) and embeds the same corpus - chunks of the files under --data-dir, topped
+up with synthetic sentences - plus a set of queries. Reported per backend:
+load time, docs/sec, single-query p50/p99, peak RSS, mean cosine to the
+baseline's vectors and recall@k of the baseline's nearest neighbours.
+
+Usage (from backend/):
+    python benchmarks/bench_embedding_backends.py --backends torch,onnx,onnx-int8,numpy
+    python benchmarks/bench_embedding_backends.py --baseline onnx --backends onnx,numpy --docs 2000
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_WORDS = ("policy leave onboarding security laptop access training manager payroll benefits python "
+          "data privacy compliance project deadline mentor review expense travel holiday team").split()
+
+
+def corpus(data_dir: str, n_docs: int, n_queries: int, seed: int = 0):
+    rng = random.Random(seed)
+    docs = []
+    for path in sorted(Path(data_dir).rglob("*")):
+        if path.suffix in (".md", ".txt"):
+            text = path.read_text(encoding="utf-8", errors="ignore")
+            docs.extend(text[i:i + 800] for i in range(0, len(text), 800))
+    while len(docs) < n_docs:
+        docs.append(" ".join(rng.choice(_WORDS) for _ in range(rng.randint(20, 120))))
+    queries = [" ".join(rng.choice(_WORDS) for _ in range(rng.randint(3, 12))) + "?" for _ in range(n_queries)]
+    return docs[:n_docs], queries
+
+
+def worker(backend: str, model: str, out_dir: str):
+    with open(os.path.join(out_dir, "input.json"), encoding="utf-8") as f:
+        data = json.load(f)
+    from embedding_backends import create_embeddings
+
+    t0 = time.perf_counter()
+    emb = create_embeddings(model, backend)
+    emb.embed_query("warm-up")
+    load_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    docs = np.asarray(emb.embed_documents(data["docs"]), dtype=np.float32)
+    docs_s = time.perf_counter() - t0
+
+    latencies, queries = [], []
+    for q in data["queries"]:
+        t0 = time.perf_counter()
+        queries.append(emb.embed_query(q))
+        latencies.append(time.perf_counter() - t0)
+
+    np.save(os.path.join(out_dir, f"{backend}.docs.npy"), docs)
+    np.save(os.path.join(out_dir, f"{backend}.queries.npy"), np.asarray(queries, dtype=np.float32))
+    ms = np.asarray(latencies) * 1000
+    stats = {
+        "load_s": load_s,
+        "docs_per_s": len(data["docs"]) / docs_s,
+        "query_p50_ms": float(np.percentile(ms, 50)),
+        "query_p99_ms": float(np.percentile(ms, 99)),
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "dim": int(docs.shape[1]),
+    }
+    with open(os.path.join(out_dir, f"{backend}.json"), "w") as f:
+        json.dump(stats, f)
+
+
+def _unit(m):
+    return m / np.clip(np.linalg.norm(m, axis=1, keepdims=True), 1e-12, None)
+
+
+def recall_at_k(base_docs, base_q, docs, queries, k):
+    truth = np.argsort(-(_unit(base_q) @ _unit(base_docs).T), axis=1)[:, :k]
+    got = np.argsort(-(_unit(queries) @ _unit(docs).T), axis=1)[:, :k]
+    return float(np.mean([len(set(t) & set(g)) / k for t, g in zip(truth, got)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.getenv("EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2"))
+    parser.add_argument("--backends", default="torch,onnx,onnx-int8,numpy")
+    parser.add_argument("--baseline", default="torch")
+    parser.add_argument("--data-dir", default=os.path.join(BACKEND_DIR, "data"))
+    parser.add_argument("--docs", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.model, args.out)
+        return
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    if args.baseline not in backends:
+        backends.insert(0, args.baseline)
+    docs, queries = corpus(args.data_dir, args.docs, args.queries)
+
+    with tempfile.TemporaryDirectory() as out:
+        with open(os.path.join(out, "input.json"), "w", encoding="utf-8") as f:
+            json.dump({"docs": docs, "queries": queries}, f)
+        results = {}
+        for backend in backends:
+            proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", backend,
+                                   "--model", args.model, "--out", out], cwd=BACKEND_DIR)
+            if proc.returncode != 0:
+                print(f"⚠️  {backend}: failed (exit {proc.returncode})")
+                continue
+            with open(os.path.join(out, f"{backend}.json")) as f:
+                results[backend] = json.load(f)
+            results[backend]["docs"] = np.load(os.path.join(out, f"{backend}.docs.npy"))
+            results[backend]["queries"] = np.load(os.path.join(out, f"{backend}.queries.npy"))
+
+    base = results.get(args.baseline)
+    print(f"\n{len(docs)} docs, {len(queries)} queries, baseline={args.baseline}")
+    print(f"{'backend':10s} {'dim':>4s} {'load s':>7s} {'docs/s':>8s} {'q p50 ms':>9s} {'q p99 ms':>9s} "
+          f"{'RSS MB':>7s} {'cos':>7s} {f'R@{args.k}':>6s}")
+    for backend, r in results.items():
+        cos = recall = float("nan")
+        if base is not None and r["dim"] == base["dim"]:
+            cos = float(np.mean(np.sum(_unit(r["docs"]) * _unit(base["docs"]), axis=1)))
+            recall = recall_at_k(base["docs"], base["queries"], r["docs"], r["queries"], args.k)
+        print(f"{backend:10s} {r['dim']:4d} {r['load_s']:7.2f} {r['docs_per_s']:8.1f} {r['query_p50_ms']:9.2f} "
+              f"{r['query_p99_ms']:9.2f} {r['rss_mb']:7.0f} {cos:7.4f} {recall:6.3f}")
+
+
+if __name__ == "__main__":
+    main()
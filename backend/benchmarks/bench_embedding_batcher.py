@@ -0,0 +1,113 @@
+"""
+Query-embedding throughput and latency with and without cross-request micro-batching.
+
+At each concurrency level, that many clients embed distinct queries back to back -
+as threads calling embed_query (the sync retrieve path) or as asyncio tasks
+calling aembed_query (aretrieve). Runs once against the bare model, where every
+call is its own forward pass, and once through EmbeddingBatcher. Reported per
+run: embeddings/sec, p50/p99 latency per call and the mean batch size formed.
+
+Usage (from backend/):
+    python benchmarks/bench_embedding_batcher.py --backend onnx --concurrency 1,4,16,64
+    python benchmarks/bench_embedding_batcher.py --mode async --max-batch 64 --max-wait-ms 2
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from embedding_backends import create_embeddings  # noqa: E402
+from embedding_batcher import EmbeddingBatcher  # noqa: E402
+
+_WORDS = ("policy leave onboarding security laptop access training manager payroll benefits python "
+          "data privacy compliance project deadline mentor review expense travel holiday team").split()
+
+
+def make_queries(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(_WORDS) for _ in range(rng.randint(3, 14))) + "?" for _ in range(n)]
+
+
+def run_threads(model, queries, concurrency):
+    latencies, lock = [], threading.Lock()
+    work = iter(queries)
+
+    def client():
+        while True:
+            with lock:
+                q = next(work, None)
+            if q is None:
+                return
+            t0 = time.perf_counter()
+            model.embed_query(q)
+            elapsed = time.perf_counter() - t0
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - t0, latencies
+
+
+def run_async(model, queries, concurrency):
+    async def main():
+        latencies, work = [], iter(queries)
+
+        async def client():
+            for q in work:
+                t0 = time.perf_counter()
+                await model.aembed_query(q)
+                latencies.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return time.perf_counter() - t0, latencies
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.getenv("EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2"))
+    parser.add_argument("--backend", default=os.getenv("EMBED_BACKEND", "torch"))
+    parser.add_argument("--mode", choices=("threads", "async"), default="threads")
+    parser.add_argument("--concurrency", default="1,4,16,64")
+    parser.add_argument("--queries", type=int, default=512, help="queries per run")
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    model = create_embeddings(args.model, args.backend)
+    model.embed_documents(["warm-up"] * 8)
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    run = run_threads if args.mode == "threads" else run_async
+
+    print(f"{args.backend} • {args.mode} • {args.queries} queries per run • "
+          f"max_batch={args.max_batch} max_wait={args.max_wait_ms}ms")
+    print(f"{'conc':>5s} {'path':8s} {'emb/s':>9s} {'p50 ms':>8s} {'p99 ms':>8s} {'batch':>6s}")
+    for concurrency in levels:
+        queries = make_queries(args.queries, seed=concurrency)
+        batcher = EmbeddingBatcher(model, args.max_batch, args.max_wait_ms)
+        for name, embedder in (("direct", model), ("batched", batcher)):
+            elapsed, latencies = run(embedder, queries, concurrency)
+            ms = np.asarray(latencies) * 1000
+            mean_batch = batcher.stats()["mean_batch"] if embedder is batcher else 1.0
+            print(f"{concurrency:5d} {name:8s} {len(queries) / elapsed:9.1f} {np.percentile(ms, 50):8.2f} "
+                  f"{np.percentile(ms, 99):8.2f} {mean_batch:6.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Import-time benchmark for the API entry point, to keep cold start from regressing.
+
+Runs `python -X importtime -c "import app"` in fresh interpreters, reports the
+median cumulative import time and the slowest top-level packages, and fails
+(exit 1) if a heavy dependency that should load lazily is imported by `app`
+or the time exceeds --budget-ms.
+
+Usage (from backend/):
+    python benchmarks/bench_import_time.py --runs 5 --budget-ms 1500
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Must only be imported on first use / by the startup warm-up, never by `import app`
+DEFERRED = ("torch", "sentence_transformers", "transformers", "langchain_huggingface",
+            "langchain_community", "langchain_qdrant", "qdrant_client", "openai", "numpy")
+
+_LINE_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure(module: str):
+    """One fresh interpreter: {top-level package: cumulative us}, total us, and every module imported."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=BACKEND_DIR, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    packages, modules, total = {}, set(), 0
+    for line in proc.stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if not m:
+            continue
+        cumulative, depth, name = int(m.group(2)), len(m.group(3)) // 2, m.group(4)
+        modules.add(name)
+        if name == module:
+            total = cumulative
+        elif depth == 1:
+            root = name.split(".")[0]
+            packages[root] = packages.get(root, 0) + cumulative
+    return packages, total, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    totals, runs = [], []
+    for _ in range(args.runs):
+        packages, total, modules = measure(args.module)
+        totals.append(total / 1000)
+        runs.append(packages)
+
+    median = statistics.median(totals)
+    print(f"import {args.module}: median {median:.0f} ms over {args.runs} runs "
+          f"(min {min(totals):.0f}, max {max(totals):.0f})")
+    last = runs[-1]
+    for name, us in sorted(last.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"  {name:30s} {us / 1000:8.1f} ms")
+
+    failed = False
+    leaked = sorted(name for name in modules if name.split(".")[0] in DEFERRED and "." not in name)
+    if leaked:
+        print(f"❌ Eagerly imported heavy dependencies: {', '.join(leaked)}")
+        failed = True
+    if args.budget_ms is not None and median > args.budget_ms:
+        print(f"❌ Import time {median:.0f} ms exceeds budget {args.budget_ms:.0f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Microbenchmark for the skill keyword matcher against the old substring scan.
+
+Builds synthetic taxonomies (default 10k terms, a mix of single words and
+two-word phrases) and times matching questions of increasing length. The trie
+regex should stay roughly linear in question length and flat in taxonomy size;
+the naive scan grows with both.
+
+Usage (from backend/):
+    python benchmarks/bench_keyword_matcher.py --terms 10000
+"""
+
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agents.skillnav.keywords import KeywordMatcher
+
+
+def _word(rng, n):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(n))
+
+
+def _taxonomy(rng, terms):
+    words = set()
+    while len(words) < terms:
+        w = _word(rng, rng.randint(3, 10))
+        if rng.random() < 0.3:
+            w += " " + _word(rng, rng.randint(3, 8))
+        words.add(w)
+    return [(w, w.split()[0]) for w in words]
+
+
+def _time(fn, text, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(text)
+    return (time.perf_counter() - t0) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--terms", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    pairs = _taxonomy(rng, args.terms)
+    vocab = [k for k, _ in pairs]
+
+    t0 = time.perf_counter()
+    matcher = KeywordMatcher(pairs)
+    print(f"compiled {len(matcher)} terms in {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    def naive(text):
+        lower = text.lower()
+        return [tag for keyword, tag in pairs if keyword in lower]
+
+    print(f"{'question words':>15} {'matcher us':>12} {'naive us':>12}")
+    for n_words in (10, 50, 200, 1000):
+        words = [rng.choice(vocab) if rng.random() < 0.1 else _word(rng, rng.randint(2, 9)) for _ in range(n_words)]
+        text = " ".join(words)
+        print(f"{n_words:>15} {_time(matcher.tags, text, args.repeat):>12.1f} "
+              f"{_time(naive, text, max(1, args.repeat // 10)):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+LLM gateway policies against a local stub of the OpenAI API.
+
+Starts a threaded stub server (/v1/chat/completions, streamed or not, and
+/v1/models) whose latency has a slow tail and which fails a configurable share
+of requests with 500 or 429 + Retry-After. Then drives LLMGateway.achat with
+--concurrency clients under several policies and reports success rate,
+p50/p99 latency, retries and hedges:
+  - bare:    no retries, no hedging (what the agents did before)
+  - retry:   jittered retries within the deadline
+  - hedge:   retries plus a hedged second request past the observed p95
+  - outage:  every request fails; shows the circuit breaker failing fast
+
+Usage (from backend/):
+    python benchmarks/bench_llm_gateway.py --requests 400 --concurrency 20
+    python benchmarks/bench_llm_gateway.py --hedge-after-ms 200 --slow-rate 0.05
+    python benchmarks/bench_llm_gateway.py --serve --port 8089   # stub only, for OPENAI_BASE_URL
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("OPENAI_API_KEY", "stub-key")
+
+
+class StubConfig:
+    latency_ms = 50.0
+    slow_rate = 0.03
+    slow_ms = 800.0
+    error_rate = 0.02
+    rate_limit_rate = 0.02
+    fail_all = False
+
+
+def _completion(content: str) -> dict:
+    return {
+        "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()), "model": "stub",
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": 12, "completion_tokens": 6, "total_tokens": 18},
+    }
+
+
+def _chunk(content: str = None, finish: str = None) -> dict:
+    delta = {"content": content} if content is not None else {}
+    return {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+            "model": "stub", "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, so the gateway's pool is exercised
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, status: int, body: dict, headers: dict = None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._json(200, {"object": "list", "data": [{"id": "stub", "object": "model", "owned_by": "stub"}]})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        cfg = StubConfig
+        roll = random.random()
+        if cfg.fail_all or roll < cfg.error_rate:
+            time.sleep(cfg.latency_ms / 4000)
+            return self._json(500, {"error": {"message": "stub server error", "type": "server_error"}})
+        if roll < cfg.error_rate + cfg.rate_limit_rate:
+            return self._json(429, {"error": {"message": "stub rate limit", "type": "rate_limit"}},
+                              {"retry-after-ms": "50"})
+        slow = random.random() < cfg.slow_rate
+        time.sleep((cfg.slow_ms if slow else random.uniform(0.5, 1.5) * cfg.latency_ms) / 1000)
+        if not body.get("stream"):
+            return self._json(200, _completion("stub answer"))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        events = [_chunk("stub "), _chunk("answer"), _chunk(finish="stop")]
+        if (body.get("stream_options") or {}).get("include_usage"):
+            events.append({**_chunk(), "choices": [], "usage": _completion("")["usage"]})
+        for payload in [f"data: {json.dumps(e)}\n\n" for e in events] + ["data: [DONE]\n\n"]:
+            data = payload.encode()
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # A hedged request's loser is cancelled mid-response; that is expected here
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+
+def start_stub(port: int = 0) -> ThreadingHTTPServer:
+    server = StubServer(("127.0.0.1", port), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def drive(gateway, requests: int, concurrency: int, warmup: int = 0):
+    """Run `requests` calls from `concurrency` clients, after `warmup` unmeasured ones."""
+    from llm_gateway import LLMError
+    if warmup:
+        await drive(gateway, warmup, concurrency)
+    latencies, failures, work = [], 0, iter(range(requests))
+
+    async def client():
+        nonlocal failures
+        for _ in work:
+            t0 = time.perf_counter()
+            try:
+                await gateway.achat(model="stub", messages=[{"role": "user", "content": "hi"}])
+                latencies.append(time.perf_counter() - t0)
+            except LLMError:
+                failures += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    if not warmup:
+        return elapsed, latencies, failures
+    await gateway.aclient.close()   # its pool is bound to this event loop
+    return elapsed, latencies, failures
+
+
+async def check_stream(gateway) -> str:
+    text = ""
+    async for chunk in gateway.astream(model="stub", messages=[{"role": "user", "content": "hi"}]):
+        if chunk.choices and chunk.choices[0].delta.content:
+            text += chunk.choices[0].delta.content
+    await gateway.aclient.close()
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=StubConfig.latency_ms)
+    parser.add_argument("--slow-rate", type=float, default=StubConfig.slow_rate)
+    parser.add_argument("--slow-ms", type=float, default=StubConfig.slow_ms)
+    parser.add_argument("--error-rate", type=float, default=StubConfig.error_rate)
+    parser.add_argument("--rate-limit-rate", type=float, default=StubConfig.rate_limit_rate)
+    parser.add_argument("--deadline-s", type=float, default=5.0)
+    parser.add_argument("--hedge-after-ms", type=float, default=0, help="0 = observed p95")
+    parser.add_argument("--serve", action="store_true", help="only run the stub server")
+    parser.add_argument("--port", type=int, default=0)
+    args = parser.parse_args()
+
+    StubConfig.latency_ms, StubConfig.slow_rate, StubConfig.slow_ms = args.latency_ms, args.slow_rate, args.slow_ms
+    StubConfig.error_rate, StubConfig.rate_limit_rate = args.error_rate, args.rate_limit_rate
+    server = start_stub(args.port)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    if args.serve:
+        print(f"Stub OpenAI API at {base_url} (Ctrl+C to stop)")
+        threading.Event().wait()
+
+    from llm_gateway import LLMGateway
+    print(f"stub {base_url} • latency {args.latency_ms:.0f}ms, {args.slow_rate:.0%} slow ({args.slow_ms:.0f}ms), "
+          f"{args.error_rate:.0%} 500, {args.rate_limit_rate:.0%} 429 • {args.requests} requests x "
+          f"{args.concurrency} clients")
+    print(f"{'policy':8s} {'ok %':>6s} {'req/s':>7s} {'p50 ms':>7s} {'p99 ms':>7s} {'retries':>8s} "
+          f"{'hedges':>7s} {'won':>5s} {'rejected':>9s} {'circuit':>9s}")
+
+    policies = [
+        ("bare", dict(max_retries=0, hedge=False)),
+        ("retry", dict(max_retries=3, hedge=False)),
+        ("hedge", dict(max_retries=3, hedge=True, hedge_after_ms=args.hedge_after_ms)),
+        ("outage", dict(max_retries=1, hedge=False)),
+    ]
+    for name, kwargs in policies:
+        StubConfig.fail_all = name == "outage"
+        gateway = LLMGateway(base_url=base_url, deadline_s=args.deadline_s, **kwargs)
+        # Unmeasured warm-up calls open the pool and give the hedge threshold its p95 samples
+        elapsed, latencies, failures = asyncio.run(drive(gateway, args.requests, args.concurrency, warmup=100))
+        ms = np.asarray(latencies) * 1000 if latencies else np.asarray([float("nan")])
+        stats = gateway.stats()
+        print(f"{name:8s} {100 * len(latencies) / args.requests:6.1f} {args.requests / elapsed:7.1f} "
+              f"{np.percentile(ms, 50):7.1f} {np.percentile(ms, 99):7.1f} {stats['retries']:8d} "
+              f"{stats['hedges']:7d} {stats['hedge_wins']:5d} {stats['rejected']:9d} {stats['circuit']:>9s}")
+
+    StubConfig.fail_all = False
+    text = asyncio.run(check_stream(LLMGateway(base_url=base_url, max_retries=3)))
+    print(f"stream: {text!r}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Cost of a log line on the request path: structured_log vs print().
+
+stdout is redirected to /dev/null, to a pipe drained by a fast reader, or to
+a pipe whose reader stalls (a backed-up container log pipe). For each sink,
+reports the caller-side cost per line (mean and p99 of batches of 100) and
+the total CPU per line including the writer thread's rendering, for
+print(..., flush=True) and for log.info with a few fields. With a stalled
+reader print blocks once the pipe buffer fills, while log.info keeps
+returning (the writer thread is the one that waits).
+
+Usage (from backend/):
+    python benchmarks/bench_logging.py --lines 50000
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+READER = {
+    "fast": "import sys\nwhile sys.stdin.buffer.read(65536): pass",
+    "stalled": "import sys, time\nwhile sys.stdin.buffer.read(4096): time.sleep(0.01)",
+}
+
+
+def redirect_stdout(sink: str):
+    """Point fd 1 at the sink; returns the reader process, if any."""
+    if sink == "devnull":
+        os.dup2(os.open(os.devnull, os.O_WRONLY), 1)
+        return None
+    reader = subprocess.Popen([sys.executable, "-c", READER[sink]], stdin=subprocess.PIPE)
+    os.dup2(reader.stdin.fileno(), 1)
+    return reader
+
+
+def timed(fn, lines: int, deadline_s: float):
+    """Per-line ns for batches of 100 calls; stops early past the deadline (a blocked print)."""
+    batches, t_end = [], time.perf_counter() + deadline_s
+    for start in range(0, lines, 100):
+        t0 = time.perf_counter()
+        fn(start)
+        batches.append((time.perf_counter() - t0) / 100 * 1e9)
+        if time.perf_counter() > t_end:
+            break
+    batches.sort()
+    return len(batches) * 100, sum(batches) / len(batches), batches[int(0.99 * (len(batches) - 1))]
+
+
+def run(sink: str, lines: int, deadline_s: float) -> str:
+    reader = redirect_stdout(sink)
+    # The synthetic burst outruns a 50ms drain; size the queue so every line is rendered and counted
+    os.environ.setdefault("LOG_QUEUE_SIZE", str(lines))
+    import structured_log
+    import metrics
+    log = structured_log.get_logger("bench")
+
+    def printed(start):
+        for i in range(start, start + 100):
+            print(f"🔍 Retrieved 3 documents for request {i} (k=3, query_chars=40)", flush=True)
+
+    def logged(start):
+        for i in range(start, start + 100):
+            log.info("retrieved", k=3, results=3, query_chars=40, request=i)
+
+    rows = []
+    for name, fn in (("print", printed), ("log.info", logged)):
+        cpu0 = time.process_time()
+        done, mean, p99 = timed(fn, lines, deadline_s)
+        if name == "log.info":
+            structured_log.shutdown()   # drain, so the writer's work is counted
+        cpu = (time.process_time() - cpu0) / done * 1e9
+        rows.append(f"{sink:8s} {name:9s} {done:8d} {mean:12.0f} {p99:12.0f} {cpu:14.0f}")
+    dropped = metrics._families[metrics.PREFIX + "log_dropped"].labels().value()
+    if reader is not None:
+        reader.kill()
+    return "\n".join(rows) + f"\n{sink:8s} log.info dropped {int(dropped)} lines"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=50_000)
+    parser.add_argument("--deadline-s", type=float, default=5.0, help="per case; a blocked print stops here")
+    parser.add_argument("--sink", choices=["devnull", "fast", "stalled"], help="internal: run one sink")
+    args = parser.parse_args()
+
+    if args.sink:
+        report = run(args.sink, args.lines, args.deadline_s)
+        sys.stderr.write(report + "\n")
+        return
+
+    print(f"{'sink':8s} {'call':9s} {'lines':>8s} {'ns/line':>12s} {'p99 ns/line':>12s} {'cpu ns/line':>14s}")
+    for sink in ("devnull", "fast", "stalled"):
+        # Fresh interpreter per sink: fd 1 is redirected and the writer thread is per process
+        proc = subprocess.run([sys.executable, __file__, "--sink", sink, "--lines", str(args.lines),
+                               "--deadline-s", str(args.deadline_s)], capture_output=True, text=True)
+        print(proc.stderr.strip())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Per-observation overhead of the metrics registry.
+
+Times counter increments, histogram observations (plain and labelled), the
+request_metrics.stage() timer every pipeline stage goes through, and a
+lock-protected histogram for comparison, single-threaded and from --threads
+threads at once. Checks that no observation is lost under concurrency, then
+times a /metrics render at realistic cardinality.
+
+Usage (from backend/):
+    python benchmarks/bench_metrics.py --ops 1000000 --threads 8
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import metrics
+import request_metrics
+
+
+class LockedHistogram:
+    """The obvious alternative: one shared bucket list behind a mutex."""
+
+    def __init__(self, buckets=metrics.LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self.lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.sum += value
+
+
+def per_op_ns(fn, ops: int, threads: int) -> float:
+    """Wall-clock ns per call with `threads` threads each making ops // threads calls."""
+    n = ops // threads
+    start = threading.Barrier(threads + 1)
+
+    def worker():
+        start.wait()
+        fn(n)
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    start.wait()
+    t0 = time.perf_counter()
+    for t in pool:
+        t.join()
+    return (time.perf_counter() - t0) / (n * threads) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ops", type=int, default=1_000_000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    counter = metrics.counter("bench_ops", "benchmark counter")
+    labelled_counter = metrics.counter("bench_labelled_ops", "benchmark counter", ("direction",))
+    hist = metrics.histogram("bench_seconds", "benchmark histogram")
+    labelled_hist = metrics.histogram("bench_labelled_seconds", "benchmark histogram", ("stage",))
+    locked = LockedHistogram()
+
+    def empty(n):
+        for _ in range(n):
+            pass
+
+    def inc(n):
+        for _ in range(n):
+            counter.inc()
+
+    def labelled_inc(n):
+        for _ in range(n):
+            labelled_counter.labels("in").inc(12)
+
+    def observe(n):
+        for i in range(n):
+            hist.observe(0.0173)
+
+    def labelled_observe(n):
+        for i in range(n):
+            labelled_hist.labels("embed").observe(0.0173)
+
+    def locked_observe(n):
+        for i in range(n):
+            locked.observe(0.0173)
+
+    def stage(n):
+        for i in range(n):
+            with request_metrics.stage("bench"):
+                pass
+
+    cases = [("empty loop", empty), ("counter.inc", inc), ("counter.labels().inc", labelled_inc),
+             ("histogram.observe", observe), ("histogram.labels().observe", labelled_observe),
+             ("locked histogram", locked_observe), ("request_metrics.stage()", stage)]
+
+    print(f"{args.ops:,} observations • Python {sys.version.split()[0]} • {os.cpu_count()} CPU(s)")
+    print(f"{'case':28s} {'1 thread ns/op':>15s} {f'{args.threads} threads ns/op':>18s}")
+    baseline = None
+    for name, fn in cases:
+        single = per_op_ns(fn, args.ops, 1)
+        multi = per_op_ns(fn, args.ops, args.threads)
+        if baseline is None:
+            baseline = single
+            print(f"{name:28s} {single:15.1f} {multi:18.1f}")
+        else:
+            print(f"{name:28s} {single:15.1f} {multi:18.1f}   (+{single - baseline:.0f} ns over the loop)")
+
+    # Every observation from every thread must be in the totals
+    n = (args.ops // args.threads) * args.threads
+    expected = {"counter.inc": 2 * n, "histogram.observe": 2 * n}
+    got = {"counter.inc": counter._children[()].value(), "histogram.observe": hist._children[()].snapshot()[0][-1]}
+    lost = {k: expected[k] - got[k] for k in expected}
+    print(f"lost observations: {lost}")
+
+    # A scrape at production-like cardinality: 20 routes x 3 statuses, 4 agents x 3 outcomes, 7 stages
+    for route in range(20):
+        for status in (200, 404, 500):
+            metrics.HTTP_REQUEST_SECONDS.labels("POST", f"/route/{route}", status).observe(0.05)
+    for agent in ("onboarding", "skillnav", "progress", "welcome"):
+        for outcome in ("ok", "cache_hit", "llm_fallback"):
+            metrics.AGENT_REQUEST_SECONDS.labels(agent, outcome).observe(0.3)
+    for name in request_metrics.STAGES:
+        request_metrics.record_stage(name, 12.0)
+    t0 = time.perf_counter()
+    runs = 50
+    for _ in range(runs):
+        body = metrics.render()
+    print(f"render: {(time.perf_counter() - t0) / runs * 1000:.2f} ms for {body.count(chr(10)):,} lines "
+          f"({len(body) / 1024:.0f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
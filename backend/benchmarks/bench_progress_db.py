@@ -0,0 +1,88 @@
+"""
+Bulk-load throughput and per-user query latency for course_assignments.
+
+Writes a synthetic LMS export (default 1M rows over 50k users) to a temp CSV,
+loads it with progress_db.load_courses_csv into a throwaway org, then times
+fetch_user_courses for random users - the single indexed query the Progress
+agent runs per request. Needs AURORA_DB_URL pointing at MySQL; the benchmark
+org's rows are deleted afterwards unless --keep is given.
+
+Usage (from backend/):
+    python benchmarks/bench_progress_db.py --rows 1000000 --users 50000 --queries 2000
+"""
+
+import argparse
+import csv
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import delete
+
+from audit_store import CourseAssignment, get_engine
+from progress_db import fetch_user_courses, load_courses_csv
+
+STATUSES = ["Assigned", "In Progress", "Completed", "Completed"]
+
+
+def write_export(path, rows, users, seed=0):
+    rng = random.Random(seed)
+    start = datetime.date(2025, 1, 1).toordinal()
+    per_user = max(1, rows // users)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["user_id", "course", "status", "due", "attempts"])
+        for i in range(rows):
+            user, n = divmod(i, per_user)
+            writer.writerow([
+                f"u{user % users}", f"Module {n:03d}", rng.choice(STATUSES),
+                datetime.date.fromordinal(start + rng.randint(0, 365)).isoformat(), rng.randint(0, 3),
+            ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--keep", action="store_true", help="leave the benchmark rows in the table")
+    args = parser.parse_args()
+
+    org_id = f"bench-{uuid.uuid4().hex[:8]}"
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "courses.csv")
+        t0 = time.perf_counter()
+        write_export(path, args.rows, args.users)
+        print(f"wrote {args.rows} rows in {time.perf_counter() - t0:.1f}s "
+              f"({os.path.getsize(path) / 1e6:.0f} MB)")
+
+        stats = load_courses_csv(path, org_id, args.chunk_size)
+        print(f"load: {stats['rows']} rows in {stats['chunks']} chunks, {stats['seconds']}s "
+              f"({stats['rows_per_s']} rows/s)")
+
+    try:
+        rng = random.Random(1)
+        latencies, returned = [], 0
+        for _ in range(args.queries):
+            t0 = time.perf_counter()
+            returned += len(fetch_user_courses(org_id, f"u{rng.randrange(args.users)}"))
+            latencies.append(time.perf_counter() - t0)
+        ms = np.asarray(latencies) * 1000
+        print(f"per-user query: p50={np.percentile(ms, 50):.2f} ms  p99={np.percentile(ms, 99):.2f} ms  "
+              f"avg rows={returned / args.queries:.1f}")
+    finally:
+        if not args.keep:
+            with get_engine().begin() as conn:
+                conn.execute(delete(CourseAssignment).where(CourseAssignment.org_id == org_id))
+
+
+if __name__ == "__main__":
+    main()
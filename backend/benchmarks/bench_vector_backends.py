@@ -0,0 +1,108 @@
+"""
+Query latency of the in-process LocalVectorStore vs Qdrant over HTTP.
+
+Both backends are loaded with the same random unit vectors so only search cost
+is compared (no embedding). Qdrant is skipped unless QDRANT_URL is set; a
+throwaway collection is created and dropped.
+
+Usage (from backend/):
+    python benchmarks/bench_vector_backends.py --docs 20000 --queries 500
+    QDRANT_URL=http://localhost:6333 python benchmarks/bench_vector_backends.py
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from local_index import LocalVectorStore
+
+
+def _report(label, latencies):
+    ms = np.asarray(latencies) * 1000
+    print(f"{label:28s} p50={np.percentile(ms, 50):8.3f} ms  p99={np.percentile(ms, 99):8.3f} ms  "
+          f"qps={len(ms) / (ms.sum() / 1000):9.1f}")
+
+
+def bench_local(vectors, queries, k, batch):
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalVectorStore(tmp, embeddings=None, collection_name="bench")
+        ids = [str(uuid.uuid4()) for _ in range(len(vectors))]
+        t0 = time.perf_counter()
+        for i in range(0, len(vectors), 1000):
+            store.add_vectors(vectors[i:i + 1000], [f"doc {j}" for j in range(i, i + 1000)],
+                              [{"source": "bench"}] * len(vectors[i:i + 1000]), ids[i:i + 1000])
+        print(f"local build: {time.perf_counter() - t0:.2f}s for {len(vectors)} vectors")
+
+        latencies = []
+        for q in queries:
+            t0 = time.perf_counter()
+            store.similarity_search_by_vector(q, k=k)
+            latencies.append(time.perf_counter() - t0)
+        _report("local (single query)", latencies)
+
+        latencies = []
+        for i in range(0, len(queries), batch):
+            t0 = time.perf_counter()
+            store.search_many(queries[i:i + batch], k)
+            per_query = (time.perf_counter() - t0) / len(queries[i:i + batch])
+            latencies.extend([per_query] * len(queries[i:i + batch]))
+        _report(f"local (batch of {batch})", latencies)
+
+
+def bench_qdrant(vectors, queries, k):
+    url = os.getenv("QDRANT_URL")
+    if not url:
+        print("qdrant: skipped (QDRANT_URL not set)")
+        return
+    from qdrant_client import QdrantClient
+    from qdrant_client.http import models
+
+    client = QdrantClient(url=url, api_key=os.getenv("QDRANT_API_KEY"), prefer_grpc=False)
+    name = f"bench_{uuid.uuid4().hex[:8]}"
+    client.create_collection(name, vectors_config=models.VectorParams(size=vectors.shape[1], distance=models.Distance.COSINE))
+    try:
+        t0 = time.perf_counter()
+        for i in range(0, len(vectors), 1000):
+            client.upsert(name, points=models.Batch(
+                ids=[str(uuid.uuid4()) for _ in range(len(vectors[i:i + 1000]))],
+                vectors=vectors[i:i + 1000].tolist(),
+                payloads=[{"page_content": "doc", "metadata": {"source": "bench"}}] * len(vectors[i:i + 1000]),
+            ), wait=True)
+        print(f"qdrant build: {time.perf_counter() - t0:.2f}s for {len(vectors)} vectors")
+
+        latencies = []
+        for q in queries:
+            t0 = time.perf_counter()
+            client.query_points(name, query=q.tolist(), limit=k, with_payload=True)
+            latencies.append(time.perf_counter() - t0)
+        _report("qdrant http (single query)", latencies)
+    finally:
+        client.delete_collection(name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=32)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.docs, args.dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+
+    bench_local(vectors, queries, args.k, args.batch)
+    bench_qdrant(vectors, queries, args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+CPU embedding backends for sentence-transformers models.
+
+EMBED_BACKEND selects how EMBED_MODEL is run:
+    torch      LangChain HuggingFaceEmbeddings on PyTorch (the original path)
+    onnx       ONNX Runtime on the model's fp32 ONNX export
+    onnx-int8  ONNX Runtime on an int8 dynamically quantized export
+    numpy      the BERT encoder evaluated in NumPy straight from the safetensors weights
+
+The non-torch backends never import torch. They tokenize with `tokenizers` and
+pool/normalize the way the model's sentence-transformers config says (mean
+pooling + L2 normalization for all-MiniLM-L6-v2), so their vectors have the
+collection's dimension and are directly comparable with torch-built vectors.
+EMBED_MODEL may be a hub id or a local directory holding the same files.
+"""
+
+import hashlib
+import json
+import math
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch").strip().lower()
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+EMBED_THREADS = int(os.getenv("EMBED_THREADS", "0"))   # 0 = runtime default
+EMBED_ONNX_CACHE_DIR = os.getenv("EMBED_ONNX_CACHE_DIR", "/tmp/data/onnx_cache")
+# Optional pre-quantized export in the model repo (e.g. onnx/model_quint8_avx2.onnx); otherwise quantized locally
+EMBED_ONNX_INT8_FILE = os.getenv("EMBED_ONNX_INT8_FILE", "")
+
+BACKENDS = ("torch", "onnx", "onnx-int8", "numpy")
+
+
+def _model_file(model: str, filename: str, required: bool = True) -> Optional[str]:
+    """Path of a file from a local model directory or the HF hub cache (downloaded on first use)."""
+    if os.path.isdir(model):
+        path = os.path.join(model, filename)
+        if os.path.exists(path):
+            return path
+        if required:
+            raise FileNotFoundError(path)
+        return None
+    from huggingface_hub import hf_hub_download
+    try:
+        return hf_hub_download(model, filename)
+    except Exception:
+        if required:
+            raise
+        return None
+
+
+def _read_json(model: str, filename: str) -> dict:
+    path = _model_file(model, filename, required=False)
+    if path is None:
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class _TransformerEmbeddings(Embeddings):
+    """Tokenization, length-bucketed batching and sentence-transformers pooling; subclasses run the encoder."""
+
+    def __init__(self, model_name: str, batch_size: int = EMBED_BATCH_SIZE):
+        from tokenizers import Tokenizer
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.tokenizer = Tokenizer.from_file(_model_file(model_name, "tokenizer.json"))
+        self.tokenizer.no_padding()
+        self.config = _read_json(model_name, "config.json")
+        st_config = _read_json(model_name, "sentence_bert_config.json")
+        max_length = int(st_config.get("max_seq_length", 256))
+        self.tokenizer.enable_truncation(max_length=min(max_length, int(self.config.get("max_position_embeddings", max_length))))
+        pooling = _read_json(model_name, "1_Pooling/config.json")
+        self.pooling = "cls" if pooling.get("pooling_mode_cls_token") else "mean"
+        modules = _read_json(model_name, "modules.json")
+        # all-MiniLM-L6-v2 ships a Normalize module; plain HF encoders without modules.json are normalized too
+        self.normalize = not modules or any(m.get("type", "").endswith("Normalize") for m in modules)
+
+    def _forward(self, input_ids: np.ndarray, attention_mask: np.ndarray, token_type_ids: np.ndarray) -> np.ndarray:
+        """Last hidden state, shape (batch, tokens, hidden)."""
+        raise NotImplementedError
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        width = max(len(e.ids) for e in encodings)
+        ids = np.zeros((len(texts), width), dtype=np.int64)
+        mask = np.zeros((len(texts), width), dtype=np.int64)
+        types = np.zeros((len(texts), width), dtype=np.int64)
+        for row, e in enumerate(encodings):
+            n = len(e.ids)
+            ids[row, :n], mask[row, :n], types[row, :n] = e.ids, e.attention_mask, e.type_ids
+        hidden = self._forward(ids, mask, types)
+        if self.pooling == "cls":
+            pooled = hidden[:, 0]
+        else:
+            m = mask[:, :, None].astype(hidden.dtype)
+            pooled = (hidden * m).sum(axis=1) / np.clip(m.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """Embeddings as a float32 matrix. Texts are batched by length so little padding is computed."""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        out: Optional[np.ndarray] = None
+        for start in range(0, len(order), self.batch_size):
+            idx = order[start:start + self.batch_size]
+            vectors = self._encode_batch([texts[i] for i in idx])
+            if out is None:
+                out = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            out[idx] = vectors
+        return out
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(list(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_array([text])[0].tolist()
+
+
+class OnnxEmbeddings(_TransformerEmbeddings):
+    """ONNX Runtime encoder; `quantize=True` runs an int8 dynamically quantized copy of the export."""
+
+    def __init__(self, model_name: str, quantize: bool = False, onnx_file: str = "onnx/model.onnx", **kwargs):
+        import onnxruntime as ort
+        super().__init__(model_name, **kwargs)
+        path = self._int8_path(model_name, onnx_file) if quantize else _model_file(model_name, onnx_file)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if EMBED_THREADS:
+            options.intra_op_num_threads = EMBED_THREADS
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self._inputs = {i.name for i in self.session.get_inputs()}
+        self.path = path
+
+    @staticmethod
+    def _int8_path(model_name: str, onnx_file: str) -> str:
+        if EMBED_ONNX_INT8_FILE:
+            return _model_file(model_name, EMBED_ONNX_INT8_FILE)
+        target_dir = os.path.join(EMBED_ONNX_CACHE_DIR, hashlib.sha1(model_name.encode()).hexdigest()[:12])
+        target = os.path.join(target_dir, "model_int8.onnx")
+        if not os.path.exists(target):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            os.makedirs(target_dir, exist_ok=True)
+            tmp = f"{target}.{os.getpid()}.tmp"
+            quantize_dynamic(_model_file(model_name, onnx_file), tmp, weight_type=QuantType.QInt8)
+            os.replace(tmp, target)
+        return target
+
+    def _forward(self, input_ids, attention_mask, token_type_ids):
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask, "token_type_ids": token_type_ids}
+        return self.session.run(None, {k: v for k, v in feeds.items() if k in self._inputs})[0]
+
+
+# --- NumPy BERT ----------------------------------------------------------------
+
+def _erf(x: np.ndarray) -> np.ndarray:
+    # Abramowitz & Stegun 7.1.26, |error| < 1.5e-7 - well below float32 noise after LayerNorm
+    a = np.abs(x)
+    t = 1.0 / (1.0 + 0.3275911 * a)
+    poly = ((((1.061405429 * t - 1.453152027) * t + 1.421413741) * t - 0.284496736) * t + 0.254829592) * t
+    return np.sign(x) * (1.0 - poly * np.exp(-a * a))
+
+
+_ACTIVATIONS = {
+    "gelu": lambda x: 0.5 * x * (1.0 + _erf(x / math.sqrt(2.0))),
+    "gelu_new": lambda x: 0.5 * x * (1.0 + np.tanh(math.sqrt(2.0 / math.pi) * (x + 0.044715 * x ** 3))),
+    "relu": lambda x: np.maximum(x, 0.0),
+}
+_ACTIVATIONS["gelu_pytorch_tanh"] = _ACTIVATIONS["gelu_new"]
+
+
+def _layer_norm(x: np.ndarray, gamma: np.ndarray, beta: np.ndarray, eps: float) -> np.ndarray:
+    mu = x.mean(axis=-1, keepdims=True)
+    var = np.square(x - mu).mean(axis=-1, keepdims=True)
+    return (x - mu) / np.sqrt(var + eps) * gamma + beta
+
+
+class NumpyEmbeddings(_TransformerEmbeddings):
+    """BERT-family encoder in NumPy (float32) from model.safetensors; no ML runtime needed."""
+
+    def __init__(self, model_name: str, **kwargs):
+        from safetensors.numpy import load_file
+        super().__init__(model_name, **kwargs)
+        config = self.config
+        self.heads = int(config.get("num_attention_heads", 12))
+        self.layers = int(config.get("num_hidden_layers", 6))
+        self.eps = float(config.get("layer_norm_eps", 1e-12))
+        self.act = _ACTIVATIONS[config.get("hidden_act", "gelu")]
+        raw = load_file(_model_file(model_name, "model.safetensors"))
+        self.w: Dict[str, np.ndarray] = {}
+        for name, value in raw.items():
+            name = name[len("bert."):] if name.startswith("bert.") else name
+            value = value.astype(np.float32)
+            # Linear weights are stored (out, in); keep them transposed so forward is x @ W
+            self.w[name] = np.ascontiguousarray(value.T) if name.endswith("dense.weight") or \
+                name.endswith(("query.weight", "key.weight", "value.weight")) else value
+
+    def _linear(self, x, prefix):
+        return x @ self.w[f"{prefix}.weight"] + self.w[f"{prefix}.bias"]
+
+    def _forward(self, input_ids, attention_mask, token_type_ids):
+        w = self.w
+        batch, tokens = input_ids.shape
+        x = (w["embeddings.word_embeddings.weight"][input_ids]
+             + w["embeddings.position_embeddings.weight"][np.arange(tokens)][None]
+             + w["embeddings.token_type_embeddings.weight"][token_type_ids])
+        x = _layer_norm(x, w["embeddings.LayerNorm.weight"], w["embeddings.LayerNorm.bias"], self.eps)
+        hidden = x.shape[-1]
+        head_dim = hidden // self.heads
+        # Padding keys get a large negative score so they vanish in the softmax
+        bias = ((1.0 - attention_mask[:, None, None, :].astype(np.float32)) * -1e9).astype(np.float32)
+
+        def split(t):
+            return t.reshape(batch, tokens, self.heads, head_dim).transpose(0, 2, 1, 3)
+
+        for i in range(self.layers):
+            p = f"encoder.layer.{i}"
+            q = split(self._linear(x, f"{p}.attention.self.query"))
+            k = split(self._linear(x, f"{p}.attention.self.key"))
+            v = split(self._linear(x, f"{p}.attention.self.value"))
+            scores = q @ k.transpose(0, 1, 3, 2) / math.sqrt(head_dim) + bias
+            scores = np.exp(scores - scores.max(axis=-1, keepdims=True))
+            probs = scores / scores.sum(axis=-1, keepdims=True)
+            ctx = (probs @ v).transpose(0, 2, 1, 3).reshape(batch, tokens, hidden)
+            x = _layer_norm(x + self._linear(ctx, f"{p}.attention.output.dense"),
+                            w[f"{p}.attention.output.LayerNorm.weight"], w[f"{p}.attention.output.LayerNorm.bias"],
+                            self.eps)
+            ffn = self._linear(self.act(self._linear(x, f"{p}.intermediate.dense")), f"{p}.output.dense")
+            x = _layer_norm(x + ffn, w[f"{p}.output.LayerNorm.weight"], w[f"{p}.output.LayerNorm.bias"], self.eps)
+        return x
+
+
+def create_embeddings(model_name: str, backend: str = EMBED_BACKEND) -> Embeddings:
+    """Embeddings for `model_name` on the selected backend (see module docstring)."""
+    if backend == "torch":
+        # Deferred: pulls in sentence-transformers and torch
+        from langchain_huggingface import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(model_name=model_name)
+    if backend == "onnx":
+        return OnnxEmbeddings(model_name)
+    if backend == "onnx-int8":
+        return OnnxEmbeddings(model_name, quantize=True)
+    if backend == "numpy":
+        return NumpyEmbeddings(model_name)
+    raise ValueError(f"Unknown EMBED_BACKEND '{backend}' (expected one of {', '.join(BACKENDS)})")
+
+
+def cache_model_key(model_name: str, backend: str = EMBED_BACKEND) -> str:
+    """Embedding-cache namespace: quantized vectors must not be served for full-precision lookups."""
+    return model_name if backend in ("torch", "onnx", "numpy") else f"{model_name}@{backend}"
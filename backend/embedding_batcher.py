@@ -0,0 +1,161 @@
+"""
+Cross-request micro-batching for the embedding model.
+
+Concurrent `embed_query` calls each pay a full forward pass for one short
+sequence, leaving most of the matrix throughput unused. EmbeddingBatcher queues
+them instead: a single worker thread runs one forward pass over everything
+queued (up to `max_batch`) and resolves every caller's future. Requests that
+arrive during a pass form the next batch. Before a pass the worker lingers up
+to `max_wait_ms` for stragglers, but only until as many queries are queued as
+the previous batch held, so a lone caller never waits and steady concurrent
+load fills batches. Ingestion's `embed_documents` goes through the same worker in
+`max_batch`-sized slices; pending queries are taken first, so a bulk ingest
+adds at most one slice to query latency.
+
+All EMBED_BACKENDs encode queries and documents identically (no query prompt),
+so both kinds share a forward pass through the inner model's embed_documents.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Dict, List
+
+from langchain_core.embeddings import Embeddings
+
+
+class _Request:
+    __slots__ = ("texts", "done", "vectors", "future", "enqueued")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.done = 0                 # texts already handed to a batch
+        self.vectors: List = [None] * len(texts)
+        self.future: Future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class EmbeddingBatcher(Embeddings):
+    def __init__(self, inner: Embeddings, max_batch: int = 32, max_wait_ms: float = 5.0):
+        self.inner = inner
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._cond = threading.Condition()
+        self._queries: deque = deque()
+        self._documents: deque = deque()
+        self._worker = None
+        self._last_batch = 1
+
+        self.batches = 0
+        self.texts = 0
+        self.max_seen = 0
+        self.requests = 0
+        self.wait_ms_total = 0.0   # enqueue -> start of the pass that finished each request
+
+    # --- worker -------------------------------------------------------------
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+            self._worker.start()
+
+    def _take(self):
+        """Block until work is queued, then collect one batch: [(request, start, end)]."""
+        with self._cond:
+            while not self._queries and not self._documents:
+                self._cond.wait()
+            # Only queries are worth waiting for; a document slice already fills the batch
+            target = min(self.max_batch, self._last_batch)
+            deadline = time.perf_counter() + self.max_wait
+            while not self._documents and len(self._queries) < target:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            taken, room = [], self.max_batch
+            while self._queries and room > 0:
+                request = self._queries.popleft()
+                taken.append((request, 0, 1))
+                room -= 1
+            self._last_batch = max(1, self.max_batch - room)
+            while self._documents and room > 0:
+                request = self._documents[0]
+                start = request.done
+                end = min(len(request.texts), start + room)
+                request.done = end
+                taken.append((request, start, end))
+                room -= end - start
+                if end == len(request.texts):
+                    self._documents.popleft()
+            return taken
+
+    def _run(self):
+        while True:
+            taken = self._take()
+            texts = [text for request, start, end in taken for text in request.texts[start:end]]
+            now = time.perf_counter()
+            try:
+                vectors = self.inner.embed_documents(texts)
+            except Exception as e:
+                for request, _, _ in taken:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                with self._cond:
+                    # Drop the rest of a failed document request instead of embedding it for nobody
+                    self._documents = deque(r for r in self._documents if not r.future.done())
+                continue
+
+            self.batches += 1
+            self.texts += len(texts)
+            self.max_seen = max(self.max_seen, len(texts))
+            offset = 0
+            for request, start, end in taken:
+                request.vectors[start:end] = vectors[offset:offset + end - start]
+                offset += end - start
+                if end == len(request.texts) and not request.future.done():
+                    self.requests += 1
+                    self.wait_ms_total += (now - request.enqueued) * 1000
+                    request.future.set_result(request.vectors)
+
+    # --- submission ---------------------------------------------------------
+
+    def submit(self, texts: List[str], query: bool = False) -> Future:
+        """Queue texts for embedding; the future resolves to their vectors in order."""
+        request = _Request(list(texts))
+        if not request.texts:
+            request.future.set_result([])
+            return request.future
+        with self._cond:
+            self._ensure_worker()
+            (self._queries if query else self._documents).append(request)
+            self._cond.notify()
+        return request.future
+
+    # --- Embeddings interface ---------------------------------------------
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.submit(texts).result()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.submit([text], query=True).result()[0]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Waits on the event loop without holding a thread while the batch fills."""
+        return (await asyncio.wrap_future(self.submit([text], query=True)))[0]
+
+    def stats(self) -> Dict:
+        done = self.texts
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self.batches,
+            "texts": done,
+            "mean_batch": round(done / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.max_seen,
+            "mean_wait_ms": round(self.wait_ms_total / self.requests, 2) if self.requests else 0.0,
+            "queued": sum(len(r.texts) - r.done for r in self._documents) + len(self._queries),
+        }
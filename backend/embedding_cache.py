@@ -0,0 +1,171 @@
+"""
+Persistent embedding cache for LangChain embedders.
+
+Vectors live in a memory-mapped float16/float32 matrix on disk; a plain-text key
+file maps (model, kind, normalized text) hashes to rows. Both files are
+append-only, so the cache survives restarts and reindexing unchanged chunks or
+repeating a query costs a hash lookup instead of a forward pass.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, inner: Embeddings, model_name: str, cache_dir: str,
+                 dtype: str = "float16", max_entries: int = 200_000):
+        self.inner = inner
+        self.model_name = model_name
+        self.dtype = np.dtype(dtype)
+        self.max_entries = max_entries
+        self.dir = Path(cache_dir) / hashlib.sha1(model_name.encode()).hexdigest()[:12]
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._keys_path = self.dir / "keys.txt"
+        self._vec_path = self.dir / "vectors.bin"
+        self._meta_path = self.dir / "meta.json"
+
+        self._lock = threading.Lock()
+        self._index: Dict[str, int] = {}
+        self._mm = None
+        self._capacity = 0
+        self._dim = None
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    # --- persistence -------------------------------------------------------
+
+    def _load(self):
+        try:
+            meta = json.loads(self._meta_path.read_text())
+        except (OSError, ValueError):
+            return
+        if meta.get("model") != self.model_name or meta.get("dtype") != self.dtype.name:
+            return
+        self._dim = int(meta["dim"])
+        if self._keys_path.exists():
+            with open(self._keys_path, "r", encoding="ascii") as f:
+                for row, line in enumerate(f):
+                    key = line.strip()
+                    if len(key) == 64:
+                        self._index[key] = row
+        self._open_memmap()
+
+    def _open_memmap(self):
+        row_bytes = self._dim * self.dtype.itemsize
+        size = self._vec_path.stat().st_size if self._vec_path.exists() else 0
+        self._capacity = size // row_bytes
+        if self._capacity:
+            self._mm = np.memmap(self._vec_path, dtype=self.dtype, mode="r+", shape=(self._capacity, self._dim))
+
+    def _ensure_capacity(self, rows: int):
+        if rows <= self._capacity:
+            return
+        new_capacity = max(rows, self._capacity * 2, 1024)
+        if self._mm is not None:
+            self._mm.flush()
+            self._mm = None
+        self._vec_path.touch(exist_ok=True)
+        os.truncate(self._vec_path, new_capacity * self._dim * self.dtype.itemsize)
+        self._open_memmap()
+
+    def _init_dim(self, dim: int):
+        self._dim = dim
+        # A fresh layout invalidates anything left from a different model/dtype
+        for p in (self._keys_path, self._vec_path):
+            if p.exists():
+                p.unlink()
+        self._index.clear()
+        self._meta_path.write_text(json.dumps({"model": self.model_name, "dim": dim, "dtype": self.dtype.name}))
+
+    def _store(self, keys: List[str], vectors: List[List[float]]):
+        if not vectors:
+            return
+        if self._dim is None:
+            self._init_dim(len(vectors[0]))
+        pairs = [(k, v) for k, v in zip(keys, vectors) if k not in self._index]
+        room = self.max_entries - len(self._index)
+        pairs = pairs[:max(room, 0)]
+        if not pairs:
+            return
+        start = len(self._index)
+        self._ensure_capacity(start + len(pairs))
+        self._mm[start:start + len(pairs)] = np.asarray([v for _, v in pairs], dtype=np.float32).astype(self.dtype)
+        self._mm.flush()
+        # Keys are written after the vectors, so a crash never points a key at an unwritten row
+        with open(self._keys_path, "a", encoding="ascii") as f:
+            f.write("".join(k + "\n" for k, _ in pairs))
+        for offset, (k, _) in enumerate(pairs):
+            self._index[k] = start + offset
+
+    # --- Embeddings interface ---------------------------------------------
+
+    def _key(self, kind: str, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{kind}\0{_normalize(text)}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, kind: str, texts: List[str]):
+        """Cached vectors in input order (None where missing) and {missing key: [positions]}."""
+        keys = [self._key(kind, t) for t in texts]
+        results: List = [None] * len(texts)
+        missing: Dict[str, List[int]] = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                row = self._index.get(key)
+                if row is not None:
+                    results[i] = self._mm[row].astype(np.float32).tolist()
+                else:
+                    missing.setdefault(key, []).append(i)
+            self.hits += len(texts) - sum(len(v) for v in missing.values())
+            self.misses += sum(len(v) for v in missing.values())
+        return results, missing
+
+    def _fill(self, results: List, missing: Dict[str, List[int]], computed: List[List[float]]):
+        for key, vector in zip(missing, computed):
+            for i in missing[key]:
+                results[i] = list(vector)
+        with self._lock:
+            self._store(list(missing), computed)
+
+    def _embed(self, kind: str, texts: List[str], compute) -> List[List[float]]:
+        results, missing = self._lookup(kind, texts)
+        if missing:
+            self._fill(results, missing, compute([texts[positions[0]] for positions in missing.values()]))
+        return results
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed("d", texts, self.inner.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed("q", [text], lambda ts: [self.inner.embed_query(ts[0])])[0]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """A hit is answered inline; a miss awaits the inner model (e.g. the batcher) on the loop."""
+        results, missing = self._lookup("q", [text])
+        if missing:
+            vector = await self.inner.aembed_query(text)
+            await asyncio.to_thread(self._fill, results, missing, [vector])
+        return results[0]
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        bytes_used = sum(p.stat().st_size for p in (self._keys_path, self._vec_path, self._meta_path) if p.exists())
+        return {
+            "entries": len(self._index),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "bytes_used": bytes_used,
+            "dtype": self.dtype.name,
+        }
@@ -0,0 +1,107 @@
+"""
+Ingestion manifest for incremental indexing.
+
+Records, per source file, the content hash seen at the last ingest and the ids of
+the chunks it produced. Chunk ids are deterministic (source + chunk content hash),
+so re-ingesting unchanged content upserts onto the same points instead of
+duplicating them, and only new or changed chunks need to be embedded.
+
+The manifest file is a local cache; the vector store outlives it. Every point
+carries its source and the file hash it was ingested from, so a missing or
+outdated manifest is rebuilt from the collection (manifest_from_points) rather
+than re-embedding the corpus, and points whose id is not the deterministic id
+of their content (written before chunk ids existed) are found and purged.
+"""
+
+import hashlib
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+MANIFEST_PATH = os.getenv("INGEST_MANIFEST_PATH", "/tmp/data/ingest_manifest.json")
+
+# Bump when the indexed payload changes so every file is re-upserted with the new fields
+SCHEMA_VERSION = 3   # 3: file_hash in every chunk's metadata
+
+# Fixed namespace so chunk ids are stable across processes and deploys
+_CHUNK_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "aurora/ingest/chunks")
+
+
+def file_hash(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def chunk_id(source: str, text: str) -> str:
+    """Deterministic point id for a chunk (Qdrant accepts UUID strings)."""
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return str(uuid.uuid5(_CHUNK_NAMESPACE, f"{source}:{digest}"))
+
+
+def load_manifest(collection: str, embed_model: str) -> Tuple[Dict[str, Any], str]:
+    """Return ({source: {"hash": ..., "chunk_ids": [...]}}, state) for this collection/model.
+
+    state is "ok", "missing" (no manifest for the collection) or "stale" (written for
+    another embedding model or payload schema; its files map is empty).
+    """
+    try:
+        with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}, "missing"
+    entry = data.get(collection)
+    if not entry:
+        return {}, "missing"
+    if entry.get("embed_model") != embed_model or entry.get("schema") != SCHEMA_VERSION:
+        # Vectors from another model (or payloads from an older schema) are stale; treat everything as new
+        return {}, "stale"
+    return entry.get("files", {}), "ok"
+
+
+def manifest_from_points(points: Iterable[Tuple[str, str, Dict[str, Any]]]) -> Tuple[Dict[str, Any], List[str]]:
+    """Rebuild the manifest from stored (id, text, metadata) points.
+
+    Returns (files, foreign_ids). A file's hash is only trusted when all of its points
+    were written from the same version of it; otherwise it is None and the file is
+    re-split on the next ingest (unchanged chunks still skip embedding). foreign_ids
+    are points whose id is not chunk_id(source, text) - e.g. random ids from before
+    deterministic ids - which no ingest would ever update or delete.
+    """
+    by_source: Dict[str, Tuple[set, list]] = {}
+    foreign = []
+    for point_id, text, metadata in points:
+        source = metadata.get("source")
+        if not source or chunk_id(source, text) != point_id:
+            foreign.append(point_id)
+            continue
+        hashes, ids = by_source.setdefault(source, (set(), []))
+        hashes.add(metadata.get("file_hash"))
+        ids.append(point_id)
+    files = {
+        source: {"hash": next(iter(hashes)) if len(hashes) == 1 else None, "chunk_ids": ids}
+        for source, (hashes, ids) in by_source.items()
+    }
+    return files, foreign
+
+
+def save_manifest(collection: str, embed_model: str, files: Dict[str, Any]) -> None:
+    """Atomically persist the manifest entry for this collection."""
+    try:
+        with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+    data[collection] = {"embed_model": embed_model, "schema": SCHEMA_VERSION, "files": files}
+
+    Path(MANIFEST_PATH).parent.mkdir(parents=True, exist_ok=True)
+    tmp = f"{MANIFEST_PATH}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, MANIFEST_PATH)
@@ -0,0 +1,78 @@
+"""
+Parallel document loading and chunking for ingestion.
+
+Files are hashed, loaded and split in a process pool and yielded as they finish,
+with a bounded number of files in flight, so memory stays proportional to the
+window and the embedding batch rather than to the corpus. This module only
+imports the loaders and the splitter: spawned workers never pull in torch.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from langchain_community.document_loaders import TextLoader, PyPDFLoader
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from ingest_manifest import file_hash
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+
+# (source, content hash or None on failure, [(text, metadata)] or None if unchanged, error)
+SplitResult = Tuple[str, Optional[str], Optional[List[Tuple[str, dict]]], Optional[str]]
+
+
+def load_one(path: Path):
+    """Load a single document based on file extension."""
+    if path.suffix.lower() in [".md", ".txt"]:
+        return TextLoader(str(path), encoding="utf-8").load()
+    if path.suffix.lower() == ".pdf":
+        return PyPDFLoader(str(path)).load()
+    return []
+
+
+def splitter():
+    """Create text splitter with reasonable chunk size and overlap."""
+    return RecursiveCharacterTextSplitter(
+        chunk_size=800,
+        chunk_overlap=100,
+        separators=["\n\n", "\n", ". ", " "]
+    )
+
+
+def load_and_split(source: str, previous_hash: Optional[str]) -> SplitResult:
+    """Hash a file and, if it changed, load and split it into (text, metadata) chunks."""
+    try:
+        digest = file_hash(Path(source))
+        if digest == previous_hash:
+            return source, digest, None, None
+        chunks = splitter().split_documents(load_one(Path(source)))
+        return source, digest, [(c.page_content, c.metadata) for c in chunks], None
+    except Exception as e:
+        return source, None, None, str(e)
+
+
+def iter_split_files(items: Iterable[Tuple[str, Optional[str]]], workers: int = None) -> Iterator[SplitResult]:
+    """Yield load_and_split results for (source, previous_hash) items as workers finish them."""
+    workers = INGEST_WORKERS if workers is None else workers
+    items = iter(items)
+    if workers <= 1:
+        for source, previous_hash in items:
+            yield load_and_split(source, previous_hash)
+        return
+
+    # spawn, not fork: the server process has live threads (audit shipper, tokenizers)
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        window = workers * 2
+        pending = {pool.submit(load_and_split, *item) for item in islice(items, window)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+                nxt = next(items, None)
+                if nxt is not None:
+                    pending.add(pool.submit(load_and_split, *nxt))
@@ -0,0 +1,183 @@
+"""
+In-process BM25 index over the ingested chunks, fused with vector results via RRF.
+
+Chunks are tokenized at ingestion time into an inverted index whose posting
+lists are compact parallel arrays (doc slot, term frequency). Exact terms that
+embeddings blur - "per diem", "carry-over", claim codes like "TR-104" - score
+through BM25 and are merged with the vector ranking by reciprocal rank fusion.
+Like LocalVectorStore, state is an append-only JSON lines log of adds and
+deletions, replayed on load and compacted when mostly tombstones.
+"""
+
+import heapq
+import json
+import math
+import re
+import threading
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+# Words joined by - _ . / stay one token ("carry-over", "tr-104") and also yield their parts
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+_SPLIT_RE = re.compile(r"[-_./]")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do for from has have how i if in is it its me my of on or our "
+    "should that the their there this to was we what when where which who will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(p for p in _SPLIT_RE.split(token) if p and p not in _STOPWORDS)
+    return tokens
+
+
+class LexicalIndex:
+    def __init__(self, directory: str, collection_name: str = "aurora", k1: float = 1.2, b: float = 0.75):
+        self.k1, self.b = k1, b
+        self.dir = Path(directory) / collection_name
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._log_path = self.dir / "docs.jsonl"
+
+        self._lock = threading.Lock()
+        self._docs: List[Optional[Tuple[str, str, Dict[str, Any]]]] = []   # slot -> (id, text, metadata)
+        self._lengths = array("I")
+        self._slot_of: Dict[str, int] = {}
+        self._postings: Dict[str, Tuple[array, array]] = {}   # term -> (slots, term frequencies)
+        self._total_len = 0
+        self._dead = 0
+        self._load()
+
+    # --- persistence -------------------------------------------------------
+
+    def _load(self):
+        if not self._log_path.exists():
+            return
+        with open(self._log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # torn trailing line
+                if "deleted" in rec:
+                    self._remove(rec["deleted"])
+                else:
+                    self._insert(rec["id"], rec["text"], rec["metadata"])
+        if self._dead > len(self._slot_of):
+            self._compact()
+
+    def _compact(self):
+        """Rewrite the log and the postings without tombstones."""
+        live = [doc for doc in self._docs if doc is not None]
+        self._docs, self._lengths, self._slot_of, self._postings = [], array("I"), {}, {}
+        self._total_len = self._dead = 0
+        tmp = self._log_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for point_id, text, metadata in live:
+                f.write(json.dumps({"id": point_id, "text": text, "metadata": metadata}) + "\n")
+                self._insert(point_id, text, metadata)
+        tmp.replace(self._log_path)
+
+    # --- writes ------------------------------------------------------------
+
+    def _insert(self, point_id: str, text: str, metadata: Dict[str, Any]):
+        if point_id in self._slot_of:
+            self._remove(point_id)
+        tokens = tokenize(text)
+        slot = len(self._docs)
+        self._docs.append((point_id, text, metadata))
+        self._lengths.append(len(tokens))
+        self._slot_of[point_id] = slot
+        self._total_len += len(tokens)
+        for term, tf in Counter(tokens).items():
+            posting = self._postings.get(term)
+            if posting is None:
+                posting = self._postings[term] = (array("I"), array("H"))
+            posting[0].append(slot)
+            posting[1].append(min(tf, 65535))
+
+    def _remove(self, point_id: str):
+        slot = self._slot_of.pop(point_id, None)
+        if slot is not None:
+            self._docs[slot] = None
+            self._total_len -= self._lengths[slot]
+            self._dead += 1
+
+    def add(self, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]]):
+        """Index chunks under the same ids as the vector store. Existing ids are replaced."""
+        with self._lock:
+            with open(self._log_path, "a", encoding="utf-8") as f:
+                for point_id, text, metadata in zip(ids, texts, metadatas):
+                    f.write(json.dumps({"id": point_id, "text": text, "metadata": metadata}) + "\n")
+                    self._insert(point_id, text, metadata)
+
+    def delete(self, ids: Iterable[str]):
+        with self._lock:
+            with open(self._log_path, "a", encoding="utf-8") as f:
+                for point_id in ids:
+                    if point_id in self._slot_of:
+                        f.write(json.dumps({"deleted": point_id}) + "\n")
+                        self._remove(point_id)
+            if self._dead > max(1000, len(self._slot_of)):
+                self._compact()
+
+    def count(self) -> int:
+        return len(self._slot_of)
+
+    # --- search ------------------------------------------------------------
+
+    def search(self, query: str, k: int, filter: Optional[Dict[str, Any]] = None) -> List[Tuple[Document, float]]:
+        """Top-k chunks by BM25 for the query terms, restricted to the metadata filter spec."""
+        allowed = {f: set(v) if isinstance(v, (list, tuple, set)) else {v} for f, v in (filter or {}).items()}
+        with self._lock:
+            n = len(self._slot_of)
+            if n == 0:
+                return []
+            docs, lengths = self._docs, self._lengths
+            avg_len = self._total_len / n or 1.0
+            k1, b = self.k1, self.b
+            scores: Dict[int, float] = {}
+            for term in set(tokenize(query)):
+                posting = self._postings.get(term)
+                if posting is None:
+                    continue
+                slots, tfs = posting
+                # df counts tombstoned slots too until compaction; close enough for ranking
+                df = min(len(slots), n)
+                idf = math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+                for slot, tf in zip(slots, tfs):
+                    if docs[slot] is None:
+                        continue
+                    norm = k1 * (1.0 - b + b * lengths[slot] / avg_len)
+                    scores[slot] = scores.get(slot, 0.0) + idf * tf * (k1 + 1.0) / (tf + norm)
+            if allowed:
+                scores = {s: v for s, v in scores.items()
+                          if all(docs[s][2].get(f) in vals for f, vals in allowed.items())}
+            top = heapq.nlargest(k, scores.items(), key=lambda kv: kv[1])
+            return [(Document(page_content=docs[s][1], metadata=docs[s][2]), score) for s, score in top]
+
+
+def doc_key(doc: Document) -> Tuple[str, str]:
+    """Identity of a chunk across backends (Qdrant payloads don't carry the point id)."""
+    return doc.metadata.get("source", ""), doc.page_content
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int, c: int = 60) -> List[Document]:
+    """Merge ranked lists by sum of 1 / (c + rank); documents found by several rankers rise."""
+    scores: Dict[Tuple[str, str], float] = {}
+    first: Dict[Tuple[str, str], Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            key = doc_key(doc)
+            first.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (c + rank + 1)
+    return [first[key] for key in sorted(scores, key=scores.get, reverse=True)[:k]]
@@ -0,0 +1,373 @@
+"""
+Shared LLM gateway used by every agent.
+
+One OpenAI / AsyncOpenAI client pair over tuned keep-alive connection pools,
+with the SDK's own retries disabled in favour of:
+  - a per-call deadline covering every attempt and backoff sleep,
+  - full-jitter exponential retries on 429 / 408 / 5xx / connection errors
+    (a Retry-After hint is honoured when it fits the deadline),
+  - a circuit breaker: after LLM_BREAKER_FAILURES consecutive failed calls,
+    calls fail fast with CircuitOpenError for LLM_BREAKER_RESET_S, then a
+    single probe decides whether to close it again. Agents catch LLMError
+    and serve their fallback plan/answer,
+  - optional hedging (async, non-streaming): when the first request has not
+    answered by the observed p95 latency (or LLM_HEDGE_AFTER_MS), a second
+    identical request is sent and whichever finishes first wins.
+
+Every successful call reports its token usage, time to first token and total
+model time (retries and backoff included) to the current request's metrics.
+
+Point OPENAI_BASE_URL at a local stub server to exercise all of this without
+the real API (see benchmarks/bench_llm_gateway.py).
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Optional
+
+import metrics
+import request_metrics
+from settings import settings
+from structured_log import get_logger
+
+log = get_logger(__name__)
+
+
+class LLMError(Exception):
+    """The LLM call failed after retries, ran out of deadline, or the circuit is open."""
+
+
+class CircuitOpenError(LLMError):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, failures: int, reset_s: float):
+        self.failures = max(1, failures)
+        self.reset_s = reset_s
+        self._lock = threading.Lock()
+        self._consecutive = 0
+        self._opened_at: Optional[float] = None
+        self._probe_at: Optional[float] = None   # a probe that never reports (cancelled) expires after reset_s
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self._opened_at >= self.reset_s else "open"
+
+    def allow(self) -> bool:
+        """Closed: always. Open: never until reset_s has passed, then one probe at a time."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at < self.reset_s:
+                return False
+            if self._probe_at is not None and now - self._probe_at < self.reset_s:
+                return False
+            self._probe_at = now
+            return True
+
+    def record(self, ok: bool):
+        with self._lock:
+            self._probe_at = None
+            if ok:
+                self._consecutive = 0
+                self._opened_at = None
+                return
+            self._consecutive += 1
+            if self._opened_at is not None or self._consecutive >= self.failures:
+                if self._opened_at is None:
+                    self.trips += 1
+                self._opened_at = time.monotonic()
+
+
+def _status(e: Exception) -> Optional[int]:
+    return getattr(e, "status_code", None)
+
+
+def _retryable(e: Exception) -> bool:
+    import openai
+    if isinstance(e, (openai.APIConnectionError, asyncio.TimeoutError)):   # includes APITimeoutError
+        return True
+    status = _status(e)
+    return status is not None and (status in (408, 409, 429) or status >= 500)
+
+
+def _retry_after(e: Exception) -> Optional[float]:
+    response = getattr(e, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+class LLMGateway:
+    def __init__(self, api_key: str = None, base_url: str = None, deadline_s: float = None,
+                 max_retries: int = None, hedge: bool = None, hedge_after_ms: float = None):
+        self.api_key = api_key if api_key is not None else settings.OPENAI_API_KEY
+        self.base_url = base_url if base_url is not None else settings.OPENAI_BASE_URL
+        self.deadline_s = deadline_s if deadline_s is not None else settings.LLM_DEADLINE_S
+        self.max_retries = max_retries if max_retries is not None else settings.LLM_MAX_RETRIES
+        self.hedge = hedge if hedge is not None else settings.LLM_HEDGE_ENABLED
+        self.hedge_after_ms = hedge_after_ms if hedge_after_ms is not None else settings.LLM_HEDGE_AFTER_MS
+        self.breaker = CircuitBreaker(settings.LLM_BREAKER_FAILURES, settings.LLM_BREAKER_RESET_S)
+
+        self._client = None
+        self._aclient = None
+        self._lock = threading.Lock()
+        self._latencies: deque = deque(maxlen=500)   # seconds, successful attempts
+        self.calls = self.failures = self.retries = self.rejected = 0
+        self.hedges = self.hedge_wins = 0
+
+    # --- clients -------------------------------------------------------------
+
+    def _limits(self):
+        import httpx
+        return dict(
+            limits=httpx.Limits(max_connections=settings.LLM_POOL_MAX_CONNECTIONS,
+                                max_keepalive_connections=settings.LLM_POOL_KEEPALIVE,
+                                keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY_S),
+            timeout=httpx.Timeout(self.deadline_s, connect=settings.LLM_CONNECT_TIMEOUT_S),
+        )
+
+    @property
+    def client(self):
+        """Shared sync OpenAI client (created on first use; importing this module stays cheap)."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from openai import OpenAI, DefaultHttpxClient
+                    self._client = OpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0,
+                                          http_client=DefaultHttpxClient(**self._limits()))
+        return self._client
+
+    @property
+    def aclient(self):
+        """Shared AsyncOpenAI client; its pool belongs to the serving event loop."""
+        if self._aclient is None:
+            with self._lock:
+                if self._aclient is None:
+                    from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+                    self._aclient = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0,
+                                                http_client=DefaultAsyncHttpxClient(**self._limits()))
+        return self._aclient
+
+    # --- policy --------------------------------------------------------------
+
+    def _admit(self):
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise CircuitOpenError(f"LLM circuit open after {self.breaker.failures} consecutive failures")
+        self.calls += 1
+
+    def _backoff(self, attempt: int, e: Exception) -> float:
+        hint = _retry_after(e)
+        if hint is not None:
+            return hint + random.uniform(0, settings.LLM_RETRY_BASE_MS / 1000)
+        cap = min(settings.LLM_RETRY_MAX_MS, settings.LLM_RETRY_BASE_MS * 2 ** attempt) / 1000
+        return random.uniform(0, cap)
+
+    def _next_delay(self, attempt: int, e: Exception, deadline: float) -> Optional[float]:
+        """Sleep before the next attempt, None when retries are spent; non-retryable errors re-raise."""
+        if not _retryable(e):
+            self.breaker.record(True)   # the API answered; a bad request says nothing about its health
+            raise e
+        delay = self._backoff(attempt, e)
+        if attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+            return None
+        self.retries += 1
+        return delay
+
+    def _fail(self, e: Exception, attempts: int) -> LLMError:
+        self.failures += 1
+        self.breaker.record(False)
+        log.warning("LLM call failed", attempts=attempts, error_type=type(e).__name__, error=str(e))
+        return LLMError(f"LLM unavailable: {type(e).__name__}: {e}")
+
+    def _succeeded(self, started: float):
+        self._latencies.append(time.monotonic() - started)
+        self.breaker.record(True)
+
+    @staticmethod
+    def _account(response, called: float):
+        """Usage and model time for the request; a non-streamed answer's first token is its last."""
+        ms = (time.monotonic() - called) * 1000
+        request_metrics.record_usage(getattr(response, "usage", None))
+        request_metrics.record_stage("llm_first_token", ms)
+        request_metrics.record_stage("llm_total", ms)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging: LLM_HEDGE_AFTER_MS, else the p95 of recent calls."""
+        if self.hedge_after_ms:
+            return self.hedge_after_ms / 1000
+        if len(self._latencies) < settings.LLM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    # --- sync ----------------------------------------------------------------
+
+    def chat(self, deadline_s: float = None, **kwargs):
+        """chat.completions.create(**kwargs) under the gateway's deadline, retry and breaker policy."""
+        self._admit()
+        called = time.monotonic()
+        deadline = called + (deadline_s or self.deadline_s)
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            try:
+                response = self.client.chat.completions.create(timeout=max(deadline - started, 0.01), **kwargs)
+                self._succeeded(started)
+                self._account(response, called)
+                return response
+            except Exception as e:
+                delay = self._next_delay(attempt, e, deadline)
+                if delay is None:
+                    raise self._fail(e, attempt + 1) from e
+            attempt += 1
+            time.sleep(delay)
+
+    # --- async ---------------------------------------------------------------
+
+    async def _acreate(self, kwargs: Dict[str, Any], timeout: float):
+        started = time.monotonic()
+        response = await asyncio.wait_for(
+            self.aclient.chat.completions.create(timeout=timeout, **kwargs), timeout)
+        self._succeeded(started)
+        return response
+
+    async def _ahedged(self, kwargs: Dict[str, Any], timeout: float):
+        """First request, plus a second one if the first is still running after hedge_delay()."""
+        delay = self.hedge_delay()
+        first = asyncio.ensure_future(self._acreate(kwargs, timeout))
+        if delay is None or delay >= timeout:
+            return await first
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+        self.hedges += 1
+        second = asyncio.ensure_future(self._acreate(kwargs, timeout - delay))
+        pending = {first, second}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def achat(self, deadline_s: float = None, hedge: bool = None, **kwargs):
+        """Async chat.completions.create(**kwargs); hedged when enabled and the call is not streamed."""
+        self._admit()
+        called = time.monotonic()
+        deadline = called + (deadline_s or self.deadline_s)
+        hedge = self.hedge if hedge is None else hedge
+        attempt = 0
+        while True:
+            timeout = max(deadline - time.monotonic(), 0.01)
+            try:
+                if hedge:
+                    response = await self._ahedged(kwargs, timeout)
+                else:
+                    response = await self._acreate(kwargs, timeout)
+                self._account(response, called)
+                return response
+            except Exception as e:
+                delay = self._next_delay(attempt, e, deadline)
+                if delay is None:
+                    raise self._fail(e, attempt + 1) from e
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def astream(self, deadline_s: float = None, **kwargs) -> AsyncIterator[Any]:
+        """Stream completion chunks. Opening the stream is retried; a stream that fails midway is not.
+
+        Usage is requested in the final chunk (stream_options.include_usage), whose choices are empty.
+        """
+        self._admit()
+        called = time.monotonic()
+        deadline = called + (deadline_s or self.deadline_s)
+        kwargs.setdefault("stream_options", {"include_usage": True})
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            timeout = max(deadline - started, 0.01)
+            try:
+                stream = await asyncio.wait_for(
+                    self.aclient.chat.completions.create(timeout=timeout, stream=True, **kwargs), timeout)
+                self._succeeded(started)
+                break
+            except Exception as e:
+                delay = self._next_delay(attempt, e, deadline)
+                if delay is None:
+                    raise self._fail(e, attempt + 1) from e
+            attempt += 1
+            await asyncio.sleep(delay)
+        first = None
+        try:
+            async for chunk in stream:
+                if first is None and chunk.choices and chunk.choices[0].delta.content:
+                    first = time.monotonic()
+                    request_metrics.record_stage("llm_first_token", (first - called) * 1000)
+                if getattr(chunk, "usage", None) is not None:
+                    request_metrics.record_usage(chunk.usage)
+                yield chunk
+        finally:
+            request_metrics.record_stage("llm_total", (time.monotonic() - called) * 1000)
+
+    # --- reporting -----------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        ordered = sorted(self._latencies)
+        pct = lambda q: int(ordered[int(q * (len(ordered) - 1))] * 1000) if ordered else None
+        return {
+            "circuit": self.breaker.state,
+            "circuit_trips": self.breaker.trips,
+            "calls": self.calls,
+            "failures": self.failures,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "p50_ms": pct(0.5),
+            "p95_ms": pct(0.95),
+        }
+
+
+gateway = LLMGateway()
+
+
+def _collect():
+    stats = gateway.stats()
+    yield ("llm_calls", "counter", "LLM calls admitted by the gateway.", [({}, stats["calls"])])
+    yield ("llm_failures", "counter", "LLM calls that failed after retries.", [({}, stats["failures"])])
+    yield ("llm_retries", "counter", "LLM retry attempts.", [({}, stats["retries"])])
+    yield ("llm_rejected", "counter", "LLM calls rejected by the open circuit.", [({}, stats["rejected"])])
+    yield ("llm_hedges", "counter", "Hedged second requests sent.", [({}, stats["hedges"])])
+    yield ("llm_hedge_wins", "counter", "Hedged requests that answered first.", [({}, stats["hedge_wins"])])
+    yield ("llm_circuit_trips", "counter", "Times the circuit breaker opened.", [({}, stats["circuit_trips"])])
+    yield ("llm_circuit_state", "gauge", "1 for the circuit breaker's current state.",
+           [({"state": state}, int(state == stats["circuit"])) for state in ("closed", "open", "half_open")])
+
+
+metrics.register_collector("llm_gateway", _collect)
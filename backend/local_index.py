@@ -0,0 +1,303 @@
+"""
+In-process vector index used when Qdrant is not configured or unreachable.
+
+Vectors are L2-normalized float32 rows in a memory-mapped file, so cosine
+similarity is a single matrix-vector product and top-k is an argpartition.
+Documents and deletions are kept in an append-only JSON lines log next to the
+matrix and replayed on load. Once dead rows (replaced or deleted) outnumber half
+the live ones, the live rows are copied into a fresh matrix and log, and
+meta.json is switched to that generation in one rename. It implements the LangChain VectorStore interface,
+so rag.retrieve and the ingestion path use it exactly like the Qdrant store.
+"""
+
+import json
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from structured_log import get_logger
+
+log = get_logger(__name__)
+
+_COPY_ROWS = 4096   # rows copied per slice while compacting
+
+
+class LocalVectorStore(VectorStore):
+    def __init__(self, directory: str, embeddings: Embeddings, collection_name: str = "aurora"):
+        self._embeddings = embeddings
+        self.collection_name = collection_name
+        self.dir = Path(directory) / collection_name
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._meta_path = self.dir / "meta.json"
+        self._generation = 0
+        self._vec_path, self._log_path = self._paths(0)
+
+        self._lock = threading.Lock()
+        self._dim: Optional[int] = None
+        self._mm = None
+        self._capacity = 0
+        self._rows = 0
+        self._alive = np.zeros(0, dtype=bool)
+        self._docs: List[Optional[Tuple[str, str, Dict[str, Any]]]] = []  # row -> (id, text, metadata)
+        self._row_of: Dict[str, int] = {}
+        self._masks: Dict[tuple, np.ndarray] = {}  # filter spec -> row mask, reset on every write
+        self._load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embeddings
+
+    # --- persistence -------------------------------------------------------
+
+    def _paths(self, generation: int) -> Tuple[Path, Path]:
+        """Matrix and log files of a generation; generation 0 keeps the original names."""
+        if generation == 0:
+            return self.dir / "vectors.f32", self.dir / "docs.jsonl"
+        return self.dir / f"vectors.{generation}.f32", self.dir / f"docs.{generation}.jsonl"
+
+    def _write_meta(self):
+        tmp = self._meta_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"dim": self._dim, "generation": self._generation}))
+        tmp.replace(self._meta_path)
+
+    def _load(self):
+        try:
+            meta = json.loads(self._meta_path.read_text())
+            self._dim = int(meta["dim"])
+            self._generation = int(meta.get("generation", 0))
+        except (OSError, ValueError, KeyError):
+            return
+        self._vec_path, self._log_path = self._paths(self._generation)
+        self._open_memmap()
+        skipped = 0
+        if self._log_path.exists():
+            with open(self._log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # torn trailing line
+                    if "deleted" in rec:
+                        self._tombstone(rec["deleted"])
+                    elif 0 <= rec["row"] < self._capacity:
+                        self._register(rec["id"], rec["row"], rec["text"], rec["metadata"])
+                    else:
+                        skipped += 1   # the matrix file is shorter than the log says
+        if skipped:
+            log.warning("local index rows beyond the vector file were skipped", path=str(self._log_path),
+                        skipped=skipped, capacity=self._capacity)
+        if self._needs_compaction():
+            self._compact()
+
+    def _open_memmap(self):
+        row_bytes = self._dim * 4
+        size = self._vec_path.stat().st_size if self._vec_path.exists() else 0
+        self._capacity = size // row_bytes
+        self._mm = (np.memmap(self._vec_path, dtype=np.float32, mode="r+", shape=(self._capacity, self._dim))
+                    if self._capacity else None)
+        if len(self._alive) < self._capacity:
+            self._alive = np.concatenate([self._alive, np.zeros(self._capacity - len(self._alive), dtype=bool)])
+
+    def _ensure_capacity(self, rows: int):
+        if rows <= self._capacity:
+            return
+        new_capacity = max(rows, self._capacity * 2, 1024)
+        if self._mm is not None:
+            self._mm.flush()
+            self._mm = None
+        self._vec_path.touch(exist_ok=True)
+        os.truncate(self._vec_path, new_capacity * self._dim * 4)
+        self._open_memmap()
+
+    def _register(self, point_id: str, row: int, text: str, metadata: Dict[str, Any]):
+        if not 0 <= row < self._capacity:
+            raise IndexError(f"row {row} is outside the vector file ({self._capacity} rows)")
+        self._masks.clear()
+        if point_id in self._row_of:
+            self._tombstone(point_id)
+        while len(self._docs) <= row:
+            self._docs.append(None)
+        self._docs[row] = (point_id, text, metadata)
+        self._row_of[point_id] = row
+        self._alive[row] = True
+        self._rows = max(self._rows, row + 1)
+
+    def _tombstone(self, point_id: str):
+        self._masks.clear()
+        row = self._row_of.pop(point_id, None)
+        if row is not None:
+            self._alive[row] = False
+            self._docs[row] = None
+
+    def _needs_compaction(self) -> bool:
+        live = len(self._row_of)
+        return self._rows - live > max(1000, live // 2)
+
+    def _compact(self):
+        """Copy the live rows into the next generation's matrix and log, then switch meta.json to it."""
+        live = np.flatnonzero(self._alive[:self._rows])
+        generation = self._generation + 1
+        vec_path, log_path = self._paths(generation)
+        capacity = max(len(live), 1024)
+        mm = np.memmap(vec_path, dtype=np.float32, mode="w+", shape=(capacity, self._dim))
+        for start in range(0, len(live), _COPY_ROWS):
+            rows = live[start:start + _COPY_ROWS]
+            mm[start:start + len(rows)] = self._mm[rows]
+        mm.flush()
+        del mm
+        docs = [self._docs[row] for row in live]
+        with open(log_path, "w", encoding="utf-8") as f:
+            for row, (point_id, text, metadata) in enumerate(docs):
+                f.write(json.dumps({"id": point_id, "row": row, "text": text, "metadata": metadata}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        # The meta.json rename is the switch; a crash before it leaves the old generation in use
+        old_paths, dead = (self._vec_path, self._log_path), self._rows - len(live)
+        self._generation = generation
+        self._write_meta()
+        self._vec_path, self._log_path = vec_path, log_path
+        self._mm, self._alive = None, np.zeros(0, dtype=bool)
+        self._open_memmap()
+        self._alive[:len(docs)] = True
+        self._docs = docs
+        self._row_of = {doc[0]: row for row, doc in enumerate(docs)}
+        self._rows = len(docs)
+        self._masks.clear()
+        for path in old_paths:
+            path.unlink(missing_ok=True)
+        log.info("local index compacted", collection=self.collection_name, live=len(docs), dropped=dead,
+                 generation=generation)
+
+    # --- writes ------------------------------------------------------------
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        m = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(m, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return m / norms
+
+    def add_vectors(self, vectors, texts: List[str], metadatas: List[Dict[str, Any]], ids: List[str]) -> List[str]:
+        """Upsert precomputed vectors. Existing ids are replaced."""
+        matrix = self._normalize(vectors)
+        with self._lock:
+            if self._dim is None:
+                self._dim = matrix.shape[1]
+                self._write_meta()
+            start = self._rows
+            self._ensure_capacity(start + len(ids))
+            self._mm[start:start + len(ids)] = matrix
+            self._mm.flush()
+            # Vectors are flushed before the log, so a logged row always has its vector
+            with open(self._log_path, "a", encoding="utf-8") as f:
+                for offset, (point_id, text, metadata) in enumerate(zip(ids, texts, metadatas)):
+                    row = start + offset
+                    f.write(json.dumps({"id": point_id, "row": row, "text": text, "metadata": metadata}) + "\n")
+                    self._register(point_id, row, text, metadata)
+            if self._needs_compaction():
+                self._compact()
+        return list(ids)
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        return self.add_vectors(self._embeddings.embed_documents(texts), texts, metadatas, ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+        with self._lock:
+            with open(self._log_path, "a", encoding="utf-8") as f:
+                for point_id in ids:
+                    if point_id in self._row_of:
+                        f.write(json.dumps({"deleted": point_id}) + "\n")
+                        self._tombstone(point_id)
+            if self._needs_compaction():
+                self._compact()
+        return True
+
+    def count(self) -> int:
+        return len(self._row_of)
+
+    def points(self) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """Snapshot of the live (id, text, metadata) entries."""
+        with self._lock:
+            return [doc for doc in self._docs if doc is not None]
+
+    # --- search ------------------------------------------------------------
+
+    def _mask(self, filter: Optional[Dict[str, Any]], n: int) -> np.ndarray:
+        """Rows that are alive and match the metadata filter spec ({field: value or [values]})."""
+        if not filter:
+            return self._alive[:n]
+        key = tuple(sorted((f, tuple(v) if isinstance(v, (list, tuple, set)) else (v,)) for f, v in filter.items()))
+        mask = self._masks.get(key)
+        if mask is None or len(mask) != n:
+            allowed = {f: set(values) for f, values in key}
+            mask = np.fromiter(
+                (doc is not None and all(doc[2].get(f) in vals for f, vals in allowed.items())
+                 for doc in self._docs[:n]),
+                dtype=bool, count=n,
+            ) & self._alive[:n]
+            self._masks[key] = mask
+        return mask
+
+    def search_many(self, vectors, k: int, filter: Optional[Dict[str, Any]] = None) -> List[List[Tuple[Document, float]]]:
+        """Top-k for a batch of query vectors with one matrix product."""
+        queries = self._normalize(vectors)
+        if queries.ndim == 1:
+            queries = queries[None, :]
+        with self._lock:
+            n = self._rows
+            if n == 0 or self._mm is None:
+                return [[] for _ in range(len(queries))]
+            scores = queries @ self._mm[:n].T
+            scores[:, ~self._mask(filter, n)] = -np.inf
+            docs = self._docs
+
+        k = min(k, n)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for qi in range(len(queries)):
+            order = top[qi][np.argsort(-scores[qi, top[qi]])]
+            hits = []
+            for row in order:
+                if not np.isfinite(scores[qi, row]) or docs[row] is None:
+                    continue
+                _, text, metadata = docs[row]
+                hits.append((Document(page_content=text, metadata=metadata), float(scores[qi, row])))
+            results.append(hits)
+        return results
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                               filter: Optional[Dict[str, Any]] = None) -> List[Tuple[Document, float]]:
+        return self.search_many([embedding], k, filter)[0]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4,
+                                    filter: Optional[Dict[str, Any]] = None, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, filter)]
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None,
+                          **kwargs: Any) -> List[Document]:
+        return self.similarity_search_by_vector(self._embeddings.embed_query(query), k, filter)
+
+    def _select_relevance_score_fn(self):
+        # Scores are cosine similarities in [-1, 1]
+        return lambda score: (score + 1.0) / 2.0
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   directory: str = "/tmp/data/local_index", collection_name: str = "aurora", **kwargs: Any):
+        store = cls(directory, embedding, collection_name)
+        store.add_texts(texts, metadatas, kwargs.get("ids"))
+        return store
@@ -0,0 +1,354 @@
+"""
+In-process metrics registry with Prometheus text exposition (served at /metrics).
+
+Counters and fixed-bucket histograms are cheap enough to leave on at full load:
+each thread writes to its own shard (a plain list reached through a
+threading.local), so an observation takes no lock and never contends with
+other threads or with a scrape. A scrape sums the shards. When a thread exits
+its shard is folded into a retired total and dropped, so totals never go
+backwards while the number of shards follows the live threads.
+
+Values that already live elsewhere (audit spool depth, DB pool usage, cache
+hit counts, LLM gateway counters) are read at scrape time by collectors that
+the owning module registers on import, so they cost nothing between scrapes.
+
+Benchmark: benchmarks/bench_metrics.py
+"""
+
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+PREFIX = "aurora_"
+
+# Seconds; spans a cache hit (sub-ms) up to an LLM call at its deadline
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _ShardAnchor:
+    """Sits in the thread-local next to a shard; freed when the thread exits."""
+    __slots__ = ("__weakref__",)
+
+
+class _Sharded:
+    """Per-thread value slots; writers touch only their own list.
+
+    Threads come and go (the threadpool, asyncio.to_thread, ingest workers), so
+    an exiting thread's shard is folded into a retired total and dropped.
+    """
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._shards: Dict[int, List[float]] = {}   # id(shard) -> shard of a live thread
+        self._retired = [0] * size
+        self._lock = threading.Lock()   # only taken when a thread first writes and when it exits
+
+    def _new_shard(self) -> List[float]:
+        shard = [0] * self._size
+        with self._lock:
+            self._shards[id(shard)] = shard
+        self._local.shard = shard
+        self._local.anchor = anchor = _ShardAnchor()
+        weakref.finalize(anchor, self._retire, shard)
+        return shard
+
+    def _retire(self, shard: List[float]):
+        with self._lock:
+            for i, v in enumerate(shard):
+                self._retired[i] += v
+            del self._shards[id(shard)]
+
+    def _totals(self) -> List[float]:
+        with self._lock:
+            totals = list(self._retired)
+            shards = list(self._shards.values())
+        for shard in shards:
+            for i, v in enumerate(shard):
+                totals[i] += v
+        return totals
+
+
+class _CounterChild(_Sharded):
+    def __init__(self):
+        super().__init__(1)
+
+    def inc(self, amount: float = 1):
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        shard[0] += amount
+
+    def value(self) -> float:
+        return self._totals()[0]
+
+
+class _HistogramChild(_Sharded):
+    """Slots: one per bucket plus +Inf, then the sum."""
+
+    def __init__(self, buckets: Sequence[float]):
+        super().__init__(len(buckets) + 2)
+        self._buckets = buckets
+        self._sum_slot = len(buckets) + 1
+
+    def observe(self, value: float):
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        shard[bisect_left(self._buckets, value)] += 1
+        shard[self._sum_slot] += value
+
+    def time(self):
+        return _Timer(self)
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        """(cumulative count per bucket incl. +Inf, sum)."""
+        totals = self._totals()
+        cumulative, running = [], 0
+        for n in totals[:-1]:
+            running += n
+            cumulative.append(running)
+        return cumulative, totals[-1]
+
+
+class _Timer:
+    """`with histogram.time():` observes the block's duration in seconds."""
+    __slots__ = ("_child", "_t0")
+
+    def __init__(self, child: _HistogramChild):
+        self._child = child
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._child.observe(time.perf_counter() - self._t0)
+        return False
+
+
+class _Family:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = PREFIX + name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """The child for these label values (created once; later lookups are a dict hit)."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(tuple(str(v) for v in values), self._new_child())
+                self._children[values] = child
+        return child
+
+    def _items(self):
+        with self._lock:
+            items = list(self._children.items())
+        seen = set()
+        for values, child in items:
+            if id(child) not in seen:   # the same child may be keyed by raw and str() values
+                seen.add(id(child))
+                yield dict(zip(self.labelnames, (str(v) for v in values))), child
+
+
+class Counter(_Family):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1):
+        self._children[()].inc(amount)
+
+    def samples(self):
+        for labels, child in self._items():
+            yield self.name + "_total", labels, child.value()
+
+
+class Histogram(_Family):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._children[()].observe(value)
+
+    def time(self):
+        return self._children[()].time()
+
+    def samples(self):
+        bounds = [_format(b) for b in self.buckets] + ["+Inf"]
+        for labels, child in self._items():
+            cumulative, total = child.snapshot()
+            for le, count in zip(bounds, cumulative):
+                yield self.name + "_bucket", {**labels, "le": le}, count
+            yield self.name + "_sum", labels, total
+            yield self.name + "_count", labels, cumulative[-1]
+
+
+# A collector returns (name, kind, help, [(labels, value), ...]) families, read at scrape time
+Collector = Callable[[], Iterable[Tuple[str, str, str, Iterable[Tuple[Dict[str, str], float]]]]]
+
+_families: Dict[str, _Family] = {}
+_collectors: Dict[str, Collector] = {}
+_registry_lock = threading.Lock()
+
+
+def _register(family: _Family) -> _Family:
+    with _registry_lock:
+        existing = _families.get(family.name)
+        if existing is not None:   # module reloaded: keep accumulating into the original
+            return existing
+        _families[family.name] = family
+    return family
+
+
+def counter(name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+    return _register(Counter(name, help, labelnames))
+
+
+def histogram(name: str, help: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+    return _register(Histogram(name, help, labelnames, buckets))
+
+
+def register_collector(key: str, collector: Collector):
+    """Register (or replace) a scrape-time reader of values another module already tracks."""
+    with _registry_lock:
+        _collectors[key] = collector
+
+
+def _format(value) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _sample_line(name: str, labels: Optional[Dict[str, str]], value) -> str:
+    if labels:
+        rendered = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items())
+        return f"{name}{{{rendered}}} {_format(value)}"
+    return f"{name} {_format(value)}"
+
+
+def render() -> str:
+    """All metrics in Prometheus text exposition format 0.0.4."""
+    lines = []
+    with _registry_lock:
+        families = list(_families.values())
+        collectors = list(_collectors.items())
+    for family in families:
+        lines.append(f"# HELP {family.name} {family.help}")
+        lines.append(f"# TYPE {family.name} {family.kind}")
+        lines.extend(_sample_line(name, labels, value) for name, labels, value in family.samples())
+    # Several collectors may report into one family (e.g. each cache adds its own label)
+    collected: Dict[str, tuple] = {}
+    for key, collector in collectors:
+        try:
+            families = list(collector())
+        except Exception as e:
+            # One broken source must not take the whole scrape down
+            from structured_log import get_logger   # structured_log counts its drops here
+            get_logger(__name__).warning("metrics collector failed", collector=key, error=str(e))
+            continue
+        for name, kind, help, samples in families:
+            collected.setdefault(PREFIX + name, (kind, help, []))[2].extend(samples)
+    for name, (kind, help, samples) in collected.items():
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+        suffix = "_total" if kind == "counter" else ""
+        lines.extend(_sample_line(name + suffix, labels, value) for labels, value in samples)
+    return "\n".join(lines) + "\n"
+
+
+# --- shared instruments ------------------------------------------------------
+
+HTTP_REQUEST_SECONDS = histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template, method and status "
+    "(streamed responses until the last chunk).", ("method", "route", "status"))
+AGENT_REQUEST_SECONDS = histogram(
+    "agent_request_duration_seconds", "Agent execution latency by agent and outcome.", ("agent", "outcome"))
+STAGE_SECONDS = histogram(
+    "stage_duration_seconds", "Pipeline stage latency (embed, vector_search, lexical_search, prompt_build, "
+    "llm_first_token, llm_total, audit_enqueue).", ("stage",))
+CACHE_HELP = {
+    "cache_hits": "Cache lookups answered from the cache.",
+    "cache_misses": "Cache lookups that had to compute the value.",
+    "cache_hit_ratio": "hits / (hits + misses) since start.",
+}
+
+
+def cache_families(cache: str, hits: int, misses: int):
+    """Collector families for one cache's hit/miss counts."""
+    labels = {"cache": cache}
+    total = hits + misses
+    yield "cache_hits", "counter", CACHE_HELP["cache_hits"], [(labels, hits)]
+    yield "cache_misses", "counter", CACHE_HELP["cache_misses"], [(labels, misses)]
+    yield "cache_hit_ratio", "gauge", CACHE_HELP["cache_hit_ratio"], [(labels, hits / total if total else 0.0)]
+
+
+LLM_TOKENS = counter("llm_tokens", "Tokens reported by the LLM API.", ("direction",))
+DB_POOL_WAIT_SECONDS = histogram(
+    "db_pool_checkout_wait_seconds", "Time to check a connection out of the DB pool (including opening one).")
+DB_POOL_TIMEOUTS = counter("db_pool_checkout_timeouts", "DB pool checkouts that gave up after pool_timeout.")
+
+
+class HTTPMetricsMiddleware:
+    """ASGI middleware recording HTTP_REQUEST_SECONDS.
+
+    Labels use the matched route template (/v1/agents/execute, not the raw path)
+    so cardinality stays bounded; unmatched paths share one label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status = 500
+        t0 = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                scope["method"], getattr(route, "path", "<unmatched>"), status
+            ).observe(time.perf_counter() - t0)
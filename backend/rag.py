@@ -1,88 +1,342 @@
 from pathlib import Path
-from langchain_community.document_loaders import TextLoader, PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
-from vectorstore import init_vector_store, vector_count, add_texts, is_qdrant_available
+from vectorstore import (init_vector_store, vector_count, add_texts, delete_points, is_qdrant_available,
+                         init_async_client, asearch, is_local_store, backend_name, search_by_vector, iter_points)
+from ingest_manifest import chunk_id, load_manifest, manifest_from_points, save_manifest
+from embedding_cache import CachedEmbeddings
+from embedding_batcher import EmbeddingBatcher
+from lexical_index import LexicalIndex, reciprocal_rank_fusion
+from request_metrics import stage
+import metrics
+from structured_log import get_logger
+import asyncio
 import os
 import time
 
-# Read EMBED_MODEL from environment with default
+log = get_logger(__name__)
+
+# Read EMBED_MODEL from environment with default; EMBED_BACKEND (torch|onnx|onnx-int8|numpy) picks the runtime
 EMBED_MODEL = os.getenv("EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
 
+# Persistent embedding cache (set EMBED_CACHE_ENABLED=0 to embed every call)
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "1").strip() == "1"
+EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", "/tmp/data/embed_cache")
+EMBED_CACHE_DTYPE = os.getenv("EMBED_CACHE_DTYPE", "float16")
+
+# Concurrent queries (and ingestion slices) share forward passes: wait up to EMBED_BATCH_WAIT_MS
+# or until EMBED_BATCH_MAX texts are queued (set EMBED_BATCHING=0 to embed each call directly)
+EMBED_BATCHING = os.getenv("EMBED_BATCHING", "1").strip() == "1"
+EMBED_BATCH_MAX = int(os.getenv("EMBED_BATCH_MAX", "32"))
+EMBED_BATCH_WAIT_MS = float(os.getenv("EMBED_BATCH_WAIT_MS", "5"))
+
+# Chunks are embedded and upserted in batches of this size as files finish loading
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+
+# Hybrid retrieval: BM25 over the same chunks, fused with vector results by reciprocal rank fusion
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "1").strip() == "1"
+LEXICAL_INDEX_DIR = os.getenv("LEXICAL_INDEX_DIR", "/tmp/data/lexical_index")
+HYBRID_FETCH_K = int(os.getenv("HYBRID_FETCH_K", "20"))   # candidates taken from each ranker before fusion
+
 # Global state
 _vectorstore = None
+_lexical = None
+_async_client = None
 _embeddings = None
 _vector_ok = False
+_last_ingest = {}
+_warned_vector_only = False
+_lexical_failed = False   # the index could not be opened; not retried until restart
 
 def _get_embeddings():
     """Get or create the embeddings instance."""
     global _embeddings
     if _embeddings is None:
-        _embeddings = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
-        print(f"Embedding model: {EMBED_MODEL}")
+        # Deferred: the torch backend pulls in sentence-transformers and torch
+        from embedding_backends import EMBED_BACKEND, cache_model_key, create_embeddings
+        embeddings = create_embeddings(EMBED_MODEL, EMBED_BACKEND)
+        log.info("embedding model loaded", model=EMBED_MODEL, backend=EMBED_BACKEND)
+        if EMBED_BATCHING:
+            # Inside the cache, so hits never wait for a batch to fill
+            embeddings = EmbeddingBatcher(embeddings, EMBED_BATCH_MAX, EMBED_BATCH_WAIT_MS)
+            log.info("embedding batcher enabled", max_batch=EMBED_BATCH_MAX, max_wait_ms=EMBED_BATCH_WAIT_MS)
+        if EMBED_CACHE_ENABLED:
+            try:
+                embeddings = CachedEmbeddings(embeddings, cache_model_key(EMBED_MODEL, EMBED_BACKEND),
+                                              EMBED_CACHE_DIR, dtype=EMBED_CACHE_DTYPE)
+                log.info("embedding cache enabled", dir=str(embeddings.dir), dtype=EMBED_CACHE_DTYPE)
+            except Exception as e:
+                log.warning("embedding cache unavailable, embedding uncached", error=str(e))
+        _embeddings = embeddings
     return _embeddings
 
-def _load_one(path: Path):
-    """Load a single document based on file extension."""
-    if path.suffix.lower() in [".md", ".txt"]:
-        return TextLoader(str(path), encoding="utf-8").load()
-    if path.suffix.lower() == ".pdf":
-        return PyPDFLoader(str(path)).load()
-    return []
+def _get_lexical_index():
+    """Get or load the BM25 index (None when hybrid retrieval is disabled or the dir is unusable)."""
+    global _lexical, _lexical_failed
+    if _lexical is None and HYBRID_RETRIEVAL and not _lexical_failed:
+        try:
+            _lexical = LexicalIndex(LEXICAL_INDEX_DIR, os.getenv("QDRANT_COLLECTION", "aurora"))
+            log.info("lexical index loaded", dir=str(_lexical.dir), docs=_lexical.count())
+        except Exception as e:
+            _lexical_failed = True
+            log.warning("lexical index unavailable, vector-only retrieval", error=str(e))
+    return _lexical
 
-def load_docs(data_dir: str):
-    """Load documents from a directory, filtering for supported file types."""
-    docs = []
+def rebuild_lexical_index(vs) -> int:
+    """Fill an empty BM25 index from the chunks already in the vector store; no embedding needed.
+
+    The index lives on local disk while the collection persists, so after a redeploy it is
+    empty even though nothing needs ingesting.
+    """
+    lexical = _get_lexical_index()
+    if vs is None or lexical is None or lexical.count():
+        return 0
+    ids, texts, metadatas, added = [], [], [], 0
+    for point_id, text, metadata in iter_points(vs):
+        ids.append(point_id)
+        texts.append(text)
+        metadatas.append(metadata)
+        if len(ids) >= INGEST_BATCH_SIZE:
+            lexical.add(ids, texts, metadatas)
+            added += len(ids)
+            ids, texts, metadatas = [], [], []
+    if ids:
+        lexical.add(ids, texts, metadatas)
+        added += len(ids)
+    if added:
+        log.info("rebuilt lexical index from the vector store", docs=added)
+    return added
+
+def hybrid_active() -> bool:
+    """True when retrieval fuses BM25 matches (enabled and the index has chunks)."""
+    lexical = _get_lexical_index()
+    return lexical is not None and lexical.count() > 0
+
+def warm_embeddings(batch_size: int = 8) -> int:
+    """Load the embedding model and run a dummy batch through it, bypassing the cache.
+
+    Pays model load, tokenizer setup and first-call kernel compilation at startup
+    instead of on the first request. Returns the embedding dimension.
+    """
+    embeddings = _get_embeddings()
+    model = embeddings.inner if isinstance(embeddings, CachedEmbeddings) else embeddings
+    # Through the batcher when enabled, which also starts its worker thread
+    model.embed_documents([f"warm-up passage {i} about onboarding policies" for i in range(batch_size)])
+    return len(model.embed_query("warm-up query"))
+
+def get_embedding_cache_stats():
+    """Hit rate and disk usage of the embedding cache, if enabled."""
+    if isinstance(_embeddings, CachedEmbeddings):
+        return _embeddings.stats()
+    return {"enabled": False}
+
+def get_embedding_batcher_stats():
+    """Batch sizes and queueing delay of the embedding batcher, if enabled."""
+    model = _embeddings.inner if isinstance(_embeddings, CachedEmbeddings) else _embeddings
+    if isinstance(model, EmbeddingBatcher):
+        return model.stats()
+    return {"enabled": False}
+
+def _collect():
+    if isinstance(_embeddings, CachedEmbeddings):
+        yield from metrics.cache_families("embedding", _embeddings.hits, _embeddings.misses)
+    model = _embeddings.inner if isinstance(_embeddings, CachedEmbeddings) else _embeddings
+    if isinstance(model, EmbeddingBatcher):
+        stats = model.stats()
+        yield "embed_batches", "counter", "Forward passes run by the embedding batcher.", [({}, stats["batches"])]
+        yield "embed_batched_texts", "counter", "Texts embedded through the batcher.", [({}, stats["texts"])]
+        yield "embed_queue_depth", "gauge", "Texts waiting for the embedding batcher.", [({}, stats["queued"])]
+
+metrics.register_collector("embeddings", _collect)
+
+SUPPORTED_SUFFIXES = {".md", ".txt", ".pdf"}
+
+def _corpus_files(data_dir: str):
+    """Supported files under data_dir, in a stable order."""
+    return sorted(p for p in Path(data_dir).rglob("*.*") if p.suffix.lower() in SUPPORTED_SUFFIXES)
+
+# Top-level data directory -> doc_type; files directly under data_dir use their stem (e.g. "handbook")
+_DOC_TYPES = {"policies": "policy", "compliance": "compliance", "projects": "project", "resources": "resource"}
+
+def doc_fields(path: Path, data_dir: str) -> dict:
+    """Filterable metadata for a corpus file, indexed in the vector store."""
+    rel = path.relative_to(data_dir)
+    if len(rel.parts) > 1:
+        source_dir = rel.parts[0]
+        doc_type = _DOC_TYPES.get(source_dir, source_dir)
+    else:
+        source_dir = "root"
+        doc_type = path.stem.lower()
+    return {"doc_type": doc_type, "source_dir": source_dir}
+
+def iter_docs(data_dir: str):
+    """Yield documents from a directory one file at a time."""
+    from ingest_pipeline import load_one
     for p in Path(data_dir).rglob("*.*"):
-        docs += _load_one(p)
-    return docs
+        yield from load_one(p)
 
-def _splitter():
-    """Create text splitter with reasonable chunk size and overlap."""
-    return RecursiveCharacterTextSplitter(
-        chunk_size=800, 
-        chunk_overlap=100, 
-        separators=["\n\n", "\n", ". ", " "]
-    )
+def load_docs(data_dir: str):
+    """Load documents from a directory, filtering for supported file types."""
+    return list(iter_docs(data_dir))
 
 def _get_vectorstore():
     """Get Qdrant vectorstore with initialization and caching."""
     global _vectorstore, _vector_ok
     
     if _vectorstore is None:
-        print("🔄 Initializing vector store...")
         embeddings = _get_embeddings()
         _vectorstore = init_vector_store(embeddings)
         _vector_ok = _vectorstore is not None
         
-        if _vector_ok:
-            print("✅ Vector store initialized successfully")
-        else:
-            print("❌ Vector store initialization failed")
+        if not _vector_ok:
+            log.error("vector store initialization failed")
     
     return _vectorstore
 
+def sync_corpus(vs, data_dir: str) -> dict:
+    """Incrementally sync data_dir into the vector store using the ingestion manifest.
+
+    Unchanged files are skipped by content hash. Changed files only embed chunks whose
+    deterministic id is new, stale chunk ids are deleted, and files that disappeared
+    have all their chunks removed. Cost scales with the size of the change.
+
+    Files are hashed, loaded and split in a process pool (ingest_pipeline); new chunks
+    are buffered and embedded/upserted every INGEST_BATCH_SIZE chunks, so peak memory
+    is bounded by the batch and the pool window rather than the corpus.
+
+    The manifest file is local while the collection persists, so when it is missing
+    (redeploy) or stale (model/schema change) it is rebuilt from the stored points.
+    A stale manifest re-upserts every chunk (reupsert) with the current payload.
+    """
+    collection_name = os.getenv("QDRANT_COLLECTION", "aurora")
+    manifest, manifest_state = load_manifest(collection_name, EMBED_MODEL)
+    lexical = _get_lexical_index()
+    reupsert = manifest_state == "stale"
+    if manifest_state != "ok":
+        manifest, foreign = manifest_from_points(iter_points(vs))
+        if foreign:
+            # Points with non-deterministic ids (pre-manifest ingests) would otherwise stay duplicated forever
+            delete_points(vs, foreign)
+            if lexical is not None:
+                lexical.delete(foreign)
+        log.info("rebuilt ingest manifest from the vector store", reason=manifest_state, files=len(manifest),
+                 purged=len(foreign))
+    elif manifest and vector_count(vs) == 0:
+        log.warning("manifest present but collection is empty, re-ingesting everything")
+        manifest = {}
+    elif manifest and lexical is not None and lexical.count() == 0:
+        rebuild_lexical_index(vs)
+    
+    stats = {"files_seen": 0, "files_changed": 0, "files_deleted": 0, "files_failed": 0,
+             "chunks_added": 0, "chunks_removed": 0, "chunks_unchanged": 0, "batches": 0,
+             "manifest": manifest_state}
+    new_manifest = {}
+    
+    # Files whose new chunks are still buffered: source -> [remaining, entry, stale_ids, failed]
+    in_flight = {}
+    batch = []  # (chunk_id, text, metadata, source)
+    
+    def finish(source):
+        remaining, entry, stale_ids, failed = in_flight.pop(source)
+        previous = manifest.get(source)
+        if failed:
+            # Leave the old manifest entry so the next run retries this file
+            log.warning("failed to index file, will retry on next ingest", source=source)
+            stats["files_failed"] += 1
+            if previous:
+                new_manifest[source] = previous
+            return
+        if stale_ids:
+            delete_points(vs, stale_ids)
+            if lexical is not None:
+                lexical.delete(stale_ids)
+        new_manifest[source] = entry
+        stats["chunks_removed"] += len(stale_ids)
+    
+    def flush():
+        if not batch:
+            return
+        added = add_texts(vs, [b[1] for b in batch], [b[2] for b in batch], ids=[b[0] for b in batch])
+        stats["batches"] += 1
+        ok = added == len(batch)
+        if ok:
+            stats["chunks_added"] += added
+            if lexical is not None:
+                lexical.add([b[0] for b in batch], [b[1] for b in batch], [b[2] for b in batch])
+        for _, _, _, source in batch:
+            state = in_flight[source]
+            state[0] -= 1
+            state[3] = state[3] or not ok
+            if state[0] == 0:
+                finish(source)
+        batch.clear()
+    
+    items = [(str(path), None if reupsert else manifest.get(str(path), {}).get("hash"))
+             for path in _corpus_files(data_dir)]
+    from ingest_pipeline import iter_split_files
+    for source, digest, chunks, error in iter_split_files(items):
+        stats["files_seen"] += 1
+        previous = manifest.get(source)
+        if error is not None:
+            log.warning("could not load file", source=source, error=str(error))
+            stats["files_failed"] += 1
+            if previous:
+                new_manifest[source] = previous
+            continue
+        if chunks is None:
+            new_manifest[source] = previous
+            stats["chunks_unchanged"] += len(previous["chunk_ids"])
+            continue
+        
+        stats["files_changed"] += 1
+        
+        # Deduplicate identical chunks within a file; they map to the same id
+        fields = doc_fields(Path(source), data_dir)
+        by_id = {}
+        for text, metadata in chunks:
+            by_id.setdefault(chunk_id(source, text), (text, {**metadata, **fields, "file_hash": digest}))
+        
+        old_ids = set(previous["chunk_ids"]) if previous else set()
+        new_ids = list(by_id) if reupsert else [i for i in by_id if i not in old_ids]
+        stale_ids = [i for i in old_ids if i not in by_id]
+        stats["chunks_unchanged"] += len(by_id) - len(new_ids)
+        
+        in_flight[source] = [len(new_ids), {"hash": digest, "chunk_ids": list(by_id)}, stale_ids, False]
+        if not new_ids:
+            finish(source)
+            continue
+        for i in new_ids:
+            batch.append((i, by_id[i][0], by_id[i][1], source))
+            if len(batch) >= INGEST_BATCH_SIZE:
+                flush()
+    flush()
+    
+    for source, previous in manifest.items():
+        if source not in new_manifest and not Path(source).exists():
+            delete_points(vs, previous["chunk_ids"])
+            if lexical is not None:
+                lexical.delete(previous["chunk_ids"])
+            stats["files_deleted"] += 1
+            stats["chunks_removed"] += len(previous["chunk_ids"])
+    
+    save_manifest(collection_name, EMBED_MODEL, new_manifest)
+    log.info("incremental ingest", **stats)
+    return stats
+
+def get_last_ingest_stats() -> dict:
+    """Change summary from the most recent ingestion run."""
+    return dict(_last_ingest)
+
 def build_vectorstore(data_dir: str):
     """Build vector store from data directory."""
     try:
         vs = _get_vectorstore()
         if vs is None:
-            print("⚠️  Vector store not available - skipping build")
+            log.warning("vector store not available, skipping build")
             return None
             
-        splitter = _splitter()
-        chunks = splitter.split_documents(load_docs(data_dir))
-        
-        # Extract texts and metadatas for add_texts
-        texts = [chunk.page_content for chunk in chunks]
-        metadatas = [chunk.metadata for chunk in chunks]
-        
-        # Add documents to the vector store
-        add_texts(vs, texts, metadatas)
-        print(f"Vector store built successfully")
+        sync_corpus(vs, data_dir)
         return vs
     except Exception as e:
-        print(f"❌ Vector store build failed: {e}")
+        log.error("vector store build failed", error=str(e))
         return None
 
 def get_vectorstore():
@@ -90,56 +344,137 @@ def get_vectorstore():
     try:
         vs = _get_vectorstore()
         if vs is None:
-            print("⚠️  Vector store not available - returning None")
+            log.warning("vector store not available")
             return None
-        
-        print(f"Vector store loaded successfully")
         return vs
     except Exception as e:
-        print(f"❌ Vector store load failed: {e}")
+        log.error("vector store load failed", error=str(e))
+        return None
+
+def embed_query(query: str):
+    """Embed a query once so callers can reuse the vector (retrieval, semantic cache)."""
+    with stage("embed"):
+        return _get_embeddings().embed_query(query)
+
+async def aembed_query(query: str):
+    """Async variant of embed_query: joins the next micro-batch without tying up a worker thread."""
+    with stage("embed"):
+        if _embeddings is None:
+            await asyncio.to_thread(_get_embeddings)   # model load is blocking
+        return await _embeddings.aembed_query(query)
+
+def _fetch_k(k: int) -> int:
+    """Candidates to take from the vector store: more than k when they will be fused with BM25."""
+    lexical = _get_lexical_index()
+    return max(k, HYBRID_FETCH_K) if lexical is not None and lexical.count() else k
+
+def _lexical_search(query: str, filter: dict = None):
+    """BM25 candidates for the query, or None when retrieval is vector-only (no index or an empty one)."""
+    global _warned_vector_only
+    lexical = _get_lexical_index()
+    if lexical is None or not lexical.count():
+        if HYBRID_RETRIEVAL and not _warned_vector_only:
+            _warned_vector_only = True
+            log.warning("lexical index is empty, retrieval is vector-only")
         return None
+    with stage("lexical_search"):
+        return [doc for doc, _ in lexical.search(query, HYBRID_FETCH_K, filter)]
+
+def _fuse(k: int, vector_docs, lexical_docs):
+    """Fuse the vector ranking with the BM25 ranking for the same query (RRF)."""
+    if lexical_docs is None:
+        return vector_docs[:k]
+    fused = reciprocal_rank_fusion([vector_docs, lexical_docs], k)
+    log.debug("hybrid fusion", vector=len(vector_docs), bm25=len(lexical_docs), fused=len(fused))
+    return fused
+
+def retrieve(query: str, k: int = None, vector=None, filter: dict = None):
+    """Retrieve documents from vector store with telemetry.
 
-def retrieve(query: str, k: int = None):
-    """Retrieve documents from vector store with telemetry."""
+    Pass a precomputed query ``vector`` to skip re-embedding the query. ``filter`` is a
+    metadata spec such as ``{"doc_type": ["policy", "handbook"]}``, evaluated inside the
+    vector store so the k results all match. With HYBRID_RETRIEVAL the vector candidates
+    are fused with BM25 matches on the same chunks.
+    """
     if k is None:
         k = int(os.getenv("RETRIEVAL_K", "4"))
     
-    print(f"🔍 RAG Retrieve - Query: '{query}', k={k}")
-    
     vs = get_vectorstore()
     if vs is None:
-        print(f"⚠️  Vector store not available - returning empty results for query: '{query[:50]}...'")
+        log.warning("vector store not available, returning no documents")
         return []
     
     try:
-        # Debug: Check if embeddings are available
-        if hasattr(vs, 'embeddings') and vs.embeddings is not None:
-            print("✅ Vector store has embeddings available")
-        elif hasattr(vs, 'embedding_function') and vs.embedding_function is not None:
-            print("✅ Vector store has embedding_function available")
+        # Reuse a precomputed embedding when given, else try retriever then similarity_search
+        fetch_k = _fetch_k(k)
+        if vector is not None or filter:
+            if vector is None:
+                vector = embed_query(query)
+            with stage("vector_search"):
+                results = search_by_vector(vs, vector, fetch_k, filter)
+            log.debug("vector search", results=len(results), filter=filter)
         else:
-            print("⚠️  Vector store has no embeddings available!")
-        
-        # Try using retriever first, fallback to similarity_search
-        try:
-            retriever = vs.as_retriever(search_kwargs={"k": k})
-            results = retriever.get_relevant_documents(query)
-            print(f"✅ Retrieved {len(results)} documents using retriever")
-        except Exception as retriever_error:
-            print(f"⚠️  Retriever failed: {retriever_error}, trying similarity_search")
-            results = vs.similarity_search(query, k=k)
-            print(f"✅ Retrieved {len(results)} documents using similarity_search")
-        
-        # Debug: Print source paths for debugging
-        for i, doc in enumerate(results):
-            source = doc.metadata.get("source", "unknown")
-            content_preview = doc.page_content[:100].replace('\n', ' ')
-            print(f"  📄 Doc {i+1}: {source}")
-            print(f"      Content: {content_preview}...")
-        
+            # The retriever embeds internally, so vector_search includes the query embedding here
+            with stage("vector_search"):
+                try:
+                    retriever = vs.as_retriever(search_kwargs={"k": fetch_k})
+                    results = retriever.get_relevant_documents(query)
+                except Exception as retriever_error:
+                    log.warning("retriever failed, trying similarity_search", error=str(retriever_error))
+                    results = vs.similarity_search(query, k=fetch_k)
+        results = _fuse(k, results, _lexical_search(query, filter))
+        log.info("retrieved", k=k, results=len(results), query_chars=len(query))
         return results
     except Exception as e:
-        print(f"❌ Vector store retrieval failed for query: '{query[:50]}...' - {e}")
+        log.error("vector store retrieval failed", query_chars=len(query), error=str(e))
+        return []
+
+def _get_async_client():
+    """Get or create the shared AsyncQdrantClient used by aretrieve."""
+    global _async_client
+    if _async_client is None:
+        _async_client = init_async_client()
+    return _async_client
+
+async def aretrieve(query: str, k: int = None, vector=None, filter: dict = None):
+    """Async variant of retrieve: embeds off the event loop and searches via AsyncQdrantClient."""
+    if k is None:
+        k = int(os.getenv("RETRIEVAL_K", "4"))
+    
+    # First use opens Qdrant / replays the local logs; warm-up normally did it already
+    if _vectorstore is None or (HYBRID_RETRIEVAL and _lexical is None and not _lexical_failed):
+        await asyncio.to_thread(lambda: (_get_vectorstore(), _get_lexical_index()))
+    vs = _vectorstore
+    if vs is None:
+        log.warning("vector store not available, returning no documents")
+        return []
+    
+    try:
+        fetch_k = _fetch_k(k)
+        if is_local_store(vs):
+            if vector is None:
+                vector = await aembed_query(query)
+            with stage("vector_search"):
+                results = await asyncio.to_thread(search_by_vector, vs, vector, fetch_k, filter)
+        else:
+            client = _get_async_client()
+            if client is None:
+                log.warning("async vector client not available, returning no documents")
+                return []
+            if vector is None:
+                vector = await aembed_query(query)
+            collection_name = os.getenv("QDRANT_COLLECTION", "aurora")
+            with stage("vector_search"):
+                results = await asearch(client, collection_name, vector, fetch_k, filter=filter)
+        log.debug("vector search", results=len(results), filter=filter)
+        # BM25 scoring is pure Python; keep it off the event loop like the vector search
+        if hybrid_active():
+            lexical_docs = await asyncio.to_thread(_lexical_search, query, filter)
+        else:
+            lexical_docs = _lexical_search(query, filter)   # no search to run, only the vector-only warning
+        return _fuse(k, results, lexical_docs)
+    except Exception as e:
+        log.error("async retrieval failed", query_chars=len(query), error=str(e))
         return []
 
 def get_document_count():
@@ -152,94 +487,73 @@ def get_document_count():
         count = vector_count(vs)
         return count
     except Exception as e:
-        print(f"⚠️  Could not get document count: {e}")
+        log.warning("could not get document count", error=str(e))
         return 0
 
 def ingest_data_corpus():
     """Ingest all data from data directory into vector store."""
+    global _last_ingest
     data_dir = os.getenv("SEED_DATA_DIR", "./data")
     
-    print(f"🔍 Checking data directory: {data_dir}")
-    print(f"🔍 Directory exists: {os.path.exists(data_dir)}")
-    
     if not os.path.exists(data_dir):
-        print(f"⚠️  Data directory not found: {data_dir}")
+        log.warning("data directory not found", data_dir=data_dir)
         return False
     
     try:
-        # Load documents from data directory
-        docs = load_docs(data_dir)
-        print(f"🔍 Found {len(docs)} documents in {data_dir}")
+        files = _corpus_files(data_dir)
+        log.info("found corpus documents", files=len(files), data_dir=data_dir)
         
-        if not docs:
-            print(f"⚠️  No documents found in data directory: {data_dir}")
+        if not files:
+            log.warning("no documents found in data directory", data_dir=data_dir)
             return False
         
-        print(f"📚 Loading {len(docs)} documents from {data_dir}")
-        
-        # Split documents into chunks
-        splitter = _splitter()
-        chunks = splitter.split_documents(docs)
-        print(f"📝 Split into {len(chunks)} chunks")
-        
-        # Get vector store and add documents
+        # Get vector store and sync changed documents
         vs = _get_vectorstore()
         if vs is None:
-            print("⚠️  Vector store not available - skipping ingestion")
+            log.warning("vector store not available, skipping ingestion")
             return False
         
-        # Extract texts and metadatas for add_texts
-        texts = [chunk.page_content for chunk in chunks]
-        metadatas = [chunk.metadata for chunk in chunks]
-        
-        print(f"🔍 About to add {len(texts)} texts to vector store")
-        
-        # Add documents to the vector store
-        add_texts(vs, texts, metadatas)
-        
-        print(f"✅ Data corpus ingested successfully")
+        _last_ingest = sync_corpus(vs, data_dir)
         return True
         
     except Exception as e:
-        print(f"❌ Data corpus ingestion failed: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("data corpus ingestion failed")
         return False
 
 def initialize_vectorstore_with_auto_ingest():
     """Initialize vector store with auto-ingestion if enabled and store is empty."""
     # Check if auto-ingest is enabled
     auto_ingest = os.getenv("AUTO_INGEST", "0").strip() == "1"
-    print(f"🔍 Auto-ingest enabled: {auto_ingest}")
+    log.info("initializing vector store", auto_ingest=auto_ingest)
     
-    # Initialize vector store
-    embeddings = _get_embeddings()
-    store = init_vector_store(embeddings)
+    # Initialize the shared vector store (the one retrieve/ingest use afterwards)
+    store = _get_vectorstore()
     
     if store is None:
-        print("❌ Failed to initialize vector store")
+        log.error("failed to initialize vector store")
         return
     
     # Get initial document count
     n = vector_count(store)
-    print(f"Vector doc count: {n}")
+    log.info("vector doc count", docs=n)
     
     # If store is empty and auto-ingest is enabled, run ingestion
     if n == 0 and auto_ingest:
-        print("🔄 Auto-ingesting data corpus (AUTO_INGEST=1)")
+        log.info("auto-ingesting data corpus")
         if ingest_data_corpus():
             # Recompute and log the new count
             new_count = vector_count(store)
-            print(f"Vector doc count: {new_count}")
+            log.info("vector doc count", docs=new_count)
         else:
-            print("⚠️  Auto-ingest failed, continuing with empty store")
+            log.warning("auto-ingest failed, continuing with empty store")
     elif n > 0:
-        print(f"✅ Vector store already has {n} documents, skipping auto-ingest")
+        log.info("vector store already populated, skipping auto-ingest", docs=n)
+        rebuild_lexical_index(store)
 
 def is_vectorstore_available():
     """Check if vector store is available and working."""
     global _vector_ok
-    return _vector_ok and is_qdrant_available()
+    return _vector_ok and (is_local_store(_vectorstore) or is_qdrant_available())
 
 def get_vectorstore_info():
     """Get vector store information for health checks."""
@@ -250,23 +564,29 @@ def get_vectorstore_info():
                 "vector_store": "qdrant",
                 "vector_ok": False,
                 "vector_docs": 0,
-                "vector_collection": "unknown"
+                "vector_collection": "unknown",
+                "hybrid_active": False
             }
         
         collection_name = os.getenv("QDRANT_COLLECTION", "aurora")
         doc_count = get_document_count()
         
         return {
-            "vector_store": "qdrant",
+            "vector_store": backend_name(vs),
             "vector_ok": True,
             "vector_docs": doc_count,
-            "vector_collection": collection_name
+            "vector_collection": collection_name,
+            "embedding_cache": get_embedding_cache_stats(),
+            "embedding_batcher": get_embedding_batcher_stats(),
+            "lexical_docs": _lexical.count() if _lexical is not None else None,
+            "hybrid_active": hybrid_active()
         }
     except Exception as e:
-        print(f"⚠️  Could not get vector store info: {e}")
+        log.warning("could not get vector store info", error=str(e))
         return {
             "vector_store": "qdrant",
             "vector_ok": False,
             "vector_docs": 0,
-            "vector_collection": "unknown"
+            "vector_collection": "unknown",
+            "hybrid_active": False
         }
\ No newline at end of file
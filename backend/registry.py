@@ -1,15 +1,56 @@
-from typing import Dict, Any, Tuple
-from agents.onboarding.agent import execute as onboarding_execute
-from agents.skillnav.agent import execute as skillnav_execute
-from agents.progress.agent import execute as progress_execute
-
-REGISTRY = {
-    "onboarding": onboarding_execute,
-    "skillnav": skillnav_execute,
-    "progress": progress_execute,
+from typing import Dict, Any, Tuple, AsyncIterator
+import importlib, threading
+from starlette.concurrency import run_in_threadpool
+
+# agent_id -> module providing execute(payload), optionally the native coroutine `aexecute`
+# and the token-streaming async generator `astream`. Modules are imported on first use
+# (or by the startup warm-up), so importing the app never pulls in OpenAI/LangChain/torch.
+AGENT_MODULES = {
+    "onboarding": "agents.onboarding.agent",
+    "skillnav": "agents.skillnav.agent",
+    "progress": "agents.progress.agent",
 }
 
-def execute_agent(agent_id: str, payload: Dict[str, Any]) -> Tuple[Dict, Dict]:
-    if agent_id not in REGISTRY:
+_loaded: Dict[str, Any] = {}
+_load_lock = threading.Lock()
+
+def load_agent(agent_id: str):
+    if agent_id not in AGENT_MODULES:
+        raise KeyError(f"Unknown agent '{agent_id}'")
+    module = _loaded.get(agent_id)
+    if module is None:
+        with _load_lock:
+            module = _loaded.get(agent_id)
+            if module is None:
+                module = _loaded[agent_id] = importlib.import_module(AGENT_MODULES[agent_id])
+    return module
+
+async def aload_agent(agent_id: str):
+    """load_agent without blocking the event loop on a first (slow) import."""
+    module = _loaded.get(agent_id)
+    if module is not None:
+        return module
+    if agent_id not in AGENT_MODULES:
         raise KeyError(f"Unknown agent '{agent_id}'")
-    return REGISTRY[agent_id](payload)
+    return await run_in_threadpool(load_agent, agent_id)
+
+def preload_agents():
+    for agent_id in AGENT_MODULES:
+        load_agent(agent_id)
+
+def execute_agent(agent_id: str, payload: Dict[str, Any]) -> Tuple[Dict, Dict]:
+    return load_agent(agent_id).execute(payload)
+
+async def aexecute_agent(agent_id: str, payload: Dict[str, Any]) -> Tuple[Dict, Dict]:
+    module = await aload_agent(agent_id)
+    # Agents without a native coroutine run their sync execute in the threadpool
+    if hasattr(module, "aexecute"):
+        return await module.aexecute(payload)
+    return await run_in_threadpool(module.execute, payload)
+
+async def astream_agent(agent_id: str, payload: Dict[str, Any]) -> AsyncIterator[str]:
+    module = await aload_agent(agent_id)
+    if not hasattr(module, "astream"):
+        raise KeyError(f"Agent '{agent_id}' does not support streaming")
+    async for chunk in module.astream(payload):
+        yield chunk
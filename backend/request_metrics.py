@@ -0,0 +1,117 @@
+"""
+Per-request token usage, redaction counts and stage latencies.
+
+agents_execute opens a RequestMetrics for each request. It lives in a
+contextvar, so it follows the request into asyncio tasks, to_thread calls and
+the threadpool that runs sync agents. Along the way rag times embedding and
+search, the LLM gateway adds token usage, time to first token and model time,
+and agents add prompt building and PII redactions. The snapshot is merged
+into the agent's meta and written to the audit row, so cost and latency can
+be queried per agent and per org.
+
+Stage timings and token counts also feed the process-wide /metrics histograms
+and counters, including outside a request (warm-up, ingestion). Otherwise,
+outside a request every recorder is a no-op.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from metrics import LLM_TOKENS, STAGE_SECONDS
+from settings import settings
+
+# Canonical stage names, in pipeline order
+STAGES = ("embed", "vector_search", "lexical_search", "prompt_build",
+          "llm_first_token", "llm_total", "audit_enqueue")
+
+
+class RequestMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()   # sync agents record from a worker thread
+        self.stages_ms: Dict[str, float] = {}
+        self.tokens_in = 0
+        self.tokens_out = 0
+        self.llm_calls = 0
+        self.redactions = 0
+
+    def add_stage(self, name: str, ms: float):
+        """Accumulate: a request that embeds or calls the LLM twice reports the sum."""
+        with self._lock:
+            self.stages_ms[name] = self.stages_ms.get(name, 0.0) + ms
+
+    def add_usage(self, tokens_in: int, tokens_out: int):
+        with self._lock:
+            self.tokens_in += tokens_in or 0
+            self.tokens_out += tokens_out or 0
+            self.llm_calls += 1
+
+    def add_redactions(self, n: int):
+        if n:
+            with self._lock:
+                self.redactions += n
+
+    def cost_usd(self) -> float:
+        return round(self.tokens_in * settings.LLM_PRICE_IN_PER_1M / 1e6
+                     + self.tokens_out * settings.LLM_PRICE_OUT_PER_1M / 1e6, 8)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = {name: round(self.stages_ms[name], 2) for name in STAGES if name in self.stages_ms}
+            return {
+                "usage": {"tokens_in": self.tokens_in, "tokens_out": self.tokens_out, "llm_calls": self.llm_calls},
+                "cost_usd": self.cost_usd(),
+                "pii_redactions": self.redactions,
+                "stages_ms": stages,
+            }
+
+
+_current: ContextVar[Optional[RequestMetrics]] = ContextVar("request_metrics", default=None)
+
+
+def begin() -> RequestMetrics:
+    """Start accounting for the current request (and everything it spawns)."""
+    metrics = RequestMetrics()
+    _current.set(metrics)
+    return metrics
+
+
+def current() -> Optional[RequestMetrics]:
+    return _current.get()
+
+
+@contextmanager
+def stage(name: str):
+    """Time the enclosed block into the current request's stage breakdown."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, (time.perf_counter() - t0) * 1000)
+
+
+def record_stage(name: str, ms: float):
+    STAGE_SECONDS.labels(name).observe(ms / 1000)
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.add_stage(name, ms)
+
+
+def record_usage(usage):
+    """Token counts from an OpenAI `usage` object (absent on some stubs and errors)."""
+    if usage is None:
+        return
+    tokens_in, tokens_out = getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "completion_tokens", 0) or 0
+    LLM_TOKENS.labels("in").inc(tokens_in)
+    LLM_TOKENS.labels("out").inc(tokens_out)
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.add_usage(tokens_in, tokens_out)
+
+
+def record_redactions(n: int):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.add_redactions(n)
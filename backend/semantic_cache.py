@@ -0,0 +1,124 @@
+"""
+Semantic answer cache keyed on query embeddings.
+
+Paraphrases of the same policy question land close together in embedding space, so
+an answer produced for one can be served for the others without calling the LLM.
+Entries expire after a TTL, the least recently used entry is evicted at capacity,
+and the whole cache is dropped when the index version changes or a reindex runs.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+import metrics
+from settings import settings
+
+
+class SemanticCache:
+    def __init__(self, threshold: float, ttl_s: float, max_entries: int):
+        self.threshold = threshold
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()  # id -> (unit vector, value, created_ts)
+        self._next_id = 0
+        self._matrix = None  # stacked vectors, rebuilt lazily after mutation
+        self._ids = []
+        self._index_version = settings.INDEX_VERSION
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm > 0 else v
+
+    def _check_version(self):
+        if self._index_version != settings.INDEX_VERSION:
+            self._clear()
+            self._index_version = settings.INDEX_VERSION
+
+    def _clear(self):
+        self._entries.clear()
+        self._matrix = None
+        self._ids = []
+        self.invalidations += 1
+
+    def _expire(self, now: float):
+        expired = [i for i, (_, _, ts) in self._entries.items() if now - ts > self.ttl_s]
+        for i in expired:
+            del self._entries[i]
+        if expired:
+            self._matrix = None
+
+    def get(self, vector) -> Optional[Dict[str, Any]]:
+        """Return the cached value for the nearest stored query above the threshold."""
+        with self._lock:
+            self._check_version()
+            self._expire(time.time())
+            if not self._entries:
+                self.misses += 1
+                return None
+
+            if self._matrix is None:
+                self._ids = list(self._entries.keys())
+                self._matrix = np.stack([self._entries[i][0] for i in self._ids])
+
+            scores = self._matrix @ self._normalize(vector)
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            entry_id = self._ids[best]
+            self._entries.move_to_end(entry_id)
+            self.hits += 1
+            return self._entries[entry_id][1]
+
+    def put(self, vector, value: Dict[str, Any]):
+        with self._lock:
+            self._check_version()
+            self._entries[self._next_id] = (self._normalize(vector), value, time.time())
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._matrix = None
+
+    def invalidate(self):
+        with self._lock:
+            self._clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "threshold": self.threshold,
+        }
+
+
+answer_cache = SemanticCache(
+    threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+    ttl_s=settings.SEMANTIC_CACHE_TTL_S,
+    max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES,
+)
+
+
+def _collect():
+    yield from metrics.cache_families("semantic_answer", answer_cache.hits, answer_cache.misses)
+    yield "semantic_cache_entries", "gauge", "Answers held by the semantic cache.", [({}, len(answer_cache._entries))]
+
+
+metrics.register_collector("semantic_cache", _collect)
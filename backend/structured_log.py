@@ -0,0 +1,273 @@
+"""
+Structured JSON logging that stays off the request path.
+
+    log = get_logger(__name__)
+    log.info("vector store ready", backend="qdrant", docs=1234)
+    log.debug("retrieved doc", rank=1, source="leave_policy.md")   # sampled
+
+A log call only checks the level and appends a small tuple to a bounded
+queue. A writer thread drains the queue every LOG_FLUSH_MS, renders one JSON
+object per line and writes the batch to stdout in a single call, so a slow
+container log pipe never blocks a request. When the queue is full the line is
+dropped and counted (aurora_log_dropped_total) instead of waiting.
+Levels come from the stdlib logging tree (loggers are named aurora.<module>),
+and QueueHandler feeds records from plain `logging` users into the same queue.
+
+Every line carries the trace_id of the request it was logged from:
+TraceMiddleware generates it, keeps it in a contextvar for the request's tasks
+and threads, and returns it as X-Trace-Id. The id is also written to the audit
+trail, so a caller's own X-Trace-Id is never adopted; it is logged alongside as
+client_trace_id for correlation.
+
+Configuration:
+    LOG_LEVEL=INFO                           default level
+    LOG_LEVELS=rag=DEBUG,vectorstore=WARNING per-module overrides (dotted prefixes)
+    LOG_DEBUG_SAMPLE=0.1                     share of traces whose debug lines are kept
+    LOG_QUEUE_SIZE=10000                     lines buffered before dropping
+    LOG_FLUSH_MS=50                          writer drain interval
+
+Benchmark: benchmarks/bench_logging.py
+"""
+
+import atexit
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import traceback
+import uuid
+import zlib
+from collections import deque
+from contextvars import ContextVar
+from typing import Optional
+
+import orjson
+
+import metrics
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").strip().upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_DEBUG_SAMPLE = float(os.getenv("LOG_DEBUG_SAMPLE", "0.1"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_FLUSH_MS = float(os.getenv("LOG_FLUSH_MS", "50"))
+
+ROOT = "aurora"
+
+_trace_id: ContextVar[Optional[str]] = ContextVar("trace_id", default=None)
+_client_trace_id: ContextVar[Optional[str]] = ContextVar("client_trace_id", default=None)
+
+_DROPPED = metrics.counter("log_dropped", "Log lines dropped because the log queue was full.")
+
+
+def trace_id() -> Optional[str]:
+    return _trace_id.get()
+
+
+def set_trace_id(value: Optional[str]):
+    """Bind a trace id to the current context (a request, or a background job)."""
+    _trace_id.set(value)
+
+
+def _sampled() -> bool:
+    """Debug sampling is per trace, so a sampled request keeps all of its debug lines."""
+    if LOG_DEBUG_SAMPLE >= 1:
+        return True
+    current = _trace_id.get()
+    if current is None:
+        return random.random() < LOG_DEBUG_SAMPLE
+    return zlib.crc32(current.encode()) % 10_000 < LOG_DEBUG_SAMPLE * 10_000
+
+
+_second = [None, ""]   # (epoch second, its ISO prefix); only the writer thread renders
+
+
+def _timestamp(created: float) -> str:
+    """ISO 8601 UTC with milliseconds; the per-second prefix is reused (datetime is ~2us a call)."""
+    second = int(created)
+    if second != _second[0]:
+        _second[:] = [second, time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))]
+    return f"{_second[1]}.{int((created - second) * 1000):03d}Z"
+
+
+def _render(entry: tuple) -> bytes:
+    created, level, logger, event, trace, client_trace, fields, exc = entry
+    line = {
+        "ts": _timestamp(created),
+        "level": level,
+        "logger": logger,
+        "msg": event,
+        "trace_id": trace,
+    }
+    if client_trace:
+        line["client_trace_id"] = client_trace
+    if fields:
+        line.update(fields)
+    if exc:
+        line["exc"] = exc
+    return orjson.dumps(line, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+
+class _Writer:
+    """Bounded queue of pending lines and the thread that writes them out."""
+
+    def __init__(self, stream, max_pending: int, interval_s: float):
+        self._stream = stream
+        self._max_pending = max_pending
+        self._interval_s = interval_s
+        self._pending: deque = deque()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="structured-log-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, entry: tuple):
+        # len() then append is not atomic, so the bound is approximate under contention; that's fine
+        if len(self._pending) >= self._max_pending:
+            _DROPPED.inc()
+            return
+        self._pending.append(entry)
+
+    def drain(self):
+        pop, lines = self._pending.popleft, []
+        while True:
+            try:
+                entry = pop()
+            except IndexError:
+                break
+            try:
+                lines.append(_render(entry))
+            except Exception:
+                _DROPPED.inc()
+        if lines:
+            data = b"\n".join(lines) + b"\n"
+            try:
+                buffer = getattr(self._stream, "buffer", None)
+                if buffer is not None:
+                    buffer.write(data)
+                else:
+                    self._stream.write(data.decode())
+                self._stream.flush()
+            except (OSError, ValueError):
+                pass   # stdout closed during interpreter shutdown
+
+    def _run(self):
+        while not self._stop.wait(self._interval_s):
+            self.drain()
+        self.drain()
+
+    def close(self, timeout: float = 2.0):
+        self._stop.set()
+        self._thread.join(timeout)
+
+
+class StructuredLogger:
+    """Event message plus keyword fields; debug events are sampled."""
+    __slots__ = ("_logger", "_name")
+
+    def __init__(self, logger: logging.Logger):
+        self._logger = logger
+        self._name = logger.name[len(ROOT) + 1:]
+
+    def _put(self, level: str, event: str, fields: dict, exc: Optional[str] = None):
+        _writer.put((time.time(), level, self._name, event, _trace_id.get(), _client_trace_id.get(), fields, exc))
+
+    def debug(self, event: str, **fields):
+        if self._logger.isEnabledFor(logging.DEBUG) and _sampled():
+            self._put("debug", event, fields)
+
+    def info(self, event: str, **fields):
+        if self._logger.isEnabledFor(logging.INFO):
+            self._put("info", event, fields)
+
+    def warning(self, event: str, **fields):
+        if self._logger.isEnabledFor(logging.WARNING):
+            self._put("warning", event, fields)
+
+    def error(self, event: str, **fields):
+        self._put("error", event, fields)
+
+    def exception(self, event: str, **fields):
+        """Error with the active exception's traceback (rendered now, while it is still live)."""
+        self._put("error", event, fields, traceback.format_exc())
+
+
+class QueueHandler(logging.Handler):
+    """stdlib logging handler writing through the same queue, for code that uses `logging` directly."""
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            exc = self.formatter.formatException(record.exc_info) if record.exc_info else None
+            name = record.name[len(ROOT) + 1:] if record.name.startswith(ROOT + ".") else record.name
+            _writer.put((record.created, record.levelname.lower(), name, record.getMessage(),
+                         _trace_id.get(), _client_trace_id.get(), getattr(record, "fields", None), exc))
+        except Exception:
+            self.handleError(record)
+
+
+_writer: Optional[_Writer] = None
+_configure_lock = threading.Lock()
+
+
+def _configure():
+    global _writer
+    with _configure_lock:
+        if _writer is not None:
+            return
+        root = logging.getLogger(ROOT)
+        root.setLevel(LOG_LEVEL)
+        root.propagate = False   # uvicorn configures the root logger; ours never goes through it
+        for override in filter(None, (part.strip() for part in LOG_LEVELS.split(","))):
+            name, _, level = override.partition("=")
+            logging.getLogger(f"{ROOT}.{name.strip()}").setLevel(level.strip().upper())
+        handler = QueueHandler()
+        handler.setFormatter(logging.Formatter())
+        root.addHandler(handler)
+        _writer = _Writer(sys.stdout, LOG_QUEUE_SIZE, LOG_FLUSH_MS / 1000)
+        atexit.register(shutdown)
+
+
+def shutdown():
+    """Write out what is still queued (called at exit)."""
+    if _writer is not None:
+        _writer.close()
+
+
+def get_logger(name: str) -> StructuredLogger:
+    """Logger for a module, e.g. get_logger(__name__); named aurora.<module>."""
+    if _writer is None:
+        _configure()
+    return StructuredLogger(logging.getLogger(f"{ROOT}.{name}"))
+
+
+_TRACE_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+class TraceMiddleware:
+    """ASGI middleware binding a server-generated trace id to each HTTP request, returned as X-Trace-Id.
+
+    A well-formed incoming X-Trace-Id is kept as client_trace_id on the request's log lines only.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        incoming = dict(scope["headers"]).get(b"x-trace-id", b"").decode("latin-1")
+        current = str(uuid.uuid4())
+        token = _trace_id.set(current)
+        client_token = _client_trace_id.set(incoming if _TRACE_ID_RE.match(incoming) else None)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-trace-id", current.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _trace_id.reset(token)
+            _client_trace_id.reset(client_token)
@@ -1,26 +1,151 @@
 """
 Qdrant vector store abstraction for Aurora backend.
 Provides a simple interface for Qdrant operations with proper embedding initialization.
+Falls back to the in-process LocalVectorStore when Qdrant is not configured or unreachable.
 """
 
 import os
-from typing import List, Optional, Dict, Any
-from qdrant_client import QdrantClient
-from qdrant_client.http import models
+import threading
+from typing import List, Optional, Dict, Any, Iterator, Tuple
 
 # Try preferred import first, fallback to community
 try:
-    from langchain_qdrant import Qdrant
+    from qdrant_client import QdrantClient, AsyncQdrantClient
+    from qdrant_client.http import models
+    try:
+        from langchain_qdrant import Qdrant
+    except ImportError:
+        from langchain_community.vectorstores import Qdrant
     QDRANT_AVAILABLE = True
 except ImportError:
+    QDRANT_AVAILABLE = False
+    Qdrant = QdrantClient = AsyncQdrantClient = models = None
+
+from langchain_core.documents import Document
+from local_index import LocalVectorStore
+from structured_log import get_logger
+
+log = get_logger(__name__)
+
+# "auto" prefers Qdrant and falls back to the local index; "qdrant" / "local" force one backend
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "auto").strip().lower()
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", "/tmp/data/local_index")
+
+# Payload keys used by the LangChain Qdrant wrapper when storing documents
+CONTENT_PAYLOAD_KEY = "page_content"
+METADATA_PAYLOAD_KEY = "metadata"
+
+# Metadata fields assigned at ingestion and indexed in Qdrant for filtered search
+FILTER_FIELDS = ("doc_type", "source_dir")
+
+def build_filter(spec: Optional[Dict[str, Any]]):
+    """
+    Compile a metadata filter spec into a Qdrant payload filter.
+    
+    Args:
+        spec: {field: value} or {field: [values]}; all fields must match
+        
+    Returns:
+        qdrant models.Filter or None for an empty spec
+    """
+    if not spec:
+        return None
+    conditions = []
+    for field, value in spec.items():
+        key = f"{METADATA_PAYLOAD_KEY}.{field}"
+        if isinstance(value, (list, tuple, set)):
+            match = models.MatchAny(any=list(value))
+        else:
+            match = models.MatchValue(value=value)
+        conditions.append(models.FieldCondition(key=key, match=match))
+    return models.Filter(must=conditions)
+
+def _ensure_payload_indexes(client, collection_name: str) -> None:
+    """Create keyword indexes on the filter fields (no-op if they already exist)."""
+    for field in FILTER_FIELDS:
+        try:
+            client.create_payload_index(
+                collection_name=collection_name,
+                field_name=f"{METADATA_PAYLOAD_KEY}.{field}",
+                field_schema=models.PayloadSchemaType.KEYWORD,
+            )
+        except Exception as e:
+            log.warning("could not create payload index", field=field, error=str(e))
+
+def _client_kwargs() -> Optional[Dict[str, Any]]:
+    """Build Qdrant client kwargs from the environment, or None if unconfigured."""
+    qdrant_url = os.getenv("QDRANT_URL")
+    if not qdrant_url:
+        return None
+    
+    client_kwargs = {
+        "url": qdrant_url,
+        "prefer_grpc": False
+    }
+    
+    qdrant_api_key = os.getenv("QDRANT_API_KEY")
+    if qdrant_api_key:
+        client_kwargs["api_key"] = qdrant_api_key
+    
+    return client_kwargs
+
+_client = None
+_async_client = None
+_client_lock = threading.Lock()
+
+def get_client() -> Optional["QdrantClient"]:
+    """The process-wide QdrantClient, created on first use (None if Qdrant is not configured)."""
+    global _client
+    if _client is None and QDRANT_AVAILABLE:
+        with _client_lock:
+            client_kwargs = _client_kwargs()
+            if _client is None and client_kwargs is not None:
+                _client = QdrantClient(**client_kwargs)
+    return _client
+
+def init_vector_store(embeddings):
+    """
+    Initialize the vector store with the given embedding function.
+    
+    Args:
+        embeddings: The embedding function (e.g., HuggingFaceEmbeddings)
+        
+    Returns:
+        Qdrant or LocalVectorStore instance, or None if initialization fails
+    """
+    if VECTOR_BACKEND != "local":
+        store = _init_qdrant_store(embeddings)
+        if store is not None or VECTOR_BACKEND == "qdrant":
+            return store
+        log.warning("falling back to in-process vector index")
+    return init_local_store(embeddings)
+
+def init_local_store(embeddings) -> Optional[LocalVectorStore]:
+    """
+    Initialize the in-process NumPy vector index.
+    
+    Args:
+        embeddings: The embedding function
+        
+    Returns:
+        LocalVectorStore instance or None if the index directory is unusable
+    """
+    collection_name = os.getenv("QDRANT_COLLECTION", "aurora")
     try:
-        from langchain_community.vectorstores import Qdrant
-        QDRANT_AVAILABLE = True
-    except ImportError:
-        QDRANT_AVAILABLE = False
-        Qdrant = None
+        store = LocalVectorStore(LOCAL_INDEX_DIR, embeddings, collection_name)
+        log.info("vector store ready", backend="local", dir=str(store.dir), docs=store.count())
+        return store
+    except Exception as e:
+        log.error("local vector index initialization failed", error=str(e))
+        return None
+
+def is_local_store(store) -> bool:
+    return isinstance(store, LocalVectorStore)
+
+def backend_name(store) -> str:
+    return "local" if is_local_store(store) else "qdrant"
 
-def init_vector_store(embeddings) -> Optional[Qdrant]:
+def _init_qdrant_store(embeddings) -> Optional[Qdrant]:
     """
     Initialize Qdrant vector store with the given embedding function.
     
@@ -31,49 +156,35 @@ def init_vector_store(embeddings) -> Optional[Qdrant]:
         Qdrant vector store instance or None if initialization fails
     """
     if not QDRANT_AVAILABLE:
-        print("❌ Qdrant dependencies not available")
+        log.warning("qdrant dependencies not available")
         return None
     
     try:
         # Get configuration from environment
-        qdrant_url = os.getenv("QDRANT_URL")
-        qdrant_api_key = os.getenv("QDRANT_API_KEY")
         collection_name = os.getenv("QDRANT_COLLECTION", "aurora")
+        client_kwargs = _client_kwargs()
         
-        if not qdrant_url:
-            print("❌ QDRANT_URL not configured")
+        if client_kwargs is None:
+            log.warning("QDRANT_URL not configured")
             return None
         
-        # Initialize Qdrant client
-        client_kwargs = {
-            "url": qdrant_url,
-            "prefer_grpc": False
-        }
-        
-        if qdrant_api_key:
-            client_kwargs["api_key"] = qdrant_api_key
-        
-        client = QdrantClient(**client_kwargs)
+        # Shared with every other caller in the process
+        client = get_client()
         
         # Ensure collection exists with dimension inference
         try:
             # Try to get collection info to check if it exists
             client.get_collection(collection_name)
-            print(f"✅ Using existing Qdrant collection: {collection_name}")
+            log.info("using existing qdrant collection", collection=collection_name)
         except Exception:
-            # Collection doesn't exist, create it
-            print(f"🔄 Creating Qdrant collection: {collection_name}")
-            
-            # Get embedding dimension
+            # Collection doesn't exist, create it; get the embedding dimension first
             try:
                 test_embedding = embeddings.embed_query("dimension probe")
                 embedding_dim = len(test_embedding)
-                print(f"📏 Embedding dimension: {embedding_dim}")
             except Exception as e:
-                print(f"⚠️  Could not get embedding dimension: {e}")
                 # Fallback to common dimension for sentence-transformers
                 embedding_dim = 384  # Default for all-MiniLM-L6-v2
-                print(f"📏 Using fallback embedding dimension: {embedding_dim}")
+                log.warning("could not get embedding dimension, using fallback", dim=embedding_dim, error=str(e))
             
             # Create collection with cosine distance
             client.create_collection(
@@ -83,7 +194,9 @@ def init_vector_store(embeddings) -> Optional[Qdrant]:
                     distance=models.Distance.COSINE
                 )
             )
-            print(f"✅ Created Qdrant collection: {collection_name}")
+            log.info("created qdrant collection", collection=collection_name, dim=embedding_dim)
+        
+        _ensure_payload_indexes(client, collection_name)
         
         # Initialize vector store with embeddings
         vector_store = None
@@ -97,30 +210,29 @@ def init_vector_store(embeddings) -> Optional[Qdrant]:
         for method_name, init_func in init_methods:
             try:
                 vector_store = init_func()
-                print(f"✅ Initialized with '{method_name}' parameter")
                 break
             except Exception as e:
-                print(f"⚠️  {method_name} method failed: {e}")
+                log.debug("qdrant wrapper init failed", parameter=method_name, error=str(e))
                 continue
         
         if vector_store is None:
-            print("❌ All initialization methods failed")
+            log.error("all qdrant wrapper initialization methods failed")
             return None
         
-        print(f"Vector store: qdrant • collection={collection_name}")
+        log.info("vector store ready", backend="qdrant", collection=collection_name)
         
         return vector_store
         
     except Exception as e:
-        print(f"❌ Qdrant initialization failed: {e}")
+        log.error("qdrant initialization failed", error=str(e))
         return None
 
-def vector_count(store: Qdrant) -> int:
+def vector_count(store) -> int:
     """
     Get the number of vectors in the store.
     
     Args:
-        store: Qdrant vector store instance
+        store: Qdrant or LocalVectorStore instance
         
     Returns:
         Number of vectors in the collection
@@ -129,6 +241,9 @@ def vector_count(store: Qdrant) -> int:
         if store is None:
             return 0
         
+        if is_local_store(store):
+            return store.count()
+        
         # Use client.count for robust counting
         try:
             result = store.client.count(store.collection_name, exact=True)
@@ -147,26 +262,30 @@ def vector_count(store: Qdrant) -> int:
                 return 0
         
     except Exception as e:
-        print(f"❌ Could not get vector count: {e}")
+        log.error("could not get vector count", error=str(e))
         return 0
 
-def add_texts(store: Qdrant, texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None) -> None:
+def add_texts(store, texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None,
+              ids: Optional[List[str]] = None) -> int:
     """
     Add texts to the vector store.
     
     Args:
-        store: Qdrant vector store instance
+        store: Qdrant or LocalVectorStore instance
         texts: List of text documents to add
         metadatas: Optional list of metadata dictionaries
+        ids: Optional point ids; re-adding an existing id upserts instead of duplicating
+        
+    Returns:
+        Number of texts written (0 on failure)
     """
     try:
         if store is None:
-            print("⚠️  Vector store not available - skipping add_texts")
-            return
+            log.warning("vector store not available, skipping add_texts")
+            return 0
         
         if not texts:
-            print("⚠️  No texts to add")
-            return
+            return 0
         
         # Ensure metadatas is properly formatted
         if metadatas is None:
@@ -179,19 +298,164 @@ def add_texts(store: Qdrant, texts: List[str], metadatas: Optional[List[Dict[str
         for i in range(0, len(texts), batch_size):
             batch_texts = texts[i:i + batch_size]
             batch_metadatas = metadatas[i:i + batch_size]
+            batch_kwargs = {"ids": ids[i:i + batch_size]} if ids is not None else {}
             
             store.add_texts(
                 texts=batch_texts,
-                metadatas=batch_metadatas
+                metadatas=batch_metadatas,
+                **batch_kwargs
             )
             
             total_added += len(batch_texts)
-            print(f"📝 Added batch {i//batch_size + 1}: {len(batch_texts)} documents")
+            log.debug("added batch", batch=i // batch_size + 1, documents=len(batch_texts))
         
-        print(f"✅ Added {total_added} documents to vector store")
+        log.info("added documents to vector store", documents=total_added)
+        return total_added
         
     except Exception as e:
-        print(f"❌ Failed to add texts to vector store: {e}")
+        log.error("failed to add texts to vector store", error=str(e))
+        return 0
+
+def delete_points(store, ids: List[str]) -> None:
+    """
+    Delete points by id from the store's collection.
+    
+    Args:
+        store: Qdrant or LocalVectorStore instance
+        ids: Point ids to remove
+    """
+    if store is None or not ids:
+        return
+    
+    if is_local_store(store):
+        store.delete(ids)
+        log.info("deleted stale chunks", chunks=len(ids))
+        return
+    
+    batch_size = 1000
+    for i in range(0, len(ids), batch_size):
+        store.client.delete(
+            collection_name=store.collection_name,
+            points_selector=models.PointIdsList(points=ids[i:i + batch_size]),
+        )
+    log.info("deleted stale chunks", chunks=len(ids))
+
+def iter_points(store, batch_size: int = 1000) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+    """
+    Iterate over every stored chunk without its vector.
+    
+    Args:
+        store: Qdrant or LocalVectorStore instance
+        batch_size: Points per Qdrant scroll request
+        
+    Yields:
+        (point id, text, metadata) tuples
+    """
+    if store is None:
+        return
+    
+    if is_local_store(store):
+        yield from store.points()
+        return
+    
+    offset = None
+    while True:
+        points, offset = store.client.scroll(
+            collection_name=store.collection_name,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=False,
+        )
+        for point in points:
+            payload = point.payload or {}
+            yield str(point.id), payload.get(CONTENT_PAYLOAD_KEY, ""), payload.get(METADATA_PAYLOAD_KEY) or {}
+        if offset is None:
+            return
+
+def search_by_vector(store, vector: List[float], k: int, filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+    """
+    Top-k search with an optional metadata filter evaluated inside the backend.
+    
+    Args:
+        store: Qdrant or LocalVectorStore instance
+        vector: Query embedding
+        k: Number of results
+        filter: Optional metadata filter spec (see build_filter)
+        
+    Returns:
+        List of matching Documents
+    """
+    if is_local_store(store):
+        return store.similarity_search_by_vector(vector, k=k, filter=filter)
+    return store.similarity_search_by_vector(vector, k=k, filter=build_filter(filter))
+
+def init_async_client() -> Optional["AsyncQdrantClient"]:
+    """
+    Get the shared AsyncQdrantClient for the non-blocking request path, creating it once.
+    
+    Returns:
+        AsyncQdrantClient instance or None if Qdrant is not configured
+    """
+    global _async_client
+    if _async_client is not None or not QDRANT_AVAILABLE:
+        return _async_client
+    
+    client_kwargs = _client_kwargs()
+    if client_kwargs is None:
+        return None
+    
+    try:
+        with _client_lock:
+            if _async_client is None:
+                _async_client = AsyncQdrantClient(**client_kwargs)
+        return _async_client
+    except Exception as e:
+        log.error("async qdrant client initialization failed", error=str(e))
+        return None
+
+async def asearch(client: "AsyncQdrantClient", collection_name: str, vector: List[float], k: int,
+                  filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+    """
+    Search the collection with a precomputed query vector without blocking the event loop.
+    
+    Args:
+        client: AsyncQdrantClient instance
+        collection_name: Collection to search
+        vector: Query embedding
+        k: Number of results
+        filter: Optional metadata filter spec (see build_filter)
+        
+    Returns:
+        List of LangChain Documents built from the stored payloads
+    """
+    query_filter = build_filter(filter)
+    if hasattr(client, "query_points"):
+        response = await client.query_points(
+            collection_name=collection_name,
+            query=vector,
+            query_filter=query_filter,
+            limit=k,
+            with_payload=True,
+        )
+        points = response.points
+    else:
+        points = await client.search(
+            collection_name=collection_name,
+            query_vector=vector,
+            query_filter=query_filter,
+            limit=k,
+            with_payload=True,
+        )
+    
+    docs = []
+    for point in points:
+        payload = point.payload or {}
+        docs.append(Document(
+            page_content=payload.get(CONTENT_PAYLOAD_KEY, ""),
+            metadata=payload.get(METADATA_PAYLOAD_KEY) or {},
+        ))
+    return docs
 
 def is_qdrant_available() -> bool:
     """
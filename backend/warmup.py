@@ -0,0 +1,105 @@
+"""
+Startup warm-up and readiness state.
+
+Runs once per process after the app starts: database tables, embedding model
+(loaded and run on a dummy batch), the shared Qdrant clients and vector store
+(plus auto-ingest), the lazily registered agent modules and the LLM
+gateway's OpenAI connection pools. Each stage is timed and its outcome
+recorded; /readyz stays 503 until every stage has run, so the Space
+healthcheck and rolling deploys only route traffic to a warm instance.
+A failed stage is reported but does not block readiness - the app serves in
+the same degraded mode it would without warm-up.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict
+
+from settings import settings
+from structured_log import get_logger
+
+log = get_logger(__name__)
+
+_state: Dict[str, Any] = {
+    "ready": False,
+    "started_at": None,
+    "total_ms": None,
+    "stages": {},   # name -> {"ok": bool, "ms": int, "error"?: str}
+}
+
+
+async def _stage(name: str, fn, *args, blocking: bool = True):
+    t0 = time.perf_counter()
+    try:
+        result = await (asyncio.to_thread(fn, *args) if blocking else fn(*args))
+        ms = int((time.perf_counter() - t0) * 1000)
+        _state["stages"][name] = {"ok": True, "ms": ms}
+        log.info("warm-up stage done", stage=name, ms=ms)
+        return result
+    except Exception as e:
+        ms = int((time.perf_counter() - t0) * 1000)
+        _state["stages"][name] = {"ok": False, "ms": ms, "error": str(e)}
+        log.warning("warm-up stage failed", stage=name, ms=ms, error=str(e))
+        return None
+
+
+def _init_database():
+    from audit_store import init_db
+    init_db()
+
+
+def _embedding_model():
+    from rag import warm_embeddings
+    dim = warm_embeddings()
+    log.info("embedding model warm", dim=dim)
+
+
+def _vector_store():
+    from rag import initialize_vectorstore_with_auto_ingest, _get_async_client, is_vectorstore_available
+    initialize_vectorstore_with_auto_ingest()
+    _get_async_client()
+    if not is_vectorstore_available():
+        raise RuntimeError("vector store unavailable")
+
+
+def _agents():
+    from registry import preload_agents
+    preload_agents()
+
+
+async def _openai_pools():
+    """Open a connection in the LLM gateway's shared client pools (a free GET /models)."""
+    if not settings.OPENAI_API_KEY:
+        raise RuntimeError("OPENAI_API_KEY not set")
+    from llm_gateway import gateway
+    await asyncio.to_thread(gateway.client.models.list, timeout=10)
+    # Async pools are bound to the serving event loop, so this runs on it
+    await gateway.aclient.models.list(timeout=10)
+
+
+async def run_warmup():
+    """Run every warm-up stage in order, then mark the process ready."""
+    _state["started_at"] = time.time()
+    t0 = time.perf_counter()
+    await _stage("database", _init_database)
+    await _stage("embedding_model", _embedding_model)
+    await _stage("vector_store", _vector_store)
+    await _stage("agents", _agents)
+    await _stage("openai_pool", _openai_pools, blocking=False)
+    _state["total_ms"] = int((time.perf_counter() - t0) * 1000)
+    _state["ready"] = True
+    failed = [name for name, stage in _state["stages"].items() if not stage["ok"]]
+    log.info("warm-up complete", total_ms=_state["total_ms"], degraded=failed)
+
+
+def is_ready() -> bool:
+    return _state["ready"]
+
+
+def readiness() -> Dict[str, Any]:
+    """Readiness flag plus per-stage timings, for /readyz and /healthz."""
+    return {
+        "ready": _state["ready"],
+        "total_ms": _state["total_ms"],
+        "stages": {name: dict(stage) for name, stage in _state["stages"].items()},
+    }